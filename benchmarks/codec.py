@@ -0,0 +1,58 @@
+# (c) 2013-2015 Nive GmbH - nive.io
+# This file is released under the BSD-License.
+#
+# Compares the installed json codecs on datastore payloads
+# --------------------------------------------------------
+#
+"""
+Usage: python benchmarks/codec.py [items]
+
+Encodes a `newItem` request with `items` items and decodes a `list` response of
+the same size with each installed codec.
+"""
+
+import sys
+import timeit
+
+from pynive_client import codec
+
+
+def newItemPayload(count):
+    items = []
+    for i in range(count):
+        items.append({"key": "item-%06d" % i,
+                      "value": {"title": u"Item %d äöü" % i,
+                                "tags": ["a", "b", "c"],
+                                "price": i * 1.25,
+                                "count": i,
+                                "active": i % 2 == 0,
+                                "notes": None}})
+    return {"items": items}
+
+
+def listPayload(count):
+    items = []
+    for i in range(count):
+        items.append({"key": "item-%06d" % i,
+                      "id": i,
+                      "owner": "user-%d" % (i % 50),
+                      "ctime": "2015-01-01T10:00:00",
+                      "mtime": "2015-01-02T10:00:00",
+                      "value": {"title": "Item %d" % i, "count": i}})
+    return {"items": items, "start": 1, "size": count, "total": count}
+
+
+def run(count=20000, repeat=5):
+    request = newItemPayload(count)
+    response = codec.JsonCodec().dumps(listPayload(count))
+    print("%d items, list response %d bytes" % (count, len(response)))
+    print("%-8s %12s %12s" % ("codec", "encode ms", "decode ms"))
+    for name in codec.available():
+        c = codec.getCodec(name)
+        encode = min(timeit.repeat(lambda: c.dumps(request), number=1, repeat=repeat))
+        decode = min(timeit.repeat(lambda: c.loads(response), number=1, repeat=repeat))
+        print("%-8s %12.2f %12.2f" % (name, encode * 1000, decode * 1000))
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
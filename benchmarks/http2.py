@@ -0,0 +1,90 @@
+# (c) 2013-2015 Nive GmbH - nive.io
+# This file is released under the BSD-License.
+#
+# HTTP/1.1 and HTTP/2 throughput with concurrent calls
+# ----------------------------------------------------
+#
+"""
+Usage: python benchmarks/http2.py
+
+Runs bursts of concurrent json calls with `batch.gather()` against local servers and
+prints calls per second and the number of connections opened. HTTP/1.1 calls use the
+`requests` and `urllib3` transports against a threaded http server, HTTP/2 calls the
+`httpx` transport against the HTTP/2 stand-in server in `tests/servers.py` (requires
+`httpx` and `h2`). Servers are local and respond immediately. Results show client side
+overhead and connection usage, not network latency.
+"""
+
+import threading
+import time
+
+from pynive_client import batch
+from pynive_client import endpoint
+from pynive_client import transport
+from pynive_client.tests import servers
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+class Handler(servers.Handler):
+    disable_nagle_algorithm = True
+
+
+class Server(servers.Server):
+    request_queue_size = 256
+    connections = 0
+
+    def process_request(self, request, client_address):
+        self.connections += 1
+        return servers.Server.process_request(self, request, client_address)
+
+
+def burst(client, size, pool):
+    calls = [(client.call, ("echo", {"key": "item%d" % n}, {})) for n in range(size)]
+    start = time.time()
+    results = batch.gather(*calls, pool=pool)
+    seconds = time.time() - start
+    errors = [r for r in results if isinstance(r, Exception)]
+    if errors:
+        raise errors[0]
+    return seconds
+
+
+def run(size=200, bursts=5):
+    server = Server(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    h1 = "127.0.0.1:%d" % server.server_address[1]
+    h2server = None
+    if httpx is not None and servers.h2 is not None:
+        h2server = servers.H2Server()
+    pool = batch.Pool(workers=size)
+
+    cases = [("HTTP/1.1 requests", h1, "requests"),
+             ("HTTP/1.1 urllib3", h1, "urllib3")]
+    if h2server is not None:
+        cases.append(("HTTP/2 httpx", "127.0.0.1:%d" % h2server.port, transport.HttpxTransport(http1=False)))
+    else:
+        print("httpx or h2 not installed. Skipping HTTP/2.")
+
+    print("%d concurrent calls per burst" % size)
+    print("%-20s %12s %12s" % ("case", "calls/s", "connections"))
+    for name, domain, t in cases:
+        client = endpoint.Client(service="mystorage", domain=domain, secure=False, transport=t)
+        client.newSession(pool_connections=1, pool_maxsize=size, pool_block=False)
+        counter = h2server if domain != h1 else server
+        opened = counter.connections
+        seconds = sum([burst(client, size, pool) for i in range(bursts)])
+        print("%-20s %12.0f %12d" % (name, size * bursts / seconds, counter.connections - opened))
+    server.shutdown()
+    server.server_close()
+    if h2server is not None:
+        h2server.close()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,79 @@
+# (c) 2013-2015 Nive GmbH - nive.io
+# This file is released under the BSD-License.
+#
+# Per call transport overhead
+# ---------------------------
+#
+"""
+Usage: python benchmarks/transport.py
+
+Sends small json calls to a local keep-alive http server and compares the time per
+call of the transports with and without session (connection pool). The server time
+is the same for all cases, differences are client overhead.
+"""
+
+import threading
+import time
+
+# python 2/3
+try:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    from SocketServer import ThreadingMixIn
+
+from pynive_client import endpoint
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def run(number=2000):
+    server = Server(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    domain = "127.0.0.1:%d" % server.server_address[1]
+    values = {"key": "item1", "value": {"title": "benchmark", "size": 1000}}
+
+    print("%-24s %12s" % ("case", "us per call"))
+    for name in ("requests", "urllib3"):
+        for session in (False, True):
+            client = endpoint.Client(service="mystorage", domain=domain, secure=False, transport=name)
+            loops = number
+            if session:
+                client.newSession()
+            else:
+                # a new connection per call
+                loops = number // 4
+            client.call("getItem", values, {})
+            start = time.time()
+            for i in range(loops):
+                client.call("getItem", values, {})
+            seconds = time.time() - start
+            case = "%s %s" % (name, "session" if session else "no session")
+            print("%-24s %12.1f" % (case, seconds / loops * 1e6))
+    server.shutdown()
+    server.server_close()
+
+
+if __name__ == "__main__":
+    run()
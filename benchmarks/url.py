@@ -0,0 +1,40 @@
+# (c) 2013-2015 Nive GmbH - nive.io
+# This file is released under the BSD-License.
+#
+# Per call url construction overhead
+# ----------------------------------
+#
+"""
+Usage: python benchmarks/url.py
+
+Compares building each url with `endpoint.makeUrl()` (the previous behaviour of
+`Client.url()`) and the cached `Client.url()`.
+"""
+
+import timeit
+
+from pynive_client import endpoint
+
+
+def run(number=200000):
+    options = dict(service="mystorage", domain="mydomain", version="api", path="base/path")
+    client = endpoint.Client(**options)
+    paths = ["folder/file%d.txt" % i for i in range(100)]
+
+    cases = (
+        ("makeUrl getItem", lambda: endpoint.makeUrl(method="getItem", extendedPath=None, **client.options)),
+        ("Client.url getItem", lambda: client.url("getItem")),
+        ("makeUrl 100 paths", lambda: [endpoint.makeUrl(method="@getItem", extendedPath=p, **client.options)
+                                       for p in paths]),
+        ("Client.url 100 paths", lambda: [client.url("@getItem", p) for p in paths]),
+    )
+    print("%-24s %12s" % ("case", "ns per url"))
+    for name, function in cases:
+        count = 100 if "paths" in name else 1
+        loops = number // count
+        seconds = min(timeit.repeat(function, number=loops, repeat=3))
+        print("%-24s %12.0f" % (name, seconds / (loops * count) * 1e9))
+
+
+if __name__ == "__main__":
+    run()
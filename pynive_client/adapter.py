@@ -45,6 +45,8 @@ class MockAdapter(object):
     def request(self, method, url, **settings):
         if self.responses:
             data = settings.get("data")
+            if isinstance(data, bytes) and not isinstance(data, basestring):
+                data = data.decode("utf-8")
             if isinstance(data, basestring):
                 data = json.loads(data)
             for resp in self.responses:
@@ -74,9 +76,16 @@ class MockResponse(object):
         self.__dict__.update(values)
 
     def iter_content(self, size=1000):
-        return self
-    def next(self):
-        return self.content
+        content = self.content
+        if isinstance(content, (dict, list, tuple)):
+            content = json.dumps(content)
+        if not isinstance(content, bytes):
+            content = content.encode("utf-8")
+        for pos in range(0, len(content), size):
+            yield content[pos:pos+size]
+
+    def close(self):
+        pass
 
     def json(self):
         if self.content and isinstance(self.content, basestring):
@@ -0,0 +1,11 @@
+# (c) 2013-2015 Nive GmbH - nive.io
+# This file is released under the BSD-License.
+#
+
+import asyncio
+
+# python 3.6: get_event_loop() returns the running loop if called from a coroutine
+try:
+    runningLoop = asyncio.get_running_loop
+except AttributeError:
+    runningLoop = asyncio.get_event_loop
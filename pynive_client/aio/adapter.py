@@ -0,0 +1,27 @@
+# (c) 2013-2015 Nive GmbH - nive.io
+# This file is released under the BSD-License.
+#
+# Helper class to mock server requests in asyncio tests
+# -----------------------------------------------------
+#
+
+from pynive_client import adapter
+
+
+class AsyncMockAdapter(adapter.MockAdapter):
+    """
+    asyncio request adapter for testing and mocking services
+
+    Supports stored responses. See ``adapter.StoredResponse``.
+
+    ::
+
+        adapter = AsyncMockAdapter(responses=[...])
+
+    """
+
+    async def request(self, method, url, **settings):
+        return super(AsyncMockAdapter, self).request(method, url, **settings)
+
+    async def close(self):
+        pass
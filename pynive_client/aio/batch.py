@@ -0,0 +1,53 @@
+# (c) 2013-2015 Nive GmbH - nive.io
+# This file is released under the BSD-License.
+#
+# Concurrent calls across asyncio clients
+# ---------------------------------------
+#
+"""
+Asyncio version of `batch.gather()` ::
+
+    from pynive_client.aio import batch
+
+    profile, item, logo = await batch.gather(user.profile(),
+                                             storage.getItem(key="item1"),
+                                             files.getItem("images/logo.png"),
+                                             deadline=2.0)
+
+Results are returned in order. Failed calls return the raised exception. Calls not
+finished when the deadline is reached are cancelled and returned as
+`endpoint.DeadlineExceeded` exceptions.
+"""
+
+import asyncio
+
+from pynive_client import endpoint
+
+
+async def gather(*calls, deadline=None):
+    """
+    Runs coroutines concurrently.
+
+    :param calls: coroutines
+    :param deadline: maximum time in seconds for all calls
+    :return: list of results or exceptions in call order
+    """
+    tasks = [asyncio.ensure_future(call) for call in calls]
+    if not tasks:
+        return []
+    done, pending = await asyncio.wait(tasks, timeout=deadline)
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.wait(pending)
+    results = []
+    for task in tasks:
+        if task in pending:
+            results.append(endpoint.DeadlineExceeded("Call not finished within %.2fs" % deadline))
+        elif task.cancelled():
+            results.append(asyncio.CancelledError())
+        elif task.exception() is not None:
+            results.append(task.exception())
+        else:
+            results.append(task.result())
+    return results
@@ -0,0 +1,60 @@
+# (c) 2013-2015 Nive GmbH - nive.io
+# This file is released under the BSD-License.
+#
+# Request coalescing for concurrent read calls (asyncio)
+# ------------------------------------------------------
+#
+"""
+Asyncio version of `coalesce.SingleFlight` ::
+
+    from pynive_client.aio import coalesce
+
+    storage = datastore.DataStore(service='mystorage', domain='mydomain',
+                                  singleFlight=coalesce.SingleFlight())
+
+If the first call is cancelled waiting calls receive `asyncio.CancelledError`. Waiting
+calls raise `endpoint.DeadlineExceeded` if their own deadline passes first.
+"""
+
+import asyncio
+
+from pynive_client import coalesce
+from pynive_client.coalesce import _Flight
+from pynive_client.endpoint import DeadlineExceeded
+
+
+class SingleFlight(coalesce.SingleFlight):
+    """
+    Shares in flight calls between asyncio tasks.
+    """
+
+    async def do(self, key, function, *args, deadline=None):
+        """
+        Awaits `function(*args)` or waits for the running call with the same key.
+
+        :param key: call key returned by `key()`
+        :param function: coroutine function sending the call
+        :param deadline: deadline.Deadline of the call. limits the time waiting for the running call.
+        :return: the result of `function`
+        """
+        flight, leader = self._join(key)
+        if not leader:
+            try:
+                await asyncio.wait_for(flight.done.wait(), self._remaining(deadline))
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded(self._deadlineMessage(key))
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = await function(*args)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            self._leave(key)
+            flight.done.set()
+        return flight.result
+
+    def _flight(self):
+        return _Flight(asyncio.Event())
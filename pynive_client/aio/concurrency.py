@@ -0,0 +1,45 @@
+# (c) 2013-2015 Nive GmbH - nive.io
+# This file is released under the BSD-License.
+#
+# Adaptive concurrency limits (asyncio)
+# -------------------------------------
+#
+"""
+Asyncio support for `concurrency.ConcurrencyLimiter`. The same limiter instances are
+used by blocking and asyncio clients ::
+
+    from pynive_client import concurrency
+    from pynive_client.aio import datastore
+
+    limiters = concurrency.ConcurrencyLimiters(initial=10, maxWait=5)
+    storage = datastore.DataStore(service='mystorage', domain='mydomain', concurrencyLimiters=limiters)
+
+"""
+
+import asyncio
+
+from pynive_client.aio import runningLoop
+
+
+async def acquire(limiter, timeout=None):
+    """
+    Waits for a free slot of the limiter without blocking the event loop. See
+    `ConcurrencyLimiter.acquire()`.
+
+    :param limiter: concurrency.ConcurrencyLimiter instance
+    :param timeout: maximum wait in seconds
+    :return: ticket or None
+    """
+    waiter = limiter._enqueue(runningLoop())
+    if waiter is None or waiter is False:
+        return limiter._ticket(waiter)
+    try:
+        await asyncio.wait_for(asyncio.shield(waiter.future), limiter._maxWait(timeout))
+    except asyncio.TimeoutError:
+        pass
+    except asyncio.CancelledError:
+        if limiter._dequeue(waiter):
+            # the slot was granted in the meantime
+            limiter.release(None, None)
+        raise
+    return limiter._ticket(limiter._dequeue(waiter))
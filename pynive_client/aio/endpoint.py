@@ -0,0 +1,371 @@
+# (c) 2013-2015 Nive GmbH - nive.io
+# This file is released under the BSD-License.
+#
+# Nive api endpoint asyncio client
+# --------------------------------
+# Documentation: http://www.nive.co/docs/webapi/endpoint.html
+#
+"""
+Asyncio version of `endpoint.Client`. Requires python 3.5 or newer.
+
+The default http adapter is based on the `aiohttp` package. The package is only
+imported if a session is created by `newSession()` or the adapter is used without
+a session. `AsyncClient` uses the same url construction, request options, `Result`
+class and exceptions as the blocking client.
+
+::
+
+    import asyncio
+    from pynive_client.aio import datastore
+
+    async def load(keys):
+        storage = datastore.DataStore(service='mystorage', domain='mydomain')
+        session = storage.newSession()
+        try:
+            return await asyncio.gather(*[storage.getItem(key=k) for k in keys])
+        finally:
+            await session.close()
+
+"""
+
+import asyncio
+import datetime
+import json
+import time
+
+from pynive_client import endpoint
+from pynive_client import trace
+from pynive_client.transport import Request
+from pynive_client.aio import concurrency
+from pynive_client.aio import runningLoop
+
+
+class AsyncClient(endpoint.Client):
+    """
+    Basic asyncio client functionality
+
+    `call()`, `request()`, `ping()`, `_dispatch()`, `_send()` and `_handleResponse()` are coroutines.
+    Adapters (and sessions) have to provide a `request(httpmethod, url, **settings)`
+    coroutine returning a response with the body already loaded.
+    """
+
+    adapter = None
+
+    def newSession(self, max_retries=3, pool_connections=3, pool_maxsize=5, auth=None, pool_block=True):
+        """
+        Create a new http session based on `HttpAdapter`. The session has to be closed
+        by calling `await session.close()`.
+
+        :param max_retries : not used. kept for compatibility with `endpoint.Client`
+        :param pool_connections : number of hosts (services). limits the total number of connections
+        :param pool_maxsize : number of connections per host
+        :param pool_block : not used. aiohttp always waits for a free connection
+        :return: http session
+        """
+        session = HttpAdapter(limit=pool_connections*pool_maxsize, limit_per_host=pool_maxsize)
+        # use session instance to store auth-token
+        session.authtoken = auth
+        self.session = session
+        self.counter = 0
+        self.tcounter = 0
+        return session
+
+
+    async def call(self, method, values, reqSettings, extendedPath=None):
+        """
+        Calls a service method and parses the response. See `endpoint.Client.call()`.
+
+        :param method: Service function name to be called
+        :param values: Payload transmitted to the service
+        :param reqSettings: additional request settings
+        :return: content, response
+        """
+        reqSettings = self._withDeadline(reqSettings or {})
+        flight = self.singleFlight
+        if flight is not None:
+            key = flight.key(self, method, values, reqSettings, extendedPath)
+            if key is not None:
+                return await flight.do(key, self._call, method, values, reqSettings, extendedPath,
+                                       deadline=reqSettings.get('deadline'))
+        return await self._call(method, values, reqSettings, extendedPath)
+
+
+    async def _call(self, method, values, reqSettings, extendedPath):
+        url = self.url(method=method, extendedPath=extendedPath)
+        service = self.options.get('service')
+        tracer = self.tracer
+        start = time.time()
+        try:
+            with trace.event(tracer, trace.CALL, method, service, url, domain=self.options.get('domain')) as event:
+                response = await self._dispatch(url, method, values, reqSettings)
+                self._count(response, method, extendedPath)
+                if event is not None:
+                    event.status = response.status_code
+                    event.responseSize = trace.responseSize(response)
+                with trace.event(tracer, trace.PARSE, method, service, url, status=response.status_code):
+                    content, response = await self._handleResponse(response, method, values, reqSettings)
+        except Exception as e:
+            self._record(method, start, reqSettings, error=e)
+            raise
+        self._record(method, start, reqSettings, response=response)
+        if not self.keepResponse and not reqSettings.get('stream'):
+            response = endpoint.ResponseInfo(response)
+        return content, response
+
+
+    async def request(self, path, **reqSettings):
+        """
+        Calls a url.
+
+        :param reqSettings: additional request settings
+
+        :return: FileWrapper instance
+        """
+        method=""
+        values=None
+        url = self.url(method=method, extendedPath=path)
+        reqSettings = self._withDeadline(reqSettings)
+        response = await self._send(url, method, values, **reqSettings)
+        content, response = await self._handleResponse(response, method, values, reqSettings)
+        return endpoint.FileWrapper(response)
+
+
+    async def ping(self, options=None, **reqSettings):
+        """
+
+        :param reqSettings:
+        :return: status
+        """
+        values = dict()
+        if options:
+            values.update(options)
+        content, response = await self.call(self.pingurl, values, reqSettings, '/')
+        return endpoint.Result(result=content.get('result'),
+                               response=response)
+
+
+    async def _dispatch(self, url, method, values, reqSettings):
+        breaker = self.circuitBreaker()
+        if breaker is None:
+            return await self._send(url, method, values, **reqSettings)
+        probe = breaker.allow()
+        if probe and breaker.pingProbe:
+            await self._ping(breaker)
+            probe = False
+        try:
+            response = await self._send(url, method, values, **reqSettings)
+        except Exception as e:
+            if self._localError(e):
+                breaker.cancel(probe)
+            else:
+                breaker.record(False, probe=probe)
+            raise
+        breaker.record(response.status_code < 500, response.elapsed.total_seconds(), probe=probe)
+        return response
+
+
+    async def _ping(self, breaker):
+        # probe call for a half-open circuit breaker. raises CircuitOpen on failure.
+        try:
+            response = await self._send(self.url(method=self.pingurl, extendedPath='/'), self.pingurl, {})
+            success = response.status_code < 400
+        except Exception as e:
+            if self._localError(e):
+                breaker.cancel(True)
+                raise
+            success = False
+        breaker.record(success, probe=True)
+        if not success:
+            raise endpoint.CircuitOpen("Circuit open. Ping failed: %s" % breaker.name)
+
+
+    async def _send(self, url, method, values, **reqSettings):
+        manager = self.tokenManager
+        if reqSettings.get('auth'):
+            manager = None
+        elif manager is not None:
+            # obtaining a new token calls the user service
+            token = manager.cached()
+            if token is None:
+                token = await runningLoop().run_in_executor(None, manager.token)
+            reqSettings['auth'] = token
+        deadline = reqSettings.pop('deadline', None)
+        httpmethod, req = self._prepareRequest(method, values, reqSettings)
+        timeout = req.get('timeout')
+        adapter = self.session or self.adapter
+        if adapter is None:
+            adapter = self.adapter = HttpAdapter()
+        limiter = self.concurrencyLimiter()
+        rateLimits = self.rateLimits
+        policy = self.retryPolicy
+        clock = policy.clock
+        start = clock.time()
+        attempt = 0
+        service = self.options.get('service')
+        compression = self.compression
+        uncompressed = None
+        if compression is not None:
+            uncompressed = compression.apply(service, req)
+        tracer = self.tracer
+        size = trace.bodySize(req.get('data')) if tracer is not None else None
+        while True:
+            if rateLimits is not None:
+                wait = self._rateWait(rateLimits, method, deadline)
+                if wait:
+                    if rateLimits.clock.real:
+                        await asyncio.sleep(wait)
+                    else:
+                        rateLimits.clock.sleep(wait)
+            if deadline is not None:
+                req['timeout'] = deadline.timeout(timeout)
+                if req['timeout'] is None:
+                    raise self._localDeadline(method, deadline)
+            with trace.event(tracer, trace.ATTEMPT, method, service, url,
+                             domain=self.options.get('domain'), httpmethod=httpmethod,
+                             attempt=attempt, size=size) as event:
+                response = await self._request(adapter, httpmethod, url, req, method, deadline, limiter)
+                if event is not None:
+                    event.status = response.status_code
+                    event.responseSize = trace.responseSize(response)
+            if uncompressed is not None and response.status_code == 415:
+                # the service does not accept compressed bodies
+                self.log.warning("Compressed request not supported. Disabling compression for %s." % service)
+                compression.disable(service)
+                compression.restore(req, uncompressed)
+                uncompressed = None
+                continue
+            if manager is not None and response.status_code == 401 and endpoint.resendable(values):
+                # the token expired or has been revoked. refresh and send once more.
+                failed = req['headers'].get('x-auth-token')
+                loop = runningLoop()
+                req['headers']['x-auth-token'] = await loop.run_in_executor(None, manager.refresh, failed)
+                manager = None
+                continue
+            if not endpoint.resendable(values):
+                # streamed bodies can not be sent twice
+                return response
+            delay = policy.delay(attempt, method, httpmethod, response, clock.time()-start)
+            if delay is None:
+                return response
+            if deadline is not None and delay >= deadline.remaining():
+                if deadline.expired():
+                    raise endpoint.DeadlineExceeded(self._deadlineMessage(method, deadline))
+                # the next attempt would start after the deadline
+                return response
+            self.log.warning("Service responded %d. Retrying in %.2fs." % (response.status_code, delay))
+            if clock.real:
+                await asyncio.sleep(delay)
+            else:
+                clock.sleep(delay)
+            attempt += 1
+
+
+    async def _request(self, adapter, httpmethod, url, req, method, deadline, limiter):
+        # sends a single attempt. the adapter loads the body, the deadline covers the
+        # whole attempt.
+        ticket = None
+        if limiter is not None:
+            ticket = await concurrency.acquire(limiter, deadline.remaining() if deadline is not None else None)
+            if ticket is None:
+                self._limitExceeded(method, deadline, limiter)
+        try:
+            if deadline is None:
+                response = await adapter.request(httpmethod, url, **req)
+            else:
+                response = await asyncio.wait_for(adapter.request(httpmethod, url, **req), req['timeout'][1])
+        except asyncio.TimeoutError:
+            if ticket is not None:
+                limiter.release(ticket, True)
+            if deadline is None:
+                raise
+            raise endpoint.DeadlineExceeded(self._deadlineMessage(method, deadline))
+        except BaseException:
+            if ticket is not None:
+                limiter.release(ticket, None)
+            raise
+        if ticket is not None:
+            limiter.release(ticket, limiter.overload(response))
+        return response
+
+
+    async def _handleResponse(self, response, method, values, reqSettings):
+        # the response body is loaded by the adapter. status and body handling is the
+        # same as for blocking calls.
+        return super(AsyncClient, self)._handleResponse(response, method, values, reqSettings)
+
+
+
+class HttpAdapter(object):
+    """
+    aiohttp based http session. Converts `requests` style request settings and returns
+    `Response` objects with the body already loaded.
+    """
+    authtoken = None
+
+    def __init__(self, limit=100, limit_per_host=0):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self._session = None
+
+    @property
+    def cookies(self):
+        if self._session is None:
+            return None
+        return self._session.cookie_jar
+
+    def Session(self):
+        return self
+
+    async def request(self, method, url, **settings):
+        import aiohttp
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host)
+            self._session = aiohttp.ClientSession(connector=connector)
+        kw = dict(headers=settings.get('headers'), data=settings.get('data'))
+        timeout = settings.get('timeout')
+        if isinstance(timeout, tuple):
+            kw['timeout'] = aiohttp.ClientTimeout(sock_connect=timeout[0], sock_read=timeout[1])
+        elif timeout is not None:
+            kw['timeout'] = aiohttp.ClientTimeout(total=timeout)
+        start = datetime.datetime.now()
+        async with self._session.request(method, url, **kw) as resp:
+            content = await resp.read()
+            return Response(status_code=resp.status,
+                            reason=resp.reason or '',
+                            headers=resp.headers,
+                            url=str(resp.url),
+                            content=content,
+                            elapsed=datetime.datetime.now()-start,
+                            request=Request(method, url, kw['headers'], kw['data']))
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+
+class Response(object):
+    """
+    Loaded http response. Provides the attributes of `requests.Response` used by the
+    clients.
+    """
+
+    def __init__(self, status_code, reason, headers, url, content, elapsed, request=None):
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.url = url
+        self.content = content
+        self.elapsed = elapsed
+        self.request = request
+
+    def json(self):
+        return json.loads(self.content.decode('utf-8'))
+
+    def iter_content(self, size=1):
+        for pos in range(0, len(self.content), size):
+            yield self.content[pos:pos+size]
+
+    def close(self):
+        pass
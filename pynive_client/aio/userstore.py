@@ -0,0 +1,608 @@
+# (c) 2013-2015 Nive GmbH - nive.io
+# This file is released under the BSD-License.
+#
+# Nive User service asyncio client
+# ------------------------------------------------
+# Documentation: http:#www.nive.co/docs/webapi/userstore.html#api
+#
+"""
+Asyncio version of `userstore.User`. All service methods are coroutines with
+the same parameters and results as the blocking client.
+
+::
+
+    from pynive_client.aio import userstore
+
+    niveuser = userstore.User(domain='mydomain')
+    session = niveuser.newSession()
+
+    # retrieve a auth-token and store it in the session for following requests
+    auth = await niveuser.token(identity='username', password='userpw', storeInSession=True)
+    profile = await niveuser.profile()
+
+    await session.close()
+
+"""
+
+from pynive_client import endpoint
+from pynive_client.aio.endpoint import AsyncClient
+
+# python 2/3
+try:
+    import basestring
+except ImportError:
+    basestring = str
+
+class User(AsyncClient):
+    service_name='users'   # service routing name
+    default_version='api'
+    pingurl='ping'
+
+    def __init__(self, domain=None, session=None, **options):
+        """
+
+        :param domain: endpoint options used to connect to the service
+        :param session: http session object
+        :param options: other endpoint options. see endpoint.py.
+        """
+        super(User, self).__init__(domain=domain,
+                                   session=session,
+                                   service=self.service_name,
+                                   **options)
+        if not "version" in self.options:
+            self.options["version"] = self.default_version
+
+    async def token(self, identity=None, password=None, storeInSession=False, **reqSettings):
+        """
+        Obtain a security for authentication of future calls. You can either manage the
+        returned auth-token yourself and pass it manually to calls or set `storeInSession`
+        to True to handle the token automatically. In this case a valid session created
+        by `newSession()` is required.
+
+        Raises `AuthorizationFailure` if no valid token is returned.
+
+        :param identity:
+        :param password:
+        :param storeInSession:
+        :param reqSettings:
+        :return: (string) auth-token
+        """
+        content, response = await self.call('token', dict(identity=identity, password=password), reqSettings)
+        if not content or not content.get('token'):
+            msg = self._fmtMsgs(content, 'token_failure')
+            raise endpoint.AuthorizationFailure(msg)
+        token = content.get('token')
+
+        if storeInSession and self.session:
+            # store token in session for future requests
+            self.session.authtoken = token
+
+        return endpoint.Result(token=token,
+                               message=content.get('message'),
+                               response=response)
+
+
+    async def signin(self, identity=None, password=None, **reqSettings):
+        """
+        Sign in and start a cookie session. Authorization of future calls are automatically
+        handled by the session. `signin` requires a valid session created by `newSession()`.
+
+        Raises `AuthorizationFailure` if signin fails.
+
+        :param identity:
+        :param password:
+        :param reqSettings:
+        :return: True. Raises `AuthorizationFailure` if signin fails.
+        """
+        content, response =  await self.call('signin', dict(identity=identity, password=password), reqSettings)
+        if not content or not content.get('result'):
+            msg = self._fmtMsgs(content, 'sign_in_failure')
+            raise endpoint.AuthorizationFailure(msg)
+        return endpoint.Result(result=content.get('result'),
+                               message=content.get('message'),
+                               response=response)
+
+
+
+    async def signout(self, **reqSettings):
+        """
+        Calls the servers signout method and removes stored credentials (cookie, token) from the
+        current session. Also the services' signout method is called to terminate any user-session
+        handled by the service.
+
+        The session itself can still be used for further calls.
+
+        :param reqSettings:
+        :return: None
+        """
+        content, response = await self.call('signout', {}, reqSettings)
+        if self.session:
+            # the cookie is reset by the server. the token is reset here.
+            self.session.authtoken = None
+        return endpoint.Result(result=content.get('result'),
+                               response=response)
+
+
+    async def identity(self, **reqSettings):
+        """
+        Returns the users identity.
+
+        :param reqSettings:
+        :return: {name, email, reference, realname}
+        """
+        content, response = await self.call('identity', {}, reqSettings)
+        return endpoint.Result(response=response,
+                               **content)
+
+
+    async def name(self, **reqSettings):
+        """
+        Returns the users name.
+
+        :param reqSettings:
+        :return: {name, realname}
+        """
+        content, response = await self.call('name', {}, reqSettings)
+        return endpoint.Result(response=response,
+                               **content)
+
+
+    async def profile(self, **reqSettings):
+        """
+        Returns the users profile values. `data`, `realname` and `notify` can
+        be changed by calling `update()`. `data` can be used to store arbitrary
+        values or json strings.
+
+        :param reqSettings:
+        :return: {data, realname, notify, email, name, lastlogin}
+        """
+        content, response = await self.call('profile', {}, reqSettings)
+        return endpoint.Result(response=response,
+                               **content)
+
+
+    async def authenticated(self, groups=None, **reqSettings):
+        """
+        Queries whether the current user is authenticated. If `groups` is set the result
+        indicates if the user is assigned to one of at least the groups.
+
+        :param groups: None, a single group, or a list of groups
+        :param reqSettings:
+        :return: True or False
+        """
+        if isinstance(groups, (list, tuple)):
+            values={'groups': groups}
+        elif isinstance(groups, basestring):
+            values = {'groups': [groups]}
+        else:
+            values = {}
+        content, response = await self.call('authenticated', values, reqSettings)
+        return endpoint.Result(response=response,
+                               **content)
+
+
+    async def signupDirect(self, name=None, email=None, password=None, data=None, realname=None, notify=None, **reqSettings):
+        """
+        Create a new user account.
+
+        :param name:
+        :param email:
+        :param password:
+        :param data:
+        :param realname:
+        :param notify:
+        :param reqSettings:
+        :return: result, invalid, message
+        """
+        values = dict(
+            name=name,
+            email=email,
+            password=password,
+            data=data
+        )
+        content, response = await self.call('signupDirect', values, reqSettings)
+        return endpoint.Result(response=response,
+                               **content)
+
+
+    async def signupOptin(self, name=None, email=None, password=None, data=None, realname=None, notify=None, **reqSettings):
+        """
+        Create a new user account.
+
+        :param name:
+        :param email:
+        :param password:
+        :param data:
+        :param realname:
+        :param notify:
+        :param reqSettings:
+        :return: result, invalid, message
+        """
+        values = dict(
+            name=name,
+            email=email,
+            password=password,
+            data=data
+        )
+        content, response = await self.call('signupOptin', values, reqSettings)
+        return endpoint.Result(response=response,
+                               **content)
+
+
+    async def signupReview(self, name=None, email=None, password=None, data=None, realname=None, notify=None, **reqSettings):
+        """
+        Create a new user account.
+
+        :param name:
+        :param email:
+        :param password:
+        :param data:
+        :param realname:
+        :param notify:
+        :param reqSettings:
+        :return: result, invalid, message
+        """
+        values = dict(
+            name=name,
+            email=email,
+            password=password,
+            data=data
+        )
+        content, response = await self.call('signupReview', values, reqSettings)
+        return endpoint.Result(response=response,
+                               **content)
+
+
+    async def signupSendpw(self, name=None, email=None, data=None, realname=None, notify=None, **reqSettings):
+        """
+        Create a new user account.
+
+        :param name:
+        :param email:
+        :param data:
+        :param realname:
+        :param notify:
+        :param reqSettings:
+        :return: result, invalid, message
+        """
+        values = dict(
+            name=name,
+            email=email,
+            data=data
+        )
+        content, response = await self.call('signupSendpw', values, reqSettings)
+        return endpoint.Result(response=response,
+                               **content)
+
+
+    async def signupUid(self, email=None, password=None, data=None, realname=None, notify=None, **reqSettings):
+        """
+        Create a new user account.
+
+        :param email:
+        :param password:
+        :param data:
+        :param realname:
+        :param notify:
+        :param reqSettings:
+        :return: result, invalid, message
+        """
+        values = dict(
+            email=email,
+            password=password,
+            data=data
+        )
+        content, response = await self.call('signupUid', values, reqSettings)
+        return endpoint.Result(response=response,
+                               **content)
+
+
+    async def activate(self, token, **reqSettings):
+        """
+        Activate a new user account. Step 1 is triggered either by calling `signupOptin()` or
+        `signupReview()`.
+
+        :param token:
+        :param reqSettings:
+        :return: result, message
+        """
+        values = dict(token=token)
+        content, response = await self.call('activate', values, reqSettings)
+        return endpoint.Result(response=response,
+                               **content)
+
+
+    async def update(self, data=None, realname=None, notify=None, **reqSettings):
+        """
+
+        :param data:
+        :param realname:
+        :param notify:
+        :param reqSettings:
+        :return: result, invalid, message
+        """
+        values = {}
+        if data is not None:
+            values['data'] = data
+        if realname is not None:
+            values['realname'] = realname
+        if notify is not None:
+            values['notify'] = notify
+        content, response = await self.call('update', values, reqSettings)
+        return endpoint.Result(response=response,
+                               **content)
+
+
+    async def updatePassword(self, password, newpassword, **reqSettings):
+        """
+
+        :param password:
+        :param newpassword:
+        :param reqSettings:
+        :return: result, invalid, message
+        """
+        values = dict(password=password, newpassword=newpassword)
+        content, response = await self.call('updatePassword', values, reqSettings)
+        return endpoint.Result(response=response,
+                               **content)
+
+
+    async def updateEmail(self, email, **reqSettings):
+        """
+
+        :param email:
+        :param reqSettings:
+        :return: result, invalid, message
+        """
+        values = dict(email=email)
+        content, response = await self.call('updateEmail', values, reqSettings)
+        return endpoint.Result(response=response,
+                               **content)
+
+
+    async def verifyEmail(self, email, **reqSettings):
+        """
+
+        :param email:
+        :param reqSettings:
+        :return: result, invalid, message
+        """
+        values = dict(email=email)
+        content, response = await self.call('verifyEmail', values, reqSettings)
+        return endpoint.Result(response=response,
+                               **content)
+
+
+    async def verifyEmail2(self, token, **reqSettings):
+        """
+
+        :param token:
+        :param reqSettings:
+        :return: result, message
+        """
+        values = dict(token=token)
+        content, response = await self.call('verifyEmail2', values, reqSettings)
+        return endpoint.Result(response=response,
+                               **content)
+
+
+    async def resetPassword(self, identity, **reqSettings):
+        """
+
+        :param identity:
+        :param reqSettings:
+        :return: result, message
+        """
+        values = dict(identity=identity)
+        content, response = await self.call('resetPassword', values, reqSettings)
+        return endpoint.Result(response=response,
+                               **content)
+
+
+    async def resetPassword2(self, token, newpassword, **reqSettings):
+        """
+
+        :param token:
+        :param newpassword:
+        :param reqSettings:
+        :return: result, invalid, message
+        """
+        values = dict(token=token, newpassword=newpassword)
+        content, response = await self.call('resetPassword2', values, reqSettings)
+        return endpoint.Result(response=response,
+                               **content)
+
+
+    async def message(self, message, **reqSettings):
+        """
+
+        :param message:
+        :param reqSettings:
+        :return: result, invalid
+        """
+        values = dict(message=message)
+        content, response = await self.call('message', values, reqSettings)
+        return endpoint.Result(response=response,
+                               **content)
+
+
+    async def allowed(self, permissions, **reqSettings):
+        """
+
+        :param permission: one or multiple permission names
+        :param reqSettings:
+        :return: dict {permission: True or False}
+        """
+        values = dict(permissions=permissions)
+        content, response = await self.call('allowed', values, reqSettings)
+        return endpoint.Result(response=response, **content)
+
+
+    async def disable(self, **reqSettings):
+        """
+
+        :param reqSettings:
+        :return: True or False, message
+        """
+        content, response = await self.call('disable', {}, reqSettings)
+        return endpoint.Result(response=response,
+                               **content)
+
+
+    async def delete(self, **reqSettings):
+        """
+
+        :param reqSettings:
+        :return: True or False, message
+        """
+        content, response = await self.call('delete', {}, reqSettings)
+        return endpoint.Result(response=response,
+                               **content)
+
+
+    async def review(self, identity, action, **reqSettings):
+        """
+        Review a new user account. Step 1 is triggered by calling `signupReview()`. The account to be
+        reviewed can be accepted or rejected.
+
+        :param identity: the users identity.
+        :param action: `accept`, `optin`, `reject`, `activate` or `disable`
+        :param reqSettings:
+        :return: result, message
+        """
+        values = dict(identity=identity, action=action)
+        content, response = await self.call('review', values, reqSettings)
+        return endpoint.Result(response=response,
+                               **content)
+
+
+    async def getUser(self, identity, **reqSettings):
+        """
+        Retrieve a users profile.
+
+        :param identity: the users identity.
+        :param reqSettings:
+        :return: profile values
+        """
+        values = dict(identity=identity)
+        content, response = await self.call('getUser', values, reqSettings)
+        return endpoint.Result(response=response,
+                               **content)
+
+
+    async def setUser(self, identity, values, **reqSettings):
+        """
+        Update a users profile.
+
+        :param identity: the users identity.
+        :param values: profile values to be updated
+        :param reqSettings:
+        :return: result, message, invalid
+        """
+        values = dict(identity=identity, values=values)
+        content, response = await self.call('setUser', values, reqSettings)
+        return endpoint.Result(response=response,
+                               **content)
+
+
+    async def removeUser(self, identity, **reqSettings):
+        """
+        Review a new user account. Step 1 is triggered by calling `signupReview()`. The account to be
+        reviewed can be accepted or rejected.
+
+        :param identity: the users identity.
+        :param reqSettings:
+        :return: result
+        """
+        values = dict(identity=identity)
+        content, response = await self.call('removeUser', values, reqSettings)
+        return endpoint.Result(response=response,
+                               **content)
+
+
+    async def list(self, active=None, pending=None, start=None, size=None, sort=None, order=None, **reqSettings):
+        """
+        Administration command. Each returned user contains (reference, name, email, realname, pending, active, activity)
+
+        :param active: only active, inactive or both
+        :param pending: only pending
+        :param sort:
+        :param order:
+        :param size:
+        :param start: batch start value
+        :param reqSettings:
+        :return: users
+        """
+        values = dict(start=start)
+        if active is not None:
+            values["active"] = active
+        if pending is not None:
+            values["pending"] = pending
+        if sort is not None:
+            values["sort"] = sort
+        if order is not None:
+            values["order"] = order
+        if size is not None:
+            values["size"] = size
+        if start is not None:
+            values["start"] = start
+        content, response = await self.call('list', values, reqSettings)
+        # todo iterator
+        return endpoint.Result(response=response,
+                               **content)
+
+
+    async def identities(self, active=None, pending=None, start=None, size=None, order=None, **reqSettings):
+        """
+        Administration command. Lists user identites as string only (reference, name/email ).
+
+        :param active: only active, inactive or both
+        :param pending: only pending
+        :param order:
+        :param size:
+        :param start: batch start value
+        :param reqSettings:
+        :return: users
+        """
+        values = dict(start=start)
+        if active is not None:
+            values["active"] = active
+        if pending is not None:
+            values["pending"] = pending
+        if order is not None:
+            values["order"] = order
+        if size is not None:
+            values["size"] = size
+        if start is not None:
+            values["start"] = start
+        content, response = await self.call('identities', values, reqSettings)
+        # todo iterator
+        return endpoint.Result(response=response,
+                               **content)
+
+
+    async def getPermissions(self, **reqSettings):
+        """
+
+        :param reqSettings:
+        :return: list of permission - group assignments
+        """
+        values = dict()
+        content, response = await self.call('getPermissions', values, reqSettings)
+        return content
+
+
+    async def setPermissions(self, permissions, **reqSettings):
+        """
+
+        :param permissions: dict/list. one or multiple permissions {permission, group, action="replace"}
+        :param reqSettings:
+        :return: Result(result, message)
+        """
+        values = dict(permissions=permissions)
+        content, response = await self.call('setPermissions', values, reqSettings)
+        return endpoint.Result(result=content.get('result'),
+                               message=content.get('message',()),
+                               response=response)
+
+
@@ -0,0 +1,187 @@
+# (c) 2013-2015 Nive GmbH - nive.io
+# This file is released under the BSD-License.
+#
+# Auth token manager
+# ------------------
+#
+"""
+`TokenManager` obtains auth tokens by calling `User.token()`, caches them until shortly
+before they expire and refreshes them in the background. A single manager can be shared
+by all clients of a process ::
+
+    from pynive_client import auth, userstore, datastore, filestore
+
+    tokens = auth.TokenManager(userstore.User(domain='mydomain'), identity='me', password='...',
+                               lifetime=3600)
+    tokens.start()
+    storage = datastore.DataStore(service='mystorage', domain='mydomain', tokenManager=tokens)
+    files = filestore.FileStore(service='myfiles', domain='mydomain', tokenManager=tokens)
+    ...
+    tokens.stop()
+
+Clients send the managed token unless a call passes `auth` explicitly. If a service
+responds `401` the token is refreshed and the request is sent once more.
+
+The `User` instance passed to the manager is only used to obtain tokens and should not
+use the manager itself. Without `start()` tokens are refreshed on demand when a call
+needs a token and the cached token has expired.
+"""
+
+import logging
+import threading
+
+from pynive_client.retry import Clock
+
+
+class TokenManager(object):
+    """
+    Thread safe token cache with proactive refresh.
+    """
+
+    def __init__(self, user, identity=None, password=None, lifetime=3600, refreshBefore=300,
+                 retryInterval=10, clock=None, **reqSettings):
+        """
+
+        :param user: userstore.User instance used to obtain tokens
+        :param identity: user name or email
+        :param password:
+        :param lifetime: token lifetime in seconds as configured for the user service
+        :param refreshBefore: seconds before expiry a token is refreshed
+        :param retryInterval: seconds between failed background refreshes
+        :param clock: retry.Clock instance
+        :param reqSettings: request settings for token calls
+        """
+        self.user = user
+        self.identity = identity
+        self.password = password
+        self.lifetime = lifetime
+        self.refreshBefore = refreshBefore
+        self.retryInterval = retryInterval
+        self.clock = clock or Clock()
+        self.reqSettings = reqSettings
+        self.refreshes = 0
+        self.failures = 0
+        self.log = logging.getLogger("pynive_client.auth")
+        # (token, expires) replaced as a whole so readers without lock see matching values
+        self._current = (None, None)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def token(self):
+        """
+        Returns a valid token. Obtains a new token if none is cached or the cached
+        token expires within `refreshBefore` seconds.
+
+        :return: string
+        """
+        token = self.cached()
+        if token is not None:
+            return token
+        with self._lock:
+            token, expires = self._current
+            if token is None or self.clock.time() >= expires - self.refreshBefore:
+                self._fetch()
+            return self._current[0]
+
+    def cached(self):
+        """
+        Returns the cached token or None if no valid token is cached. Does not call the
+        user service.
+
+        :return: string or None
+        """
+        token, expires = self._current
+        if token is not None and self.clock.time() < expires - self.refreshBefore:
+            return token
+        return None
+
+    @property
+    def expires(self):
+        """
+        Expiry time of the cached token or None
+        """
+        return self._current[1]
+
+    def refresh(self, failed=None):
+        """
+        Obtains a new token. If `failed` is passed and a different token has been cached
+        in the meantime the cached token is returned without calling the service.
+
+        :param failed: the token rejected by a service
+        :return: string
+        """
+        with self._lock:
+            token = self._current[0]
+            if failed is None or token is None or token == failed:
+                self._fetch()
+            return self._current[0]
+
+    def invalidate(self):
+        """
+        Removes the cached token.
+        """
+        with self._lock:
+            self._current = (None, None)
+
+    def start(self):
+        """
+        Starts a daemon thread refreshing the token before it expires.
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="pynive-token-refresh")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops the background refresh thread.
+        """
+        thread = self._thread
+        if thread is None:
+            return
+        self._stop.set()
+        thread.join()
+        self._thread = None
+
+    def stats(self):
+        """
+        :return: dict {expires, refreshes, failures, running}
+        """
+        return dict(expires=self.expires,
+                    refreshes=self.refreshes,
+                    failures=self.failures,
+                    running=self._thread is not None)
+
+    def _fetch(self):
+        # called with lock held
+        try:
+            result = self.user.token(identity=self.identity, password=self.password, **dict(self.reqSettings))
+        except Exception:
+            self.failures += 1
+            raise
+        self._current = (result.token, self.clock.time() + self.lifetime)
+        self.refreshes += 1
+
+    def _wait(self):
+        # seconds until the next refresh
+        expires = self.expires
+        if expires is None:
+            return 0
+        return max(0, expires - self.refreshBefore - self.clock.time())
+
+    def _run(self):
+        while not self._stop.is_set():
+            delay = self._wait()
+            if delay > 0:
+                if self._stop.wait(delay):
+                    break
+                continue
+            try:
+                self.refresh()
+            except Exception as e:
+                self.log.warning("Token refresh failed: %s" % e)
+                if self._stop.wait(self.retryInterval):
+                    break
@@ -0,0 +1,239 @@
+# (c) 2013-2015 Nive GmbH - nive.io
+# This file is released under the BSD-License.
+#
+# Concurrent calls across clients
+# -------------------------------
+#
+"""
+`Batch` runs prepared calls of any clients concurrently on a shared thread pool and
+returns the results in order. Failed calls return the raised exception instead of
+a result ::
+
+    from pynive_client import batch
+
+    b = batch.Batch(deadline=2.0)
+    b.add(user.profile)
+    b.add(storage.getItem, key="item1")
+    b.add(storage.getItem, key="item2")
+    b.add(files.getItem, "images/logo.png")
+    profile, item1, item2, logo = b.run()
+
+    # or
+    profile, item1 = batch.gather((user.profile,), (storage.getItem, (), {"key": "item1"}), deadline=2.0)
+
+Calls still running when the `deadline` (seconds) is reached are returned as
+`endpoint.DeadlineExceeded` exceptions, calls not started yet are cancelled.
+Running calls can not be interrupted but client method calls get the batch deadline
+as `deadline` request setting unless a timeout or deadline is passed.
+
+See `aio.batch.gather()` for asyncio clients.
+"""
+
+import threading
+import time
+
+from pynive_client import endpoint
+from pynive_client.deadline import Deadline
+
+# python 2/3
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+
+class Pool(object):
+    """
+    Thread pool with up to `workers` daemon threads. Threads are started on demand
+    and wait for further calls.
+    """
+
+    def __init__(self, workers=16):
+        self.workers = workers
+        self._queue = queue.Queue()
+        self._threads = []
+        self._idle = 0
+        self._lock = threading.Lock()
+
+    def submit(self, function):
+        """
+        Queues `function()` to be called by a pool thread.
+        """
+        with self._lock:
+            if self._idle == 0 and len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._run, name="pynive-batch-%d" % len(self._threads))
+                thread.daemon = True
+                self._threads.append(thread)
+                thread.start()
+            else:
+                self._idle -= 1
+        self._queue.put(function)
+
+    def close(self):
+        """
+        Stops the pool threads after the queued calls are finished. The pool can not
+        be used afterwards.
+        """
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for thread in threads:
+            self._queue.put(None)
+
+    def _run(self):
+        while True:
+            function = self._queue.get()
+            if function is None:
+                return
+            try:
+                function()
+            finally:
+                with self._lock:
+                    self._idle += 1
+
+
+_pool = None
+_poolLock = threading.Lock()
+
+
+def sharedPool():
+    """
+    Returns the process wide pool used by batches without explicit pool.
+    """
+    global _pool
+    with _poolLock:
+        if _pool is None:
+            _pool = Pool()
+        return _pool
+
+
+class Batch(object):
+    """
+    Collects calls and runs them concurrently.
+    """
+
+    def __init__(self, deadline=None, pool=None):
+        """
+
+        :param deadline: maximum time in seconds for all calls
+        :param pool: Pool instance. default is `sharedPool()`.
+        """
+        self.deadline = deadline
+        self.pool = pool
+        self.calls = []
+        # positions of the calls not finished before the deadline
+        self.timedOut = []
+
+    def add(self, function, *args, **kw):
+        """
+        Adds a call. Returns the position of the call in the results.
+
+        :param function: callable, e.g. a client method
+        :return: position
+        """
+        self.calls.append((function, args, kw))
+        return len(self.calls) - 1
+
+    def __len__(self):
+        return len(self.calls)
+
+    def run(self, deadline=None):
+        """
+        Runs all calls concurrently and waits until all calls finished or the
+        deadline is reached.
+
+        :param deadline: maximum time in seconds. default is `self.deadline`.
+        :return: list of results or exceptions in call order
+        """
+        if deadline is None:
+            deadline = self.deadline
+        pool = self.pool or sharedPool()
+        end = time.time() + deadline if deadline is not None else None
+        state = _State(len(self.calls))
+        for pos, call in enumerate(self.calls):
+            pool.submit(_Task(state, pos, call, end))
+        with state.lock:
+            while state.pending:
+                if end is None:
+                    state.lock.wait()
+                    continue
+                remaining = end - time.time()
+                if remaining <= 0:
+                    break
+                state.lock.wait(remaining)
+            state.closed = True
+            self.timedOut = [pos for pos, done in enumerate(state.done) if not done]
+            for pos in self.timedOut:
+                state.results[pos] = endpoint.DeadlineExceeded(
+                    "Call not finished within %.2fs: %s" % (deadline, _name(self.calls[pos][0])))
+            return list(state.results)
+
+
+def gather(*calls, **options):
+    """
+    Runs calls concurrently. Each call is a callable or a tuple `(function, args, kw)`
+    with optional `args` and `kw`.
+
+    :param calls: calls
+    :param deadline: maximum time in seconds for all calls
+    :param pool: Pool instance
+    :return: list of results or exceptions in call order
+    """
+    b = Batch(deadline=options.get('deadline'), pool=options.get('pool'))
+    for call in calls:
+        if callable(call):
+            b.add(call)
+            continue
+        function = call[0]
+        args = call[1] if len(call) > 1 else ()
+        kw = call[2] if len(call) > 2 else {}
+        b.add(function, *args, **kw)
+    return b.run()
+
+
+class _State(object):
+    # shared state of a running batch
+    def __init__(self, size):
+        self.lock = threading.Condition()
+        self.results = [None] * size
+        self.done = [False] * size
+        self.pending = size
+        self.closed = False
+
+
+class _Task(object):
+    # a single call executed by a pool thread
+
+    def __init__(self, state, pos, call, end):
+        self.state = state
+        self.pos = pos
+        self.call = call
+        self.end = end
+
+    def __call__(self):
+        state = self.state
+        if state.closed:
+            # deadline reached before the call started
+            return
+        function, args, kw = self.call
+        if self.end is not None and isinstance(getattr(function, '__self__', None), endpoint.Client) \
+                and not 'timeout' in kw and not 'deadline' in kw:
+            kw = dict(kw, deadline=Deadline(at=self.end))
+        try:
+            result = function(*args, **kw)
+        except Exception as e:
+            result = e
+        with state.lock:
+            if state.closed:
+                return
+            state.results[self.pos] = result
+            state.done[self.pos] = True
+            state.pending -= 1
+            state.lock.notify_all()
+
+
+def _name(function):
+    name = getattr(function, '__name__', None) or repr(function)
+    owner = getattr(function, '__self__', None)
+    if isinstance(owner, endpoint.Client):
+        name = "%s.%s" % (owner.options.get('service'), name)
+    return name
@@ -0,0 +1,205 @@
+# (c) 2013-2015 Nive GmbH - nive.io
+# This file is released under the BSD-License.
+#
+# Circuit breaker for service endpoints
+# -------------------------------------
+#
+"""
+Circuit breakers stop calling a service which fails repeatedly. Calls fail fast
+with `endpoint.CircuitOpen` instead of waiting for timeouts and retries.
+
+A breaker starts *closed*. If the share of failed or slow calls in the last `window`
+calls reaches `errorRate` the breaker *opens*. After `resetTimeout` seconds it changes
+to *half-open* and lets `probes` calls through. If these succeed the breaker closes
+again, a failure opens it again. If `pingProbe` is True the client calls the services
+`ping` method as probe instead of the first call.
+
+Breakers are created per domain and service by `CircuitBreakers` and can be shared
+by all clients in a process ::
+
+    from pynive_client import breaker
+
+    breakers = breaker.CircuitBreakers(errorRate=0.5, window=20, resetTimeout=10)
+    storage = datastore.DataStore(service='mystorage', domain='mydomain', circuitBreakers=breakers)
+    files = filestore.FileStore(service='myfiles', domain='mydomain', circuitBreakers=breakers)
+
+    # health check
+    for (domain, service), state in breakers.states().items():
+        print(domain, service, state["state"])
+
+"""
+
+import threading
+from collections import deque
+
+from pynive_client import endpoint
+from pynive_client.retry import Clock
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitBreaker(object):
+    """
+    Circuit breaker for a single service endpoint.
+    """
+
+    def __init__(self, name="", errorRate=0.5, window=20, minCalls=10, slowCall=None,
+                 resetTimeout=10.0, probes=1, pingProbe=False, clock=None):
+        """
+
+        :param name: endpoint name used in messages
+        :param errorRate: share of failed calls opening the breaker (0-1)
+        :param window: number of recent calls used to calculate the error rate
+        :param minCalls: minimum number of calls in the window before the breaker opens
+        :param slowCall: calls taking longer than `slowCall` seconds count as failure
+        :param resetTimeout: seconds before an open breaker lets probe calls through
+        :param probes: number of successful probe calls closing the breaker
+        :param pingProbe: probe with the services ping method
+        :param clock: retry.Clock instance
+        """
+        self.name = name
+        self.errorRate = errorRate
+        self.window = window
+        self.minCalls = minCalls
+        self.slowCall = slowCall
+        self.resetTimeout = resetTimeout
+        self.probes = probes
+        self.pingProbe = pingProbe
+        self.clock = clock or Clock()
+        self.state = CLOSED
+        self.openedAt = None
+        self.opened = 0
+        self.rejected = 0
+        self._calls = deque(maxlen=window)
+        self._probing = 0
+        self._probed = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Called before a service call. Raises `endpoint.CircuitOpen` if the call is not
+        allowed. Returns True if the call is a probe call.
+
+        :return: bool
+        """
+        with self._lock:
+            if self.state == OPEN:
+                if self.clock.time() - self.openedAt < self.resetTimeout:
+                    self.rejected += 1
+                    raise endpoint.CircuitOpen("Circuit open: %s" % self.name)
+                self.state = HALF_OPEN
+                self._probing = self._probed = 0
+            if self.state == HALF_OPEN:
+                if self._probing + self._probed >= self.probes:
+                    self.rejected += 1
+                    raise endpoint.CircuitOpen("Circuit half-open, waiting for probes: %s" % self.name)
+                self._probing += 1
+                return True
+            return False
+
+    def record(self, success, elapsed=None, probe=False):
+        """
+        Records the outcome of a call.
+
+        :param success: False if the call failed
+        :param elapsed: call duration in seconds
+        :param probe: True if `allow()` returned True for the call
+        """
+        if success and self.slowCall is not None and elapsed is not None and elapsed > self.slowCall:
+            success = False
+        with self._lock:
+            if probe:
+                self._probing -= 1
+                if self.state != HALF_OPEN:
+                    return
+                if not success:
+                    self._open()
+                    return
+                self._probed += 1
+                if self._probed >= self.probes:
+                    self.state = CLOSED
+                    self._calls.clear()
+                return
+            if self.state != CLOSED:
+                return
+            self._calls.append(success)
+            if len(self._calls) < max(1, self.minCalls):
+                return
+            failures = len([c for c in self._calls if not c])
+            if float(failures) / len(self._calls) >= self.errorRate:
+                self._open()
+
+    def cancel(self, probe=False):
+        """
+        Called instead of `record()` if the call was not sent to the service, e.g. because
+        of client side limits. The call does not count.
+
+        :param probe: True if `allow()` returned True for the call
+        """
+        if not probe:
+            return
+        with self._lock:
+            self._probing -= 1
+
+    def reset(self):
+        """
+        Closes the breaker.
+        """
+        with self._lock:
+            self.state = CLOSED
+            self._calls.clear()
+            self._probing = self._probed = 0
+
+    def status(self):
+        """
+        :return: dict {state, calls, failures, openedAt, opened, rejected}
+        """
+        with self._lock:
+            return dict(state=self.state,
+                        calls=len(self._calls),
+                        failures=len([c for c in self._calls if not c]),
+                        openedAt=self.openedAt,
+                        opened=self.opened,
+                        rejected=self.rejected)
+
+    def _open(self):
+        self.state = OPEN
+        self.openedAt = self.clock.time()
+        self.opened += 1
+        self._calls.clear()
+
+
+
+class CircuitBreakers(object):
+    """
+    Registry of circuit breakers per (domain, service). All keyword arguments are passed
+    to new `CircuitBreaker` instances.
+    """
+
+    def __init__(self, **settings):
+        self.settings = settings
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, domain, service):
+        """
+        Returns the breaker for the service endpoint. The breaker is created if it does
+        not exist.
+        """
+        key = (domain, service)
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = CircuitBreaker(name="%s/%s" % key, **self.settings)
+                self._breakers[key] = breaker
+            return breaker
+
+    def states(self):
+        """
+        :return: dict {(domain, service): status dict}
+        """
+        with self._lock:
+            breakers = list(self._breakers.items())
+        return dict([(key, breaker.status()) for key, breaker in breakers])
@@ -0,0 +1,148 @@
+# (c) 2013-2015 Nive GmbH - nive.io
+# This file is released under the BSD-License.
+#
+# Request coalescing for concurrent read calls
+# --------------------------------------------
+#
+"""
+`SingleFlight` combines identical concurrent read calls. The first call is sent to
+the service, calls with the same url, payload, request settings and auth token
+started while the first call is in flight wait for it and receive the same result
+or exception. Waiting calls raise `endpoint.DeadlineExceeded` if their own deadline
+passes first ::
+
+    from pynive_client import coalesce
+
+    flight = coalesce.SingleFlight()
+    storage = datastore.DataStore(service='mystorage', domain='mydomain', singleFlight=flight)
+
+Calls are only combined for the read methods listed in `methods`. Parsed results
+are shared between all waiting callers and should be treated as read only.
+A single instance can be used by multiple clients.
+"""
+
+import json
+import threading
+
+from pynive_client.endpoint import DeadlineExceeded
+
+
+class SingleFlight(object):
+    """
+    Shares in flight calls between threads.
+    """
+
+    # service methods which can be combined. a leading `@` of filestore methods is ignored.
+    methods = frozenset((
+        'getItem', 'list', 'keys', 'allowed', 'getPermissions', 'getOwner', 'ping',
+        'identity', 'name', 'profile', 'authenticated', 'getUser', 'identities',
+    ))
+
+    def __init__(self, methods=None):
+        """
+
+        :param methods: set of service method names to combine
+        """
+        if methods is not None:
+            self.methods = frozenset(methods)
+        self.calls = 0
+        self.shared = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def key(self, client, method, values, reqSettings, extendedPath=None):
+        """
+        Returns the key identifying identical calls or None if the call can not be combined.
+
+        :param client: endpoint.Client instance
+        :param method: service method name
+        :param values: payload
+        :param reqSettings: request settings
+        :param extendedPath: path
+        :return: tuple or None
+        """
+        name = method or ''
+        if name.startswith('@'):
+            name = name[1:]
+        if not name in self.methods:
+            return None
+        if not isinstance(values, (dict, list, tuple)) or reqSettings.get('stream'):
+            return None
+        try:
+            payload = json.dumps(values, sort_keys=True)
+            # calls with different deadlines are combined
+            settings = dict([(k, v) for k, v in reqSettings.items() if k != 'deadline'])
+            settings = json.dumps(settings, sort_keys=True, default=repr)
+        except (TypeError, ValueError):
+            return None
+        token = getattr(client.session, 'authtoken', None) or client.options.get('auth')
+        if client.tokenManager is not None:
+            token = id(client.tokenManager)
+        return (client.url(method=method, extendedPath=extendedPath), payload, settings, token)
+
+    def do(self, key, function, *args, **options):
+        """
+        Calls `function(*args)` or waits for the running call with the same key.
+
+        :param key: call key returned by `key()`
+        :param function: function sending the call
+        :param deadline: deadline.Deadline of the call. limits the time waiting for the running call.
+        :return: the result of `function`
+        """
+        flight, leader = self._join(key)
+        if not leader:
+            deadline = options.get('deadline')
+            if not flight.done.wait(self._remaining(deadline)):
+                raise DeadlineExceeded(self._deadlineMessage(key))
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = function(*args)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            self._leave(key)
+            flight.done.set()
+        return flight.result
+
+    def stats(self):
+        """
+        :return: dict {calls, shared, inFlight}
+        """
+        with self._lock:
+            return dict(calls=self.calls, shared=self.shared, inFlight=len(self._flights))
+
+    def _remaining(self, deadline):
+        if deadline is None:
+            return None
+        return max(0.0, deadline.remaining())
+
+    def _deadlineMessage(self, key):
+        return "Call not finished within deadline: %s" % key[0]
+
+    def _join(self, key):
+        with self._lock:
+            self.calls += 1
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.shared += 1
+                return flight, False
+            flight = self._flights[key] = self._flight()
+            return flight, True
+
+    def _leave(self, key):
+        with self._lock:
+            del self._flights[key]
+
+    def _flight(self):
+        return _Flight(threading.Event())
+
+
+class _Flight(object):
+    # a call in flight
+    def __init__(self, done):
+        self.done = done
+        self.result = None
+        self.error = None
@@ -0,0 +1,136 @@
+# (c) 2013-2015 Nive GmbH - nive.io
+# This file is released under the BSD-License.
+#
+# JSON codecs for request and response bodies
+# -------------------------------------------
+#
+"""
+Clients encode request payloads and decode json responses with a codec. By default
+the fastest installed package is used: `orjson`, `ujson` or the standard library
+`json` module. Codecs encode to utf-8 bytes and decode bytes or strings ::
+
+    from pynive_client import codec
+
+    storage = datastore.DataStore(service='mystorage', domain='mydomain', codec='json')
+    print(storage.codec.name)
+    print(codec.available())
+
+Values the optional packages can not encode (e.g. integers out of 64 bit range) are
+encoded with the standard library.
+
+See `benchmarks/codec.py` to compare the codecs.
+"""
+
+import json
+
+# python 2/3
+try:
+    unicode
+except NameError:
+    unicode = str
+
+
+class JsonCodec(object):
+    """
+    Standard library codec.
+    """
+    name = "json"
+
+    def dumps(self, values):
+        """
+        Encodes values as utf-8 json bytes.
+        """
+        data = json.dumps(values, separators=(',', ':'), ensure_ascii=False)
+        if isinstance(data, unicode):
+            data = data.encode('utf-8')
+        return data
+
+    def loads(self, data):
+        """
+        Decodes json bytes or strings.
+        """
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        return json.loads(data)
+
+
+class OrjsonCodec(JsonCodec):
+    """
+    `orjson` based codec. orjson encodes directly to bytes.
+    """
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+        self._dumps = orjson.dumps
+        self._loads = orjson.loads
+        self._options = orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, values):
+        try:
+            return self._dumps(values, option=self._options)
+        except TypeError:
+            return JsonCodec.dumps(self, values)
+
+    def loads(self, data):
+        return self._loads(data)
+
+
+class UjsonCodec(JsonCodec):
+    """
+    `ujson` based codec.
+    """
+    name = "ujson"
+
+    def __init__(self):
+        import ujson
+        self._dumps = ujson.dumps
+        self._loads = ujson.loads
+
+    def dumps(self, values):
+        try:
+            data = self._dumps(values, ensure_ascii=False)
+        except (TypeError, OverflowError):
+            return JsonCodec.dumps(self, values)
+        return data.encode('utf-8')
+
+    def loads(self, data):
+        return self._loads(data)
+
+
+# codecs in order of preference
+codecs = (OrjsonCodec, UjsonCodec, JsonCodec)
+
+
+def available():
+    """
+    Returns the names of the installed codecs in order of preference.
+
+    :return: list
+    """
+    names = []
+    for cls in codecs:
+        try:
+            cls()
+        except ImportError:
+            continue
+        names.append(cls.name)
+    return names
+
+
+def getCodec(name=None):
+    """
+    Returns a codec instance. If `name` is None the first installed codec is returned.
+
+    :param name: json, orjson, ujson or None
+    :return: codec
+    """
+    for cls in codecs:
+        if name is not None and cls.name != name:
+            continue
+        try:
+            return cls()
+        except ImportError:
+            if name is not None:
+                raise
+    raise ValueError("Unknown codec: %s" % name)
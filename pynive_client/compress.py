@@ -0,0 +1,122 @@
+# (c) 2013-2015 Nive GmbH - nive.io
+# This file is released under the BSD-License.
+#
+# Request body compression
+# ------------------------
+#
+"""
+Optional gzip or deflate compression of request bodies. Bodies larger than
+`threshold` bytes are compressed and sent with a `Content-Encoding` header ::
+
+    from pynive_client import compress
+
+    compression = compress.Compression(encoding='gzip', threshold=2048, disabled=('myfiles',))
+    storage = datastore.DataStore(service='mystorage', domain='mydomain', compression=compression)
+
+Compression can be disabled per service by `disabled` or `disable()`. If a service
+responds `415 Unsupported Media Type` to a compressed request, compression is
+disabled for the service and the request is sent again uncompressed.
+
+Streamed bodies are never compressed. Responses are decompressed by the http
+adapter. `stats.Statistics` records wire and decoded response sizes.
+"""
+
+import threading
+import zlib
+
+
+class Compression(object):
+    """
+    Compresses request bodies. Instances can be shared by multiple clients.
+    """
+
+    encodings = ('gzip', 'deflate')
+
+    def __init__(self, encoding='gzip', threshold=1024, level=6, disabled=None):
+        """
+
+        :param encoding: gzip or deflate
+        :param threshold: minimum body size in bytes
+        :param level: zlib compression level 1-9
+        :param disabled: names of services not supporting compressed requests
+        """
+        if not encoding in self.encodings:
+            raise ValueError("Unsupported encoding: %s" % encoding)
+        self.encoding = encoding
+        self.threshold = threshold
+        self.level = level
+        self.disabled = set(disabled or ())
+        self.requests = self.compressed = 0
+        self.bytesIn = self.bytesOut = 0
+        self._lock = threading.Lock()
+
+    def supports(self, service):
+        """
+        Returns False if compression is disabled for the service.
+        """
+        return not service in self.disabled
+
+    def disable(self, service):
+        with self._lock:
+            self.disabled.add(service)
+
+    def enable(self, service):
+        with self._lock:
+            self.disabled.discard(service)
+
+    def compress(self, data):
+        """
+        Compresses the body with the configured encoding.
+
+        :param data: bytes
+        :return: bytes
+        """
+        if self.encoding == 'gzip':
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        else:
+            # http deflate is the zlib format
+            compressor = zlib.compressobj(self.level)
+        return compressor.compress(data) + compressor.flush()
+
+    def apply(self, service, req):
+        """
+        Compresses `req['data']` and sets the `Content-Encoding` header if the body is
+        larger than `threshold`, the service supports compression and the compressed
+        body is smaller.
+
+        :param service: service name
+        :param req: request settings
+        :return: the uncompressed body or None if the body is unchanged
+        """
+        data = req.get('data')
+        if not isinstance(data, bytes) or len(data) < self.threshold or not self.supports(service):
+            return None
+        body = self.compress(data)
+        with self._lock:
+            self.requests += 1
+            if len(body) >= len(data):
+                return None
+            self.compressed += 1
+            self.bytesIn += len(data)
+            self.bytesOut += len(body)
+        req['data'] = body
+        req['headers']['Content-Encoding'] = self.encoding
+        return data
+
+    def restore(self, req, data):
+        """
+        Resets the request settings to the uncompressed body returned by `apply()`.
+        """
+        req['data'] = data
+        req['headers'].pop('Content-Encoding', None)
+
+    def stats(self):
+        """
+        :return: dict {requests, compressed, bytesIn, bytesOut, disabled}
+        """
+        with self._lock:
+            return dict(requests=self.requests,
+                        compressed=self.compressed,
+                        bytesIn=self.bytesIn,
+                        bytesOut=self.bytesOut,
+                        disabled=sorted(self.disabled))
@@ -0,0 +1,304 @@
+# (c) 2013-2015 Nive GmbH - nive.io
+# This file is released under the BSD-License.
+#
+# Adaptive concurrency limits for service endpoints
+# -------------------------------------------------
+#
+"""
+Concurrency limiters restrict the number of requests sent to a service at the same
+time. The limit adapts to the service (AIMD): it grows by `increase` per `limit`
+successful requests and is multiplied by `decrease` if the service signals overload.
+Overload signals are responses with `overloadCodes` (503, 413, 429), timeouts and,
+if `latencyTolerance` is set, requests taking longer than `latencyTolerance` times
+the lowest latency of the previous `window` requests.
+
+Requests above the limit wait in a first come first served queue. If a request waits
+longer than `maxWait` seconds or more than `maxQueue` requests are waiting the call
+raises `endpoint.ConcurrencyLimitExceeded`. Limiters can be shared by blocking and
+asyncio clients (see `aio.concurrency.acquire()`) and threads.
+
+Limiters are created per domain and service by `ConcurrencyLimiters` ::
+
+    from pynive_client import concurrency
+
+    limiters = concurrency.ConcurrencyLimiters(initial=10, maxLimit=50, maxWait=5)
+    storage = datastore.DataStore(service='mystorage', domain='mydomain', concurrencyLimiters=limiters)
+
+    for (domain, service), state in limiters.states().items():
+        print(domain, service, state["limit"], state["inflight"], state["waiting"])
+
+The limit applies to each http attempt. Retry delays do not occupy a slot. For
+streamed responses the slot is released when the response headers are received.
+"""
+
+import threading
+from collections import deque
+
+from pynive_client.retry import Clock
+
+
+class ConcurrencyLimiter(object):
+    """
+    AIMD concurrency limit for a single service endpoint.
+    """
+
+    overloadCodes = (503, 413, 429)
+
+    def __init__(self, name="", initial=10, minLimit=1, maxLimit=100, increase=1.0, decrease=0.7,
+                 latencyTolerance=None, window=100, maxWait=None, maxQueue=None, overloadCodes=None,
+                 clock=None):
+        """
+
+        :param name: endpoint name used in messages
+        :param initial: initial limit
+        :param minLimit: minimum limit
+        :param maxLimit: maximum limit
+        :param increase: limit increase per `limit` successful requests
+        :param decrease: limit multiplier on overload (0-1)
+        :param latencyTolerance: requests slower than the minimum latency times this value signal overload
+        :param window: number of requests used to measure the minimum latency
+        :param maxWait: maximum time in seconds a request waits for a free slot
+        :param maxQueue: maximum number of waiting requests
+        :param overloadCodes: response codes signaling overload
+        :param clock: retry.Clock instance
+        """
+        self.name = name
+        self.limit = float(initial)
+        self.minLimit = minLimit
+        self.maxLimit = maxLimit
+        self.increase = increase
+        self.decrease = decrease
+        self.latencyTolerance = latencyTolerance
+        self.window = window
+        self.maxWait = maxWait
+        self.maxQueue = maxQueue
+        if overloadCodes is not None:
+            self.overloadCodes = overloadCodes
+        self.clock = clock or Clock()
+        self.inflight = 0
+        self.maxInflight = 0
+        self.maxWaiting = 0
+        self.requests = self.overloads = self.decreases = self.rejected = 0
+        self.waitTime = 0.0
+        self.minLatency = None
+        self._windowMin = None
+        self._samples = 0
+        self._lastDecrease = None
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    @property
+    def waiting(self):
+        return len(self._waiters)
+
+    def current(self):
+        """
+        Returns the current limit as integer.
+        """
+        return max(self.minLimit, int(self.limit))
+
+    def acquire(self, timeout=None):
+        """
+        Waits for a free slot. Returns a ticket to be passed to `release()` or None if
+        no slot was free within `timeout` or `maxWait` seconds or the queue is full.
+
+        :param timeout: maximum wait in seconds
+        :return: ticket or None
+        """
+        waiter = self._enqueue(None)
+        if waiter is None or waiter is False:
+            return self._ticket(waiter)
+        waiter.event.wait(self._maxWait(timeout))
+        return self._ticket(self._dequeue(waiter))
+
+    def release(self, ticket, overload=False):
+        """
+        Frees the slot and adjusts the limit.
+
+        :param ticket: value returned by `acquire()`
+        :param overload: True if the service signaled overload. None if the request
+            failed for other reasons and is not used to adjust the limit.
+        """
+        now = self.clock.time()
+        with self._lock:
+            inflight = self.inflight
+            self.inflight -= 1
+            if ticket is not None and overload is not None:
+                if not overload and self.latencyTolerance:
+                    overload = self._slow(now - ticket.started)
+                if overload:
+                    self.overloads += 1
+                    # one decrease per overload period: requests started before the last
+                    # decrease are ignored
+                    if self._lastDecrease is None or ticket.started >= self._lastDecrease:
+                        self.limit = max(float(self.minLimit), self.limit * self.decrease)
+                        self._lastDecrease = now
+                        self.decreases += 1
+                elif inflight * 2 >= self.limit:
+                    # only grow if the limit is used
+                    self.limit = min(float(self.maxLimit), self.limit + self.increase / self.limit)
+            self._grant()
+
+    def overload(self, response):
+        """
+        Returns True if the response signals overload.
+        """
+        return response.status_code in self.overloadCodes
+
+    def status(self):
+        """
+        :return: dict {limit, inflight, waiting, maxInflight, maxWaiting, requests, overloads,
+            decreases, rejected, waitTime, minLatency}
+        """
+        with self._lock:
+            return dict(limit=self.current(),
+                        inflight=self.inflight,
+                        waiting=len(self._waiters),
+                        maxInflight=self.maxInflight,
+                        maxWaiting=self.maxWaiting,
+                        requests=self.requests,
+                        overloads=self.overloads,
+                        decreases=self.decreases,
+                        rejected=self.rejected,
+                        waitTime=self.waitTime,
+                        minLatency=self.minLatency)
+
+    def _maxWait(self, timeout):
+        if self.maxWait is None:
+            return timeout
+        if timeout is None:
+            return self.maxWait
+        return min(timeout, self.maxWait)
+
+    def _enqueue(self, loop):
+        # takes a free slot (returns None) or appends a waiter. returns False if the queue
+        # is full.
+        with self._lock:
+            if not self._waiters and self.inflight < self.current():
+                self._take()
+                return None
+            if self.maxQueue is not None and len(self._waiters) >= self.maxQueue:
+                self.rejected += 1
+                return False
+            waiter = _Waiter(loop, self.clock.time())
+            self._waiters.append(waiter)
+            if len(self._waiters) > self.maxWaiting:
+                self.maxWaiting = len(self._waiters)
+            return waiter
+
+    def _dequeue(self, waiter):
+        # returns True if the waiter got a slot. removes waiters not served in time.
+        with self._lock:
+            self.waitTime += self.clock.time() - waiter.queued
+            if waiter.granted:
+                return True
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+            self.rejected += 1
+            return False
+
+    def _ticket(self, waiter):
+        # None (free slot) or True (granted) acquired a slot
+        if waiter is None or waiter is True:
+            return _Ticket(self.clock.time())
+        return None
+
+    def _take(self):
+        self.inflight += 1
+        self.requests += 1
+        if self.inflight > self.maxInflight:
+            self.maxInflight = self.inflight
+
+    def _grant(self):
+        # hands free slots to waiting requests in order. called with lock held.
+        while self._waiters and self.inflight < self.current():
+            waiter = self._waiters.popleft()
+            self._take()
+            waiter.grant()
+
+    def _slow(self, elapsed):
+        # tracks the minimum latency per window. requests are compared with the minimum
+        # of the previous window, in the first window with the minimum so far.
+        baseline = self.minLatency
+        if self._windowMin is None or elapsed < self._windowMin:
+            self._windowMin = elapsed
+        if baseline is None:
+            baseline = self._windowMin
+        self._samples += 1
+        if self._samples >= self.window:
+            self.minLatency = self._windowMin
+            self._samples = 0
+            self._windowMin = None
+        if not baseline:
+            return False
+        return elapsed > baseline * self.latencyTolerance
+
+
+
+class ConcurrencyLimiters(object):
+    """
+    Registry of concurrency limiters per (domain, service). All keyword arguments are
+    passed to new `ConcurrencyLimiter` instances.
+    """
+
+    def __init__(self, **settings):
+        self.settings = settings
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def get(self, domain, service):
+        """
+        Returns the limiter for the service endpoint. The limiter is created if it does
+        not exist.
+        """
+        key = (domain, service)
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                limiter = ConcurrencyLimiter(name="%s/%s" % key, **self.settings)
+                self._limiters[key] = limiter
+            return limiter
+
+    def states(self):
+        """
+        :return: dict {(domain, service): status dict}
+        """
+        with self._lock:
+            limiters = list(self._limiters.items())
+        return dict([(key, limiter.status()) for key, limiter in limiters])
+
+
+
+class _Ticket(object):
+    # a slot taken by a request
+    __slots__ = ('started',)
+
+    def __init__(self, started):
+        self.started = started
+
+
+class _Waiter(object):
+    # a request waiting for a slot. threads wait for `event`, coroutines for `future`.
+
+    def __init__(self, loop, queued):
+        self.queued = queued
+        self.granted = False
+        self.loop = loop
+        if loop is None:
+            self.event = threading.Event()
+        else:
+            self.future = loop.create_future()
+
+    def grant(self):
+        self.granted = True
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(True)
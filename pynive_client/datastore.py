@@ -54,6 +54,13 @@ Retrieve a security token and add, update, get and remove a item
 
 """
 
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from pynive_client import batch
 from pynive_client import endpoint
 
 
@@ -63,12 +70,13 @@ class DataStore(endpoint.Client):
     pingurl='ping'
 
 
-    def __init__(self, service, domain=None, session=None, **options):
+    def __init__(self, service, domain=None, session=None, cache=None, **options):
         """
 
         :param service: data storage instance name
         :param domain: domain the service is part of
         :param session: http session object
+        :param cache: optional `ItemCache` instance used by `getItem()`
         :param options: other endpoint options. see endpoint.py.
         """
         super(DataStore, self).__init__(service=service,
@@ -77,6 +85,7 @@ class DataStore(endpoint.Client):
                                       **options)
         if not "version" in self.options:
             self.options["version"] = self.default_version
+        self.cache = cache
 
 
     def getItem(self, key=None, owner=None, id=None, **reqSettings):
@@ -88,6 +97,15 @@ class DataStore(endpoint.Client):
         :param reqSettings:
         :return: dict
         """
+        cache = self.cache
+        if cache is not None and not isinstance(key, (list,tuple)) and not isinstance(id, (list,tuple)):
+            cachekey = (key, owner, id)
+            result = cache.get(cachekey)
+            if result is not None:
+                return result
+            version = cache.version()
+        else:
+            cachekey = None
         values = dict()
         if key is not None:
             values["key"] = key
@@ -96,10 +114,13 @@ class DataStore(endpoint.Client):
         if id is not None:
             values["id"] = id
         content, response = self.call('getItem', values, reqSettings)
-        return endpoint.Result(items=content.get('items'),
-                               result=content.get('result',0),
-                               message=content.get('message',()),
-                               response=response)
+        result = endpoint.Result(items=content.get('items'),
+                                 result=content.get('result',0),
+                                 message=content.get('message',()),
+                                 response=response)
+        if cachekey is not None and result.items:
+            cache.set(cachekey, result, version=version)
+        return result
 
 
     def newItem(self, items=None, key=None, value=None, owner=None, **reqSettings):
@@ -122,7 +143,11 @@ class DataStore(endpoint.Client):
                 values["value"] = value
             if owner is not None:
                 values["owner"] = owner
-        content, response = self.call('newItem', values, reqSettings)
+        try:
+            content, response = self.call('newItem', values, reqSettings)
+        finally:
+            if self.cache is not None:
+                self.cache.invalidate(values)
         return endpoint.Result(result=content.get('result'),
                                success=content.get('success',()),
                                invalid=content.get('invalid',()),
@@ -152,7 +177,11 @@ class DataStore(endpoint.Client):
             values["value"] = value
         if id is not None:
             values["id"] = id
-        content, response = self.call('setItem', values, reqSettings)
+        try:
+            content, response = self.call('setItem', values, reqSettings)
+        finally:
+            if self.cache is not None:
+                self.cache.invalidate(values)
         return endpoint.Result(result=content.get('result'),
                                success=content.get('success',()),
                                invalid=content.get('invalid',()),
@@ -191,13 +220,74 @@ class DataStore(endpoint.Client):
                 values["items"] = self.toItems(ids=id, owner=owner)
             else:
                 values["id"] = id
-        content, response = self.call('removeItem', values, reqSettings)
+        try:
+            content, response = self.call('removeItem', values, reqSettings)
+        finally:
+            if self.cache is not None:
+                self.cache.invalidate(values)
         return endpoint.Result(result=content.get('result'),
                                success=content.get('success',()),
                                message=content.get('message',()),
                                response=response)
 
 
+    def bulk(self, method, items, size=500, maxBytes=500000, workers=4, **reqSettings):
+        """
+        Stores or removes a large number of items. `items` are split into chunks of
+        at most `size` items and `maxBytes` json encoded bytes. The chunks are sent
+        concurrently by `workers` threads.
+
+        If the service rejects a chunk as too large (`ServiceLimits`) the chunk is split
+        and resent. The chunk size for all following chunks is reduced as well.
+
+        Chunks failing with other errors are not resent. The items of failed chunks are
+        returned as `failed` and the error messages are added to `message`.
+
+        :param method: newItem, setItem or removeItem
+        :param items: list of items
+        :param size: maximum number of items per chunk
+        :param maxBytes: maximum json size per chunk
+        :param workers: number of concurrent requests
+        :param reqSettings:
+        :return: Result(result, success, invalid, failed, message, chunks)
+        """
+        if not method in ('newItem', 'setItem', 'removeItem'):
+            raise ValueError('Invalid bulk method: %s' % method)
+        if isinstance(items, dict):
+            items = [items]
+        call = getattr(self, method)
+        chunks = _Chunks(items, size, maxBytes, self.codec.dumps)
+
+        def worker():
+            while True:
+                chunk = chunks.next()
+                if chunk is None:
+                    return
+                pos, part = chunk
+                settings = dict(reqSettings)
+                if settings.get('headers'):
+                    settings['headers'] = dict(settings['headers'])
+                try:
+                    result = call(items=part, **settings)
+                except endpoint.ServiceLimits as e:
+                    if len(part) > 1:
+                        self.log.warning("Bulk chunk too large (413). Resending %d items in smaller chunks." % len(part))
+                        chunks.retry(pos, part)
+                        continue
+                    chunks.done(pos, part, error=e)
+                except Exception as e:
+                    chunks.done(pos, part, error=e)
+                else:
+                    chunks.done(pos, part, result=result)
+
+        pool = batch.Pool(workers=max(1, workers))
+        try:
+            batch.gather(*[worker] * pool.workers, pool=pool)
+        finally:
+            pool.close()
+        return chunks.result()
+
+
     def list(self, key=None, sort=None, order=None, size=None, start=None, owner=None, **reqSettings):
         """
 
@@ -224,7 +314,6 @@ class DataStore(endpoint.Client):
         if owner is not None:
             values["owner"] = owner
         content, response = self.call('list', values, reqSettings)
-        # todo result set class with iterator
         if not content:
             return endpoint.Result(items=(), start=1, size=0, response=response)
         return endpoint.Result(response=response, **content)
@@ -250,12 +339,52 @@ class DataStore(endpoint.Client):
         if owner is not None:
             values["owner"] = owner
         content, response = self.call('keys', values, reqSettings)
-        # todo result set class with iterator
         if not content:
             return endpoint.Result(keys=(), start=1, size=0, response=response)
         return endpoint.Result(response=response, **content)
 
 
+    def iterList(self, key=None, sort=None, order=None, size=100, start=1, owner=None, prefetch=False, **reqSettings):
+        """
+        Iterates all items of the result set. Pages of `size` items are loaded on demand.
+        See `endpoint.iterPages()`.
+
+        :param key:
+        :param sort:
+        :param order:
+        :param size: page size
+        :param start:
+        :param owner:
+        :param prefetch: load the next page in a background thread
+        :param reqSettings:
+        :return: item iterator
+        """
+        def load(start, size):
+            result = self.list(key=key, sort=sort, order=order, size=size, start=start,
+                               owner=owner, **dict(reqSettings))
+            return result.get('items') or (), result.get('total')
+        return endpoint.iterPages(load, start=start, size=size, prefetch=prefetch)
+
+
+    def iterKeys(self, order=None, size=100, start=1, owner=None, prefetch=False, **reqSettings):
+        """
+        Iterates all keys. Pages of `size` keys are loaded on demand.
+        See `endpoint.iterPages()`.
+
+        :param order:
+        :param size: page size
+        :param start:
+        :param owner:
+        :param prefetch: load the next page in a background thread
+        :param reqSettings:
+        :return: key iterator
+        """
+        def load(start, size):
+            result = self.keys(order=order, size=size, start=start, owner=owner, **dict(reqSettings))
+            return result.get('keys') or (), result.get('total')
+        return endpoint.iterPages(load, start=start, size=size, prefetch=prefetch)
+
+
     def allowed(self, permissions, **reqSettings):
         """
 
@@ -329,7 +458,11 @@ class DataStore(endpoint.Client):
             values["owner"] = owner
         if id is not None:
             values["id"] = id
-        content, response = self.call('setOwner', values, reqSettings)
+        try:
+            content, response = self.call('setOwner', values, reqSettings)
+        finally:
+            if self.cache is not None:
+                self.cache.invalidate(values)
         return endpoint.Result(response=response, **content)
 
 
@@ -355,4 +488,287 @@ class DataStore(endpoint.Client):
                 for id in ids:
                     item = dict(id=id, owner=owner)
                     items.append(item)
-        return items
\ No newline at end of file
+        return items
+
+
+
+class ItemCache(object):
+    """
+    Size limited in process cache for `DataStore.getItem()` results. Pass a cache
+    instance to `DataStore` to activate caching ::
+
+        storage = DataStore(service='mystorage', domain='mydomain', cache=ItemCache(size=5000, ttl=30))
+
+    Results are cached by `(key, owner, id)`. Entries expire after `ttl` seconds, if the
+    cache is full the least recently used entry is removed. `setItem()`, `removeItem()`
+    and `setOwner()` remove all entries of the changed keys and ids. Changes made by other
+    clients are only visible after the entries have expired.
+
+    Results loaded while one of their keys or ids is changed by this process are not
+    cached. `get()` returns a copy of the cached result, so callers can change results.
+
+    The cache ignores the auth-token. Use a separate cache instance for each identity.
+    The cache can be shared by multiple `DataStore` instances and threads.
+    """
+
+    def __init__(self, size=1000, ttl=60, clock=time.time):
+        """
+
+        :param size: maximum number of cached results
+        :param ttl: default time to live in seconds
+        :param clock: time function
+        """
+        self.size = size
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = self.misses = self.evictions = self.expired = 0
+        self._entries = OrderedDict()
+        self._keys = {}
+        self._ids = {}
+        # invalidation counter and the counter value of the last invalidation per key and id
+        self._version = 0
+        self._invalidated = {}
+        self._floor = 0
+        self._lock = threading.Lock()
+
+    def version(self):
+        """
+        Returns the current invalidation counter. Pass the value read before loading a
+        result to `set()`.
+        """
+        with self._lock:
+            return self._version
+
+    def get(self, cachekey):
+        """
+        Returns a copy of the cached result or None.
+        """
+        with self._lock:
+            entry = self._entries.get(cachekey)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= self.clock():
+                self._remove(cachekey)
+                self.expired += 1
+                self.misses += 1
+                return None
+            # move to the end of the lru order
+            del self._entries[cachekey]
+            self._entries[cachekey] = entry
+            self.hits += 1
+            result = entry[1]
+        return _copyResult(result)
+
+    def set(self, cachekey, result, ttl=None, version=None):
+        """
+        Caches a copy of a getItem() result. The result is not cached if one of its keys
+        or ids has been invalidated after `version` was read.
+
+        :param cachekey: (key, owner, id)
+        :param result: Result
+        :param ttl: time to live in seconds. default is `self.ttl`.
+        :param version: value of `version()` before the result was loaded
+        :return: True if cached
+        """
+        expires = self.clock() + (ttl if ttl is not None else self.ttl)
+        keys = set([cachekey[0]])
+        ids = set([cachekey[2]])
+        for item in result.get('items') or ():
+            if isinstance(item, dict):
+                keys.add(item.get('key'))
+                ids.add(item.get('id'))
+        keys.discard(None)
+        ids.discard(None)
+        result = _copyResult(result)
+        with self._lock:
+            if version is not None and self._stale(version, keys, ids):
+                return False
+            if cachekey in self._entries:
+                self._remove(cachekey)
+            self._entries[cachekey] = (expires, result, keys, ids)
+            for key in keys:
+                self._keys.setdefault(key, set()).add(cachekey)
+            for id in ids:
+                self._ids.setdefault(id, set()).add(cachekey)
+            while len(self._entries) > self.size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return True
+
+    def invalidate(self, values):
+        """
+        Removes all entries for the keys and ids in `values`. `values` is the payload
+        of a newItem, setItem, removeItem or setOwner call.
+
+        :param values: dict {key, id, items}
+        """
+        items = values.get('items')
+        if isinstance(items, dict):
+            items = [items]
+        items = list(items or ())
+        items.append(values)
+        with self._lock:
+            self._version += 1
+            if len(self._invalidated) > self.size * 10:
+                # results loaded before are not cached
+                self._invalidated.clear()
+                self._floor = self._version
+            for item in items:
+                if not isinstance(item, dict):
+                    continue
+                key, id = item.get('key'), item.get('id')
+                if key is not None:
+                    self._invalidated[('key', key)] = self._version
+                if id is not None:
+                    self._invalidated[('id', id)] = self._version
+                for cachekey in list(self._keys.get(key, ())):
+                    self._remove(cachekey)
+                for cachekey in list(self._ids.get(id, ())):
+                    self._remove(cachekey)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys.clear()
+            self._ids.clear()
+
+    def stats(self):
+        """
+        :return: dict {size, hits, misses, evictions, expired}
+        """
+        with self._lock:
+            return dict(size=len(self._entries), hits=self.hits, misses=self.misses,
+                        evictions=self.evictions, expired=self.expired)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _stale(self, version, keys, ids):
+        # True if one of the keys or ids has been invalidated after `version`
+        if version < self._floor:
+            return True
+        invalidated = self._invalidated
+        for key in keys:
+            if invalidated.get(('key', key), 0) > version:
+                return True
+        for id in ids:
+            if invalidated.get(('id', id), 0) > version:
+                return True
+        return False
+
+    def _remove(self, cachekey):
+        expires, result, keys, ids = self._entries.pop(cachekey)
+        for key in keys:
+            refs = self._keys.get(key)
+            refs.discard(cachekey)
+            if not refs:
+                del self._keys[key]
+        for id in ids:
+            refs = self._ids.get(id)
+            refs.discard(cachekey)
+            if not refs:
+                del self._ids[id]
+
+
+
+def _copyResult(result):
+    # copy of a cached result. values are copied, the response is shared.
+    values = result.toDict()
+    response = values.pop('response', None)
+    return endpoint.Result(response=response, **copy.deepcopy(values))
+
+
+
+class _Chunks(object):
+    # thread safe chunk queue for `DataStore.bulk()`. splits items by count and json
+    # size and collects the results of the chunks.
+
+    def __init__(self, items, size, maxBytes, dumps=json.dumps):
+        self.items = items
+        self.dumps = dumps
+        self.size = max(1, size)
+        self.maxBytes = maxBytes
+        self.pos = 0
+        self.retries = []
+        self.pending = 0
+        self.results = []
+        self.lock = threading.Condition()
+
+    def next(self):
+        # returns (position, items) or None if all items are sent
+        with self.lock:
+            while True:
+                if self.retries:
+                    pos, part = self.retries.pop()
+                    if len(part) > self.size:
+                        # the chunk size has been reduced again in the meantime
+                        self.retries.append((pos + self.size, part[self.size:]))
+                        part = part[:self.size]
+                    break
+                if self.pos < len(self.items):
+                    pos = self.pos
+                    part = self._take(pos)
+                    break
+                if not self.pending:
+                    return None
+                # wait for running chunks. these might be resent.
+                self.lock.wait()
+            self.pending += 1
+            return pos, part
+
+    def retry(self, pos, part):
+        # chunk too large. reduce the chunk size and resend the items.
+        with self.lock:
+            self.size = max(1, min(self.size, len(part) // 2))
+            while part:
+                self.retries.append((pos, part[:self.size]))
+                pos += self.size
+                part = part[self.size:]
+            self.pending -= 1
+            self.lock.notify_all()
+
+    def done(self, pos, part, result=None, error=None):
+        with self.lock:
+            self.results.append((pos, part, result, error))
+            self.pending -= 1
+            self.lock.notify_all()
+
+    def result(self):
+        total = 0
+        success = []
+        invalid = []
+        failed = []
+        message = []
+        for pos, part, result, error in sorted(self.results, key=lambda r: r[0]):
+            if error is not None:
+                failed.extend(part)
+                message.append(str(error))
+                continue
+            total += result.get('result') or 0
+            success.extend(result.get('success') or ())
+            invalid.extend(result.get('invalid') or ())
+            msgs = result.get('message')
+            if isinstance(msgs, (list, tuple)):
+                message.extend(msgs)
+            elif msgs:
+                message.append(msgs)
+        return endpoint.Result(result=total,
+                               success=success,
+                               invalid=invalid,
+                               failed=failed,
+                               message=message,
+                               chunks=len(self.results))
+
+    def _take(self, pos):
+        # next chunk limited by count and json size
+        end = min(pos + self.size, len(self.items))
+        if self.maxBytes:
+            length = 1
+            for i in range(pos, end):
+                length += len(self.dumps(self.items[i])) + 1
+                if length > self.maxBytes and i > pos:
+                    end = i
+                    break
+        self.pos = end
+        return self.items[pos:end]
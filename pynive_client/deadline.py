@@ -0,0 +1,90 @@
+# (c) 2013-2015 Nive GmbH - nive.io
+# This file is released under the BSD-License.
+#
+# Per call deadlines
+# ------------------
+#
+"""
+A `Deadline` limits the total time of a call including all retry attempts, the delays
+between them and reading streamed responses. Pass the remaining time in seconds or a
+`Deadline` instance as `deadline` request setting or set a default for all calls of a
+client ::
+
+    from pynive_client import deadline
+
+    storage = datastore.DataStore(service='mystorage', domain='mydomain', deadline=10)
+    item = storage.getItem(key='item1', deadline=2.5)
+    item = storage.getItem(key='item1', deadline=deadline.Deadline(at=time.time()+2.5))
+
+Each attempt is sent with the remaining time as read timeout and `connectTimeout`
+(if set) as connect timeout. If the remaining time is spent the call raises
+`endpoint.DeadlineExceeded`. Retries are not started if the delay exceeds the
+remaining time. Streamed responses (`FileWrapper`) check the deadline before each chunk.
+"""
+
+from pynive_client.retry import Clock
+
+
+class Deadline(object):
+    """
+    Absolute point in time a call has to be finished.
+    """
+
+    def __init__(self, seconds=None, at=None, connectTimeout=None, clock=None):
+        """
+
+        :param seconds: time from now in seconds
+        :param at: absolute time as returned by `clock.time()`. Used if `seconds` is None.
+        :param connectTimeout: maximum time in seconds to establish a connection
+        :param clock: retry.Clock instance
+        """
+        self.clock = clock or Clock()
+        if seconds is not None:
+            at = self.clock.time() + seconds
+        if at is None:
+            raise ValueError("Deadline requires seconds or at")
+        self.at = at
+        self.connectTimeout = connectTimeout
+
+    def remaining(self):
+        """
+        Returns the remaining time in seconds. Negative if the deadline has passed.
+        """
+        return self.at - self.clock.time()
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def timeout(self, timeout=None):
+        """
+        Returns the `(connect, read)` timeout for the next attempt or None if the
+        deadline has passed. A shorter request `timeout` is kept.
+
+        :param timeout: configured request timeout in seconds or (connect, read) tuple
+        :return: tuple or None
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            return None
+        connect = self.connectTimeout
+        read = timeout
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+        read = remaining if read is None else min(read, remaining)
+        connect = read if connect is None else min(connect, read)
+        return (connect, read)
+
+    def __repr__(self):
+        return "<Deadline %.3fs>" % self.remaining()
+
+
+def getDeadline(value, connectTimeout=None, clock=None):
+    """
+    Returns a `Deadline` for the `deadline` request setting or client default.
+
+    :param value: seconds, Deadline instance or None
+    :return: Deadline or None
+    """
+    if value is None or isinstance(value, Deadline):
+        return value
+    return Deadline(value, connectTimeout=connectTimeout, clock=clock)
@@ -7,10 +7,20 @@
 #
 
 import requests
-import json
+import io
 import logging
+import re
+import threading
 import time
 
+from pynive_client.retry import RetryPolicy
+from pynive_client.stats import Statistics
+from pynive_client import trace
+from pynive_client.codec import getCodec
+from pynive_client.deadline import getDeadline
+from pynive_client.transport import Transport, RequestsTransport, getTransport
+from pynive_client.transport import PooledHTTPAdapter, PoolTimeout
+
 
 def makeUrl(method=None, service=None, domain=None, path=None, secure=None, version=None, extendedPath=None, **kw):
     """
@@ -49,8 +59,29 @@ def makeUrl(method=None, service=None, domain=None, path=None, secure=None, vers
         protocol = 'http'
 
     # construct path by concatenating `path` and `extendedPath`
-    basepath = path
-    path = extendedPath
+    path = joinPath(path, extendedPath)
+
+    # make url
+    url = [protocol+':/', domain, service] # the single slash gets joined with a second slash
+    if version:
+        url.append(version)
+    if path:
+        url.append(path)
+    if method:
+        url.append(method)
+    return '/'.join(url)
+
+
+def joinPath(basepath, path):
+    """
+    Concatenates the base path set on client instance level and the extended path.
+    Absolute extended paths replace the base path. Leading and trailing slashes are
+    removed.
+
+    :param basepath:
+    :param path:
+    :return: string or None
+    """
     if path or basepath:
         # this option is not supported by all services
         if not path:
@@ -64,70 +95,146 @@ def makeUrl(method=None, service=None, domain=None, path=None, secure=None, vers
         if path.startswith('/'):
             path = path[1:]
         if path.endswith('/'):
-            path = path[:-1]\
-
-    # make url
-    url = [protocol+':/', domain, service] # the single slash gets joined with a second slash
-    if version:
-        url.append(version)
-    if path:
-        url.append(path)
-    if method:
-        url.append(method)
-    return '/'.join(url)
+            path = path[:-1]
+    return path
 
 
 class Client(object):
     """
     Basic client functionality
 
-    Handles enpoint urls, http sessions (based on requests module), connection setup
+    Handles enpoint urls, http sessions (see transport.py), connection setup
     and service request processing.
     """
 
     timeout = None
-    adapter = requests
+    # http transport. see transport.py
+    adapter = RequestsTransport()
     pingurl = '@ping'
     counter = tcounter = 0
-    # dict like method specific stats. collects (time, extendedPath) per method call.
-    # will be omitted if None. to activates pass stats = {} as __init__ kw.
+    # retry policy for 503 and 504 responses. see retry.py
+    retryPolicy = RetryPolicy()
+    # optional circuit breakers per domain and service. see breaker.py
+    circuitBreakers = None
+    # optional call statistics with fixed memory usage. see stats.py
     stats = None
-
-    def __init__(self, service=None, domain=None, session=None, stats=None, **options):
+    # optional tracing hooks. see trace.py
+    tracer = None
+    # optional coalescing of identical concurrent read calls. see coalesce.py
+    singleFlight = None
+    # json codec for request and response bodies. see codec.py
+    codec = getCodec()
+    # optional request body compression. see compress.py
+    compression = None
+    # maximum number of cached urls per client instance
+    urlCacheSize = 500
+    # if False results reference `ResponseInfo` objects instead of the response including
+    # the body. streamed responses are always kept.
+    keepResponse = True
+    # optional shared auth token manager. see auth.py
+    tokenManager = None
+    # optional default deadline in seconds for calls including retries and the connect
+    # timeout of each attempt. see deadline.py
+    deadline = None
+    connectTimeout = None
+    # optional adaptive concurrency limits per domain and service. see concurrency.py
+    concurrencyLimiters = None
+    # optional token bucket rate limits per service and method. see ratelimit.py
+    rateLimits = None
+    _urlOptions = None
+
+    def __init__(self, service=None, domain=None, session=None, stats=None, retryPolicy=None,
+                 circuitBreakers=None, tracer=None, singleFlight=None, codec=None, compression=None,
+                 keepResponse=None, tokenManager=None, transport=None, deadline=None,
+                 concurrencyLimiters=None, rateLimits=None, **options):
         """
         Service client initialisation.
 
         :param service: service name
         :param domain: endpoint options used to connect to the service
         :param session: http session object to reuse connections
+        :param stats: stats.Statistics instance. Can be shared by multiple clients.
+        :param retryPolicy: retry.RetryPolicy instance
+        :param circuitBreakers: breaker.CircuitBreakers instance
+        :param tracer: trace.Hooks instance
+        :param singleFlight: coalesce.SingleFlight instance
+        :param codec: codec instance or name (json, orjson, ujson). see codec.py
+        :param compression: compress.Compression instance
+        :param keepResponse: reference the complete response in results
+        :param tokenManager: auth.TokenManager instance
+        :param transport: transport instance or name (requests, urllib3, httpx). see transport.py
+        :param deadline: default deadline in seconds for calls. see deadline.py
+        :param concurrencyLimiters: concurrency.ConcurrencyLimiters instance
+        :param rateLimits: ratelimit.RateLimits instance
         :param **options: other endpoint options. see makeUrl().
         """
         self.options = {'service': service, 'domain': domain}
         if options:
             self.options.update(options)
         if stats is not None:
-            self.stats = stats
+            # a `stats = {}` dict used to activate unbounded call lists
+            self.stats = stats if isinstance(stats, Statistics) else Statistics()
+        if retryPolicy is not None:
+            self.retryPolicy = retryPolicy
+        if circuitBreakers is not None:
+            self.circuitBreakers = circuitBreakers
+        if tracer is not None:
+            self.tracer = tracer
+        if singleFlight is not None:
+            self.singleFlight = singleFlight
+        if codec is not None:
+            self.codec = getCodec(codec) if isinstance(codec, str) else codec
+        if compression is not None:
+            self.compression = compression
+        if keepResponse is not None:
+            self.keepResponse = keepResponse
+        if tokenManager is not None:
+            self.tokenManager = tokenManager
+        if transport is not None:
+            self.adapter = getTransport(transport) if isinstance(transport, str) else transport
+        if deadline is not None:
+            self.deadline = deadline
+        if concurrencyLimiters is not None:
+            self.concurrencyLimiters = concurrencyLimiters
+        if rateLimits is not None:
+            self.rateLimits = rateLimits
         self.session = session
         self.log = logging.getLogger(service)
+        self._lock = threading.Lock()
 
 
-    def newSession(self, max_retries=3, pool_connections=3, pool_maxsize=5, auth=None):
+    def newSession(self, max_retries=3, pool_connections=3, pool_maxsize=5, auth=None, pool_block=True):
         """
         Create a new http session. Can be used to connect to multiple services. Supports
         authentication cookies.
 
+        The connection pool is used for http and https urls. `pool_connections` is the number
+        of hosts (services) with cached connection pools, `pool_maxsize` the number of
+        connections per host. If `pool_block` is True calls wait for a free connection
+        instead of opening additional connections. Pool occupancy and wait times are
+        returned by `poolStats()`.
+
+        The session can be shared by multiple clients and threads. Pass it as `session`
+        to each client instance or share a single client instance between threads.
+
         :param max_retries :
         :param pool_connections :
         :param pool_maxsize :
+        :param pool_block :
         :return: http session
         """
-        session = self.adapter.Session()
-        # setup requests session
-        if hasattr(self.adapter, 'adapters'):
-            adapter = self.adapter.adapters.HTTPAdapter(max_retries=max_retries,
-                                                        pool_connections=pool_connections,
-                                                        pool_maxsize=pool_maxsize)
-            session.mount("http://", adapter)
+        adapter = self.adapter
+        if not isinstance(adapter, Transport) and hasattr(adapter, 'adapters'):
+            # the requests module
+            adapter = RequestsTransport()
+        if isinstance(adapter, Transport):
+            session = adapter.Session(max_retries=max_retries,
+                                      pool_connections=pool_connections,
+                                      pool_maxsize=pool_maxsize,
+                                      pool_block=pool_block)
+        else:
+            # other adapters e.g. adapter.MockAdapter
+            session = adapter.Session()
         # use session instance to store auth-token
         session.authtoken = auth
         self.session = session
@@ -136,6 +243,19 @@ class Client(object):
         return session
 
 
+    def poolStats(self):
+        """
+        Returns connection pool statistics per host for sessions created by `newSession()`.
+        See `transport.PooledHTTPAdapter.stats()`.
+
+        :return: dict {host: {active, maxActive, requests, waiting, waitTime, maxWaitTime}}
+        """
+        pool = getattr(self.session, 'pool', None)
+        if pool is None:
+            return {}
+        return pool.stats()
+
+
     def call(self, method, values, reqSettings, extendedPath=None):
         """
         Calls a service method and parses the response.
@@ -144,6 +264,8 @@ class Client(object):
 
         - pynive exceptions: ServiceFailure, AuthorizationFailure, Forbidden, InvalidParameter, ClientFailure
         - requests package excps: see `requests.exceptions`
+        - DeadlineExceeded: the call did not finish before `reqSettings['deadline']` or
+          `Client.deadline`
 
         :param method: Service function name to be called
         :param values: Payload transmitted to the service
@@ -151,21 +273,45 @@ class Client(object):
         :return: content, response: `content` contains the the parsed body returned by the service, `response`
         is the raw response received.
         """
+        reqSettings = self._withDeadline(reqSettings or {})
+        flight = self.singleFlight
+        if flight is not None:
+            key = flight.key(self, method, values, reqSettings, extendedPath)
+            if key is not None:
+                return flight.do(key, self._call, method, values, reqSettings, extendedPath,
+                                 deadline=reqSettings.get('deadline'))
+        return self._call(method, values, reqSettings, extendedPath)
+
+
+    def _withDeadline(self, reqSettings):
+        # starts the deadline of the call. the request settings are copied.
+        deadline = reqSettings.get('deadline', self.deadline)
+        if deadline is None:
+            return reqSettings
+        deadline = getDeadline(deadline, self.connectTimeout, self.retryPolicy.clock)
+        return dict(reqSettings, deadline=deadline)
+
+
+    def _call(self, method, values, reqSettings, extendedPath):
         url = self.url(method=method, extendedPath=extendedPath)
-        reqSettings = reqSettings or {}
-        response = self._send(url, method, values, **reqSettings)
-        self.counter += 1
-        self.tcounter += response.elapsed.total_seconds()
-        stats = self.stats
-        if stats is not None:
-            marker = method or "download"
-            if not marker in stats:
-                stats[marker] = []
-            size = 0
-            if "content-length" in response.headers:
-                size = response.headers["content-length"]
-            stats[marker].append((response.elapsed.total_seconds(), size, extendedPath))
-        content, response = self._handleResponse(response, method, values, reqSettings)
+        service = self.options.get('service')
+        tracer = self.tracer
+        start = time.time()
+        try:
+            with trace.event(tracer, trace.CALL, method, service, url, domain=self.options.get('domain')) as event:
+                response = self._dispatch(url, method, values, reqSettings)
+                self._count(response, method, extendedPath)
+                if event is not None:
+                    event.status = response.status_code
+                    event.responseSize = trace.responseSize(response)
+                with trace.event(tracer, trace.PARSE, method, service, url, status=response.status_code):
+                    content, response = self._handleResponse(response, method, values, reqSettings)
+        except Exception as e:
+            self._record(method, start, reqSettings, error=e)
+            raise
+        self._record(method, start, reqSettings, response=response)
+        if not self.keepResponse and not reqSettings.get('stream'):
+            response = ResponseInfo(response)
         return content, response
 
 
@@ -174,11 +320,38 @@ class Client(object):
         Creates the service endpoint url for the method. Uses the options set on
         client instantioation. see `__init__`
 
+        The base url (protocol, domain, service, version) is created once. Urls are
+        cached per method and extended path. Changing `options` resets the cache.
+
         :param method: Service function name to be called
         :param extendedPath: additional path info
         :return: string: service method url
         """
-        return makeUrl(method=method, extendedPath=extendedPath, **self.options)
+        if self._urlOptions != self.options:
+            self._resetUrls()
+        key = (method, extendedPath)
+        urls = self._urls
+        url = urls.get(key)
+        if url is not None:
+            return url
+        url = self._urlBase
+        path = joinPath(self.options.get('path'), extendedPath)
+        if path:
+            url += '/' + path
+        if method:
+            url += '/' + method
+        if len(urls) >= self.urlCacheSize:
+            urls.clear()
+        urls[key] = url
+        return url
+
+
+    def _resetUrls(self):
+        # creates the base url from the current options and clears the url cache
+        options = dict(self.options)
+        self._urlBase = makeUrl(**dict(options, method=None, path=None, extendedPath=None))
+        self._urls = {}
+        self._urlOptions = options
 
 
     def request(self, path, **reqSettings):
@@ -192,6 +365,7 @@ class Client(object):
         method=""
         values=None
         url = self.url(method=method, extendedPath=path)
+        reqSettings = self._withDeadline(reqSettings)
         response = self._send(url, method, values, **reqSettings)
         content, response = self._handleResponse(response, method, values, reqSettings)
         return FileWrapper(response)
@@ -211,7 +385,195 @@ class Client(object):
                       response=response)
 
 
+    def circuitBreaker(self):
+        """
+        Returns the circuit breaker for this service or None if not used.
+
+        :return: breaker.CircuitBreaker
+        """
+        if self.circuitBreakers is None:
+            return None
+        return self.circuitBreakers.get(self.options.get('domain'), self.options.get('service'))
+
+
+    def concurrencyLimiter(self):
+        """
+        Returns the concurrency limiter for this service or None if not used.
+
+        :return: concurrency.ConcurrencyLimiter
+        """
+        if self.concurrencyLimiters is None:
+            return None
+        return self.concurrencyLimiters.get(self.options.get('domain'), self.options.get('service'))
+
+
+    def _dispatch(self, url, method, values, reqSettings):
+        # sends the request guarded by the circuit breaker if used
+        breaker = self.circuitBreaker()
+        if breaker is None:
+            return self._send(url, method, values, **reqSettings)
+        probe = breaker.allow()
+        if probe and breaker.pingProbe:
+            self._ping(breaker)
+            probe = False
+        try:
+            response = self._send(url, method, values, **reqSettings)
+        except Exception as e:
+            if self._localError(e):
+                breaker.cancel(probe)
+            else:
+                breaker.record(False, probe=probe)
+            raise
+        breaker.record(response.status_code < 500, response.elapsed.total_seconds(), probe=probe)
+        return response
+
+
+    def _localError(self, error):
+        # errors raised by client side limits. the service is not at fault.
+        if isinstance(error, DeadlineExceeded):
+            return error.local
+        return isinstance(error, (ConcurrencyLimitExceeded, RateLimitExceeded, PoolTimeout))
+
+
+    def _ping(self, breaker):
+        # probe call for a half-open circuit breaker. raises CircuitOpen on failure.
+        try:
+            response = self._send(self.url(method=self.pingurl, extendedPath='/'), self.pingurl, {})
+            success = response.status_code < 400
+        except Exception as e:
+            if self._localError(e):
+                breaker.cancel(True)
+                raise
+            success = False
+        breaker.record(success, probe=True)
+        if not success:
+            raise CircuitOpen("Circuit open. Ping failed: %s" % breaker.name)
+
+
     def _send(self, url, method, values, **reqSettings):
+        manager = self.tokenManager
+        if reqSettings.get('auth'):
+            manager = None
+        deadline = reqSettings.pop('deadline', None)
+        httpmethod, req = self._prepareRequest(method, values, reqSettings)
+        timeout = req.get('timeout')
+        adapter = self.session or self.adapter
+        limiter = self.concurrencyLimiter()
+        rateLimits = self.rateLimits
+        policy = self.retryPolicy
+        clock = policy.clock
+        start = clock.time()
+        attempt = 0
+        service = self.options.get('service')
+        compression = self.compression
+        uncompressed = None
+        if compression is not None:
+            uncompressed = compression.apply(service, req)
+        tracer = self.tracer
+        size = trace.bodySize(req.get('data')) if tracer is not None else None
+        while True:
+            if rateLimits is not None:
+                wait = self._rateWait(rateLimits, method, deadline)
+                if wait:
+                    rateLimits.clock.sleep(wait)
+            if deadline is not None:
+                req['timeout'] = deadline.timeout(timeout)
+                if req['timeout'] is None:
+                    raise self._localDeadline(method, deadline)
+            with trace.event(tracer, trace.ATTEMPT, method, service, url,
+                             domain=self.options.get('domain'), httpmethod=httpmethod,
+                             attempt=attempt, size=size) as event:
+                response = self._request(adapter, httpmethod, url, req, method, deadline, limiter)
+                if event is not None:
+                    event.status = response.status_code
+                    event.responseSize = trace.responseSize(response)
+            if deadline is not None and req.get('stream'):
+                # checked by FileWrapper while reading the body
+                response.deadline = deadline
+            if uncompressed is not None and response.status_code == 415:
+                # the service does not accept compressed bodies
+                self.log.warning("Compressed request not supported. Disabling compression for %s." % service)
+                compression.disable(service)
+                compression.restore(req, uncompressed)
+                uncompressed = None
+                continue
+            if manager is not None and response.status_code == 401 and resendable(values):
+                # the token expired or has been revoked. refresh and send once more.
+                failed = req['headers'].get('x-auth-token')
+                req['headers']['x-auth-token'] = manager.refresh(failed)
+                manager = None
+                continue
+            if not resendable(values):
+                # streamed bodies can not be sent twice
+                return response
+            delay = policy.delay(attempt, method, httpmethod, response, clock.time()-start)
+            if delay is None:
+                return response
+            if deadline is not None and delay >= deadline.remaining():
+                if deadline.expired():
+                    raise DeadlineExceeded(self._deadlineMessage(method, deadline))
+                # the next attempt would start after the deadline
+                return response
+            self.log.warning("Service responded %d. Retrying in %.2fs." % (response.status_code, delay))
+            clock.sleep(delay)
+            attempt += 1
+
+
+    def _request(self, adapter, httpmethod, url, req, method, deadline, limiter):
+        # sends a single attempt. waits for a slot of the concurrency limiter and converts
+        # transport errors after the deadline to DeadlineExceeded.
+        ticket = None
+        if limiter is not None:
+            ticket = limiter.acquire(deadline.remaining() if deadline is not None else None)
+            if ticket is None:
+                self._limitExceeded(method, deadline, limiter)
+        try:
+            response = adapter.request(httpmethod, url, **req)
+        except Exception as e:
+            if ticket is not None:
+                # timeouts signal overload, other errors and client side limits are not counted
+                overload = isinstance(e, requests.exceptions.Timeout) and not self._localError(e)
+                limiter.release(ticket, True if overload else None)
+            if not isinstance(e, requests.exceptions.RequestException) or deadline is None or not deadline.expired():
+                raise
+            raise DeadlineExceeded(self._deadlineMessage(method, deadline))
+        if ticket is not None:
+            limiter.release(ticket, limiter.overload(response))
+        return response
+
+
+    def _limitExceeded(self, method, deadline, limiter):
+        if deadline is not None and deadline.expired():
+            raise self._localDeadline(method, deadline)
+        raise ConcurrencyLimitExceeded("Concurrency limit reached: %s. Waiting: %d" % (limiter.name, limiter.waiting))
+
+
+    def _rateWait(self, rateLimits, method, deadline):
+        # takes the rate limit tokens for the next attempt. returns the time to wait before
+        # sending. the wait is limited by the remaining time of the deadline.
+        remaining = deadline.remaining() if deadline is not None else None
+        wait = rateLimits.reserve(self.options.get('domain'), self.options.get('service'), method, remaining)
+        if wait is not None:
+            return wait
+        if remaining is not None and (rateLimits.maxWait is None or remaining < rateLimits.maxWait):
+            raise self._localDeadline(method, deadline)
+        raise RateLimitExceeded("Rate limit reached: %s.%s. Maximum wait: %.2fs" % (self.options.get('service'), method or "", rateLimits.maxWait))
+
+
+    def _localDeadline(self, method, deadline):
+        # the deadline passed before the attempt was sent
+        error = DeadlineExceeded(self._deadlineMessage(method, deadline))
+        error.local = True
+        return error
+
+
+    def _deadlineMessage(self, method, deadline):
+        return "Call not finished within deadline: %s.%s" % (self.options.get('service'), method or "")
+
+
+    def _prepareRequest(self, method, values, reqSettings):
+        # converts values and request settings to adapter request arguments.
+        # returns (httpmethod, settings)
         req = reqSettings
         if not 'headers' in req:
             req['headers'] = {}
@@ -219,7 +581,10 @@ class Client(object):
         charset = req.get("charset")
         if values is not None:
             if isinstance(values, (dict, list, tuple)):
-                req['data'] = json.dumps(values)#, encoding=charset or 'utf-8')
+                data = self.codec.dumps(values)
+                if charset and charset.lower().replace('-', '') != 'utf8':
+                    data = data.decode('utf-8').encode(charset)
+                req['data'] = data
                 ct = 'application/json'
                 if charset:
                     ct += '; charset='+charset
@@ -232,6 +597,8 @@ class Client(object):
         if req.get('auth'):
             req['headers']['x-auth-token'] = req['auth']
             del req['auth']
+        elif self.tokenManager is not None:
+            req['headers']['x-auth-token'] = self.tokenManager.token()
         elif self.session and self.session.authtoken:
             req['headers']['x-auth-token'] = self.session.authtoken
         elif self.options and self.options.get('auth'):
@@ -251,27 +618,44 @@ class Client(object):
 
         if not 'timeout' in req:
             req['timeout'] = self.timeout
+        return httpmethod, req
+
+
+    def _count(self, response, method, extendedPath):
+        # updates call counters
+        with self._lock:
+            self.counter += 1
+            self.tcounter += response.elapsed.total_seconds()
 
-        adapter = self.session or self.adapter
-        response = adapter.request(httpmethod, url, **req)
-        if response.status_code==503:
-            # service not ready -> retry
-            for retry in (0.3, 0.5, 0.5, 0.5, 1):
-                time.sleep(retry)
-                self.log.warning("Service not ready (503). Retrying.")
-                response = adapter.request(httpmethod, url, **req)
-                if response.status_code!=503:
-                    break
-
-        if response.status_code==504:
-            # timeout -> retry
-            for retry in (0.5,):
-                time.sleep(retry)
-                self.log.warning("Timeout (504). Retrying.")
-                response = adapter.request(httpmethod, url, **req)
-                if response.status_code!=504:
-                    break
-        return response
+
+    def _record(self, method, start, reqSettings, response=None, error=None):
+        # adds the call to stats. the request size is taken from the sent body, the
+        # response sizes from the loaded body (decoded) and the content-length header
+        # (wire). the body of not streamed responses is already loaded.
+        stats = self.stats
+        if stats is None:
+            return
+        sent = received = 0
+        receivedWire = None
+        if response is not None:
+            body = getattr(getattr(response, 'request', None), 'body', None)
+            if isinstance(body, (bytes, str)):
+                sent = len(body)
+            headers = response.headers or {}
+            if "content-length" in headers:
+                try:
+                    receivedWire = int(headers["content-length"])
+                except ValueError:
+                    pass
+            content = None
+            if not reqSettings.get('stream'):
+                content = response.content
+            if isinstance(content, (bytes, str)) and content:
+                received = len(content)
+            else:
+                received = receivedWire or 0
+        stats.record(self.options.get('service'), method or "download", time.time()-start,
+                     sent=sent, received=received, error=error, receivedWire=receivedWire)
 
 
     def _handleResponse(self, response, method, values, reqSettings):
@@ -295,7 +679,7 @@ class Client(object):
         elif response.status_code == 422:
             # Invalid parameter
             try:
-                result = response.json()
+                result = self._loads(response)
             except ValueError:
                 result = {}
             if not isinstance(result, dict):
@@ -304,7 +688,7 @@ class Client(object):
         elif response.status_code == 413:
             # Invalid parameter
             try:
-                result = response.json()
+                result = self._loads(response)
             except ValueError:
                 result = {}
             if not isinstance(result, dict):
@@ -313,7 +697,7 @@ class Client(object):
         elif 400 <= response.status_code <= 499:
             # client failure
             try:
-                result = response.json()
+                result = self._loads(response)
             except ValueError:
                 result = {}
             if not isinstance(result, dict):
@@ -324,7 +708,7 @@ class Client(object):
         # parse body
         # todo handle streaming response and iterators
         if response.headers.get("Content-Type","").find("/json")!=-1:
-            content = response.json()
+            content = self._loads(response)
         else:
             content = response.content
         if content is None:
@@ -332,6 +716,14 @@ class Client(object):
         return content, response
 
 
+    def _loads(self, response):
+        # decodes the json body with the clients codec
+        content = response.content
+        if not content or not isinstance(content, (bytes, str)):
+            return response.json()
+        return self.codec.loads(content)
+
+
     def _fmtMsgs(self, msgs, default, seperator=' ; '):
         if isinstance(msgs, dict):
             msgs = msgs.get('messages')
@@ -342,19 +734,136 @@ class Client(object):
         return msgs
 
 
+def resendable(values):
+    """
+    Returns False if `values` is a stream (iterator or readable file) which can not
+    be sent more than once.
+    """
+    if values is None or isinstance(values, (dict, list, tuple, bytes, bytearray)):
+        return True
+    return not (hasattr(values, "read") or hasattr(values, "__next__") or hasattr(values, "next"))
+
+
+def iterPages(load, start=1, size=50, prefetch=False):
+    """
+    Generator returning the entries of a paged result set. Pages are loaded on demand
+    by calling `load(start, size)`. `load` has to return a tuple `(entries, total)`.
+    `total` is the total number of entries or None if not known. In this case iteration
+    stops if a page contains less entries than requested.
+
+    If `prefetch` is True the next page is loaded in a background thread while the current
+    page is consumed.
+
+    :param load: callable loading a single page
+    :param start: first entry (1 based)
+    :param size: page size
+    :param prefetch: load the next page in the background
+    :return: generator
+    """
+    page, total = load(start, size)
+    while page:
+        nextStart = start + len(page)
+        if total is not None:
+            more = nextStart <= total
+        else:
+            more = len(page) >= size
+        pending = None
+        if more and prefetch:
+            pending = _Background(load, nextStart, size)
+        for entry in page:
+            yield entry
+        if not more:
+            break
+        if pending is not None:
+            page, total = pending.result()
+        else:
+            page, total = load(nextStart, size)
+        start = nextStart
+
+
+class _Background(threading.Thread):
+    # runs a single function call in a background thread
+
+    def __init__(self, function, *args):
+        super(_Background, self).__init__()
+        self.daemon = True
+        self.function = function
+        self.args = args
+        self.value = self.error = None
+        self.start()
+
+    def run(self):
+        try:
+            self.value = self.function(*self.args)
+        except Exception as e:
+            self.error = e
+
+    def result(self):
+        self.join()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+
 class Result(object):
-    # wrapper for api call results
-    result = 1
+    """
+    Wrapper for api call results. Values are accessible as attributes or by key ::
+
+        result = storage.getItem(key="1")
+        if result:
+            items = result.items
+            items = result["items"]
+
+    `Result(**values)` returns an instance of a class with fixed `__slots__` for the set
+    of value names. Classes are created once per set of names, so results of the same
+    service method share a compact class without instance `__dict__`. Only the values
+    passed to `Result()` can be set, assigning other attributes raises `AttributeError`.
+
+    The raw response is only referenced and can be released by `dropResponse()`. See
+    `Client.keepResponse` to keep only status, headers and url of responses.
+    """
+    __slots__ = ('result', '_response')
+    _fields = ()
+
+    def __new__(cls, **kws):
+        if cls is Result:
+            cls = _resultClass(tuple(sorted([k for k in kws if k!='result' and k!='response'])))
+        return object.__new__(cls)
 
     def __init__(self, **kws):
-        if not kws:
-            self.result = 0
-        elif len(kws)==1 and kws.get("response"):
+        hasResponse = 'response' in kws
+        self._response = kws.pop('response', None)
+        if not kws and (not hasResponse or self._response):
             self.result = 0
-            self.response = kws["response"]
         else:
             self.result = 1
-            self.__dict__.update(kws)
+            for key, value in kws.items():
+                setattr(self, key, value)
+
+    @property
+    def response(self):
+        return self._response
+
+    @response.setter
+    def response(self, response):
+        self._response = response
+
+    def dropResponse(self):
+        """
+        Releases the raw response.
+        """
+        self._response = None
+
+    def toDict(self):
+        """
+        Returns the values as dictionary.
+        """
+        values = dict([(key, getattr(self, key)) for key in self._fields])
+        values['result'] = self.result
+        if self._response is not None:
+            values['response'] = self._response
+        return values
 
     def __len__(self):
         return 1 if self.result else 0
@@ -367,36 +876,215 @@ class Result(object):
         return other == self.result
 
     def __getitem__(self, key):
-        return self.__dict__[key]
+        if key == 'response':
+            if self._response is None:
+                raise KeyError(key)
+            return self._response
+        if key == 'result' or key in self._fields:
+            return getattr(self, key)
+        raise KeyError(key)
 
     def get(self, key, default=None):
-        return self.__dict__.get(key, default)
+        try:
+            return self[key]
+        except KeyError:
+            return default
 
     def __repr__(self):
-        return str(self.__dict__)
+        return str(self.toDict())
+
+    def __reduce__(self):
+        return (_restoreResult, (self.toDict(),))
+
+
+class _OpenResult(Result):
+    # result class with instance `__dict__` for value names not usable as slots
+    def toDict(self):
+        values = dict(self.__dict__)
+        values['result'] = self.result
+        if self._response is not None:
+            values['response'] = self._response
+        return values
+
+    def __getitem__(self, key):
+        if key in self.__dict__:
+            return self.__dict__[key]
+        return Result.__getitem__(self, key)
+
+
+_resultClasses = {}
+# maximum number of generated result classes
+maxResultClasses = 500
+_fieldName = re.compile(r"^[A-Za-z][A-Za-z0-9_]*$")
 
 
+def _resultClass(fields):
+    # returns the result class for the value names
+    cls = _resultClasses.get(fields)
+    if cls is not None:
+        return cls
+    if len(_resultClasses) >= maxResultClasses:
+        return _OpenResult
+    for name in fields:
+        if not _fieldName.match(name) or hasattr(Result, name):
+            return _OpenResult
+    cls = type(str("Result"), (Result,), {"__slots__": fields, "_fields": fields})
+    _resultClasses[fields] = cls
+    return cls
 
-class FileWrapper(object):
-    # turns a response iterator int a readable file object
+
+def _restoreResult(values):
+    result = values.pop('result', 1)
+    return Result(result=result, **values)
+
+
+class ResponseInfo(object):
+    """
+    Status, headers and url of a response without the body and connection. Used by
+    clients if `keepResponse` is False.
+    """
+    __slots__ = ('status_code', 'reason', 'url', 'headers', 'elapsed')
 
     def __init__(self, response):
+        self.status_code = response.status_code
+        self.reason = response.reason
+        self.url = response.url
+        self.headers = response.headers
+        self.elapsed = response.elapsed
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def __bool__(self):
+        return self.ok
+    __nonzero__ = __bool__
+
+    def __repr__(self):
+        return "<ResponseInfo [%d]>" % self.status_code
+
+
+
+class FileWrapper(io.RawIOBase):
+    """
+    Turns a streamed response into a readable binary file object. The body is read
+    from a single `response.iter_content()` iterator in chunks of `chunkSize` bytes.
+
+    Supports `read()`, `readinto()`, `readline()`, iteration and usage as context manager.
+    Wrap the instance in `io.BufferedReader` for buffered reads. Closing the wrapper
+    closes the response. If the call has a deadline (see deadline.py) reading raises
+    `DeadlineExceeded` once the deadline has passed. ::
+
+        with storage.read("image.png") as file:
+            with open("image.png", "wb") as out:
+                shutil.copyfileobj(file, out)
+
+    """
+    chunkSize = 65536
+
+    def __init__(self, response, chunkSize=None, deadline=None):
+        super(FileWrapper, self).__init__()
         self.response = response
+        if chunkSize:
+            self.chunkSize = chunkSize
+        self.deadline = deadline if deadline is not None else getattr(response, 'deadline', None)
+        self._chunks = None
+        self._buffer = b""
+        self._offset = 0
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def readinto(self, b):
+        if not self._fill():
+            return 0
+        view = memoryview(b)
+        n = min(len(view), len(self._buffer) - self._offset)
+        view[:n] = memoryview(self._buffer)[self._offset:self._offset+n]
+        self._consume(n)
+        return n
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            return self.readall()
+        if not size or not self._fill():
+            return b""
+        if not self._offset and len(self._buffer) <= size:
+            # return the whole chunk without copying
+            data = self._buffer
+        else:
+            data = self._buffer[self._offset:self._offset+size]
+        self._consume(len(data))
+        return data
+
+    def readall(self):
+        parts = []
+        while self._fill():
+            parts.append(self._buffer[self._offset:] if self._offset else self._buffer)
+            self._consume(len(self._buffer) - self._offset)
+        return b"".join(parts)
+
+    def readline(self, size=-1):
+        parts = []
+        length = 0
+        while (size is None or size < 0 or length < size) and self._fill():
+            end = len(self._buffer)
+            if size is not None and size >= 0:
+                end = min(end, self._offset + size - length)
+            pos = self._buffer.find(b"\n", self._offset, end)
+            if pos != -1:
+                end = pos + 1
+            parts.append(self._buffer[self._offset:end])
+            length += end - self._offset
+            self._consume(end - self._offset)
+            if pos != -1:
+                break
+        return b"".join(parts)
 
-    def read(self, size=5000):
-        if size==-1:
-            # read all and return. not supported by iter_content
-            data = ""
-            for raw in self.response.iter_content(999999):
-                data+=raw
-            return data
+    def close(self):
+        if not self.closed:
+            close = getattr(self.response, "close", None)
+            if close is not None:
+                close()
+        super(FileWrapper, self).close()
+
+    def _fill(self):
+        # loads the next chunk if the buffer is empty. returns False at the end of the body.
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+        if self._offset < len(self._buffer):
+            return True
+        deadline = self.deadline
+        if deadline is not None and deadline.expired():
+            raise DeadlineExceeded("Reading not finished within deadline: %s" % getattr(self.response, 'url', ''))
+        if self._chunks is None:
+            self._chunks = iter(self.response.iter_content(self.chunkSize))
         try:
-            return self.response.iter_content(size).next()
-        except StopIteration:
-            return ""
+            for chunk in self._chunks:
+                if not chunk:
+                    continue
+                if not isinstance(chunk, bytes):
+                    chunk = chunk.encode("utf-8")
+                self._buffer = chunk
+                self._offset = 0
+                return True
+        except requests.exceptions.RequestException:
+            if deadline is None or not deadline.expired():
+                raise
+            raise DeadlineExceeded("Reading not finished within deadline: %s" % getattr(self.response, 'url', ''))
+        self._buffer = b""
+        self._offset = 0
+        return False
+
+    def _consume(self, n):
+        self._offset += n
+        self._pos += n
+
 
-    def close(self):
-        return self.response.close()
 
 class EndpointException(Exception):
     """
@@ -454,3 +1142,32 @@ class ServiceFailure(Exception):
     raised in case a service call fails on the server side (500)
     """
 
+
+class CircuitOpen(ServiceFailure):
+    """
+    raised without calling the service if the services circuit breaker is open
+    """
+
+
+
+class DeadlineExceeded(Exception):
+    """
+    raised in case a call does not finish before its deadline. `local` is True if the
+    deadline passed before the request was sent, e.g. while waiting for client side limits.
+    """
+    local = False
+
+
+
+class ConcurrencyLimitExceeded(Exception):
+    """
+    raised in case a call waits longer than `maxWait` for a free slot of the concurrency
+    limiter or the queue is full
+    """
+
+
+
+class RateLimitExceeded(Exception):
+    """
+    raised in case a call would wait longer than `maxWait` for the rate limit
+    """
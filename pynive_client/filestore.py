@@ -42,8 +42,13 @@ Retrieve a security token and add, update, get and remove a item
     print file.name, file.mime, file.size
 
 """
+import json
+import os
+import shutil
+import threading
 from io import StringIO
 
+from pynive_client import batch
 from pynive_client import endpoint
 
 # python 2/3
@@ -52,10 +57,20 @@ try:
 except ImportError:
     basestring = str
 
+try:
+    from os import replace as _replace
+except ImportError:
+    # python 2: rename replaces existing files on posix systems
+    def _replace(src, dst):
+        if os.name == "nt" and os.path.exists(dst):
+            os.remove(dst)
+        os.rename(src, dst)
+
 
 class FileStore(endpoint.Client):
 
     default_version='api'
+    directory_type='directory'   # newItem() type used to create directories
 
     def __init__(self, service, domain=None, session=None, **options):
         """
@@ -188,6 +203,310 @@ class FileStore(endpoint.Client):
                                response=response)
 
 
+    def upload(self, path, source, mime=None, chunkSize=65536, progress=None, **reqSettings):
+        """
+        Streams the contents of `source` to the file `path`. The body is sent with chunked
+        transfer encoding in chunks of `chunkSize` bytes. Only a single chunk is held in
+        memory. `source` can be
+
+        - a local file name
+        - a `mmap` instance, bytes or bytearray
+        - a readable binary file object
+        - an iterable returning byte chunks
+
+        `progress` is called after each chunk as `progress(sent, total)`. `total` is the
+        total size in bytes or None if not known.
+
+        Streamed bodies can not be resent. Service calls responding with 503 or 504 are not
+        retried.
+
+        :param path:
+        :param source: file name, mmap, bytes, file object or iterable
+        :param mime:
+        :param chunkSize: chunk size in bytes
+        :param progress: callback function
+        :param reqSettings:
+        :return: Result(result, message)
+        """
+        reqSettings = reqSettings or {}
+        reqSettings["type"] = "PUT"
+        if mime:
+            reqSettings["headers"] = reqSettings.get("headers") or {}
+            reqSettings["headers"]["Content-type"] = mime
+        body = _chunks(source, chunkSize, progress)
+        content, response = self.call('@write', body, reqSettings, path)
+        return endpoint.Result(result=content.get('result'),
+                               message=content.get('message',()),
+                               response=response)
+
+
+    def uploadTree(self, localdir, path, workers=8, journal=None, **reqSettings):
+        """
+        Uploads all files and directories in `localdir` to `path`. Directories are created
+        first, files are uploaded by `workers` concurrent threads. Existing files are
+        overwritten.
+
+        If `journal` is set, the relative names of uploaded files are stored in this local
+        file. If the upload is interrupted and restarted with the same journal, files already
+        uploaded are skipped. The journal is removed after an upload without failures.
+
+        :param localdir: local directory
+        :param path: filestore directory
+        :param workers: number of concurrent uploads
+        :param journal: optional local file name to make the upload resumable
+        :param reqSettings:
+        :return: Result(result (number of uploaded files), directories, skipped, failed, message)
+        """
+        journal = _Journal(journal)
+        dirs, files = _localTree(localdir)
+        directories = self._makeDirs(path, dirs, reqSettings)
+
+        def upload(relname):
+            self._uploadFile(_join(path, relname), files[relname], reqSettings)
+            journal.add(relname)
+
+        names = sorted(files)
+        skipped = [relname for relname in names if relname in journal]
+        count, failed = self._transfer(upload, [relname for relname in names if not relname in journal], workers)
+        journal.close(complete=not failed)
+        return endpoint.Result(result=count,
+                               directories=directories,
+                               skipped=skipped,
+                               failed=failed,
+                               message=[msg for name, msg in failed])
+
+
+    def downloadTree(self, path, localdir, workers=8, journal=None, **reqSettings):
+        """
+        Downloads all files and directories in `path` to `localdir`. The directory tree
+        is loaded by recursive `list()` calls, files are downloaded by `workers` concurrent
+        threads. Existing local files are overwritten.
+
+        Files are written to a temporary `.part` file and renamed when complete. If
+        `journal` is set, the relative names of downloaded files are stored in this local
+        file. If the download is interrupted and restarted with the same journal, files
+        already downloaded are skipped. The journal is removed after a download without
+        failures.
+
+        :param path: filestore directory
+        :param localdir: local directory
+        :param workers: number of concurrent downloads
+        :param journal: optional local file name to make the download resumable
+        :param reqSettings:
+        :return: Result(result (number of downloaded files), directories, skipped, failed, message)
+        """
+        journal = _Journal(journal)
+        dirs, files = self._remoteTree(path, reqSettings)
+        directories = 0
+        for relname in [""] + dirs:
+            localroot = os.path.join(localdir, *relname.split("/")) if relname else localdir
+            if not os.path.isdir(localroot):
+                os.makedirs(localroot)
+                directories += 1
+
+        def download(relname):
+            localfile = os.path.join(localdir, *relname.split("/"))
+            temp = localfile + ".part"
+            with self.read(_join(path, relname), **_copySettings(reqSettings)) as file:
+                with open(temp, "wb") as out:
+                    shutil.copyfileobj(file, out, file.chunkSize)
+            _replace(temp, localfile)
+            journal.add(relname)
+
+        names = sorted(files)
+        skipped = [relname for relname in names if relname in journal]
+        count, failed = self._transfer(download, [relname for relname in names if not relname in journal], workers)
+        journal.close(complete=not failed)
+        return endpoint.Result(result=count,
+                               directories=directories,
+                               skipped=skipped,
+                               failed=failed,
+                               message=[msg for name, msg in failed])
+
+
+    def sync(self, localdir, path, manifest, delete=False, dryRun=False, workers=8, **reqSettings):
+        """
+        Uploads new and changed files in `localdir` to `path`. Changes are detected by
+        comparing the local file size and modification time and the remote `size` and `mtime`
+        with the values stored in the local `manifest` file after the last upload.
+
+        A file is uploaded if
+
+        - it does not exist in the filestore
+        - the local and remote size differ
+        - the local size or modification time changed since the last upload
+        - the remote size or mtime changed since the last upload (e.g. by another client)
+
+        If `delete` is True remote files not existing locally are removed. Empty remote
+        directories are not removed. `path` is created if it does not exist.
+
+        If `dryRun` is True nothing is transferred and the manifest is not changed. The
+        result contains the planned changes.
+
+        :param localdir: local directory
+        :param path: filestore directory
+        :param manifest: local file name used to store the manifest
+        :param delete: remove remote files not existing locally
+        :param dryRun: only return the plan
+        :param workers: number of concurrent uploads
+        :param reqSettings:
+        :return: Result(result (number of uploaded files), upload, delete, unchanged, failed, message,
+                 bytes (to upload), saved (bytes not uploaded), removed (number of removed files))
+        """
+        manifest = _Manifest(manifest)
+        dirs, files = _localTree(localdir)
+        try:
+            remoteDirs, remoteFiles = self._remoteTree(path, reqSettings)
+            exists = True
+        except endpoint.NotFound:
+            # first sync into a new directory
+            remoteDirs, remoteFiles = [], {}
+            exists = False
+
+        local = {}
+        upload = []
+        unchanged = []
+        for relname in sorted(files):
+            stat = os.stat(files[relname])
+            local[relname] = (stat.st_size, stat.st_mtime)
+            remote = remoteFiles.get(relname)
+            if remote is None or remote.get("size") != stat.st_size or \
+               not manifest.unchanged(relname, local[relname], _remoteState(remote)):
+                upload.append(relname)
+            else:
+                unchanged.append(relname)
+        remove = []
+        if delete:
+            remove = sorted([relname for relname in remoteFiles if not relname in files])
+        size = sum([local[relname][0] for relname in upload])
+        saved = sum([local[relname][0] for relname in unchanged])
+
+        if dryRun:
+            return endpoint.Result(result=0,
+                                   upload=upload,
+                                   delete=remove,
+                                   unchanged=unchanged,
+                                   failed=[],
+                                   message=[],
+                                   bytes=size,
+                                   saved=saved,
+                                   removed=0)
+
+        if not exists:
+            self._makeRoot(path, reqSettings)
+        self._makeDirs(path, [d for d in dirs if not d in remoteDirs], reqSettings)
+
+        def transfer(relname):
+            result = self._uploadFile(_join(path, relname), files[relname], reqSettings)
+            manifest.set(relname, local[relname], None)
+            return result
+
+        count, failed = self._transfer(transfer, upload, workers)
+
+        def removeFile(relname):
+            self.removeItem(_join(path, relname), **_copySettings(reqSettings))
+            manifest.remove(relname)
+
+        removed, removeFailed = self._transfer(removeFile, remove, workers)
+        failed.extend(removeFailed)
+
+        # store the remote state of uploaded files. failed uploads keep their previous
+        # entry and are uploaded again by the next sync.
+        if count:
+            remoteDirs, remoteFiles = self._remoteTree(path, reqSettings)
+            failedNames = set([name for name, msg in failed])
+            for relname in upload:
+                if relname in failedNames:
+                    continue
+                if relname in remoteFiles and manifest.get(relname):
+                    manifest.set(relname, local[relname], _remoteState(remoteFiles[relname]))
+        for relname in unchanged:
+            if relname in remoteFiles:
+                manifest.set(relname, local[relname], _remoteState(remoteFiles[relname]))
+        manifest.save()
+        return endpoint.Result(result=count,
+                               upload=upload,
+                               delete=remove,
+                               unchanged=unchanged,
+                               failed=failed,
+                               message=[msg for name, msg in failed],
+                               bytes=size,
+                               saved=saved,
+                               removed=removed)
+
+
+    def _makeDirs(self, path, dirs, reqSettings):
+        # creates the relative directories `dirs` in path. parents first.
+        directories = 0
+        for relname in sorted(dirs):
+            parent, name = relname.rsplit("/", 1) if "/" in relname else ("", relname)
+            try:
+                result = self.newItem(_join(path, parent), name=name, type=self.directory_type,
+                                      **_copySettings(reqSettings))
+            except (endpoint.ClientFailure, endpoint.InvalidParameter) as e:
+                # the directory may already exist
+                self.log.info("Directory not created: %s %s" % (relname, str(e)))
+                continue
+            if result:
+                directories += 1
+        return directories
+
+
+    def _makeRoot(self, path, reqSettings):
+        # creates the directory `path` including missing parents
+        root = "/" if path.startswith("/") else ""
+        parts = [part for part in path.split("/") if part]
+        self._makeDirs(root, ["/".join(parts[:i+1]) for i in range(len(parts))], reqSettings)
+
+
+    def _uploadFile(self, remote, localfile, reqSettings):
+        # uploads a single file. the file is created if it does not exist.
+        try:
+            result = self.upload(remote, localfile, **_copySettings(reqSettings))
+        except endpoint.NotFound:
+            parent, name = remote.rsplit("/", 1) if "/" in remote else ("", remote)
+            self.newItem(parent, name=name, type="file", **_copySettings(reqSettings))
+            result = self.upload(remote, localfile, **_copySettings(reqSettings))
+        if not result:
+            raise endpoint.ClientFailure(self._fmtMsgs(result.get("message"), "upload failed: "+remote))
+        return result
+
+
+    def _remoteTree(self, path, reqSettings):
+        # loads the directory tree by recursive list calls. returns (directories, files).
+        # directories is a list of relative names, files a dict {relative name: item}.
+        dirs = []
+        files = {}
+        folders = [""]
+        while folders:
+            relroot = folders.pop(0)
+            for item in self.iterList(_join(path, relroot), **_copySettings(reqSettings)):
+                relname = _join(relroot, item["name"])
+                if item.get("type") == "d":
+                    dirs.append(relname)
+                    folders.append(relname)
+                else:
+                    files[relname] = item
+        return dirs, files
+
+
+    def _transfer(self, function, names, workers):
+        # calls function(name) concurrently. returns (count, [(name, error message)])
+        pool = batch.Pool(workers=max(1, workers))
+        try:
+            results = batch.gather(*[(function, (name,)) for name in names], pool=pool)
+        finally:
+            pool.close()
+        count = 0
+        failed = []
+        for name, result in zip(names, results):
+            if isinstance(result, Exception):
+                failed.append((name, str(result)))
+            else:
+                count += 1
+        return count, failed
+
+
     def move(self, path, newpath, **reqSettings):
         """
 
@@ -224,12 +543,33 @@ class FileStore(endpoint.Client):
         """
         values = dict(type=type, sort=sort, order=order, size=size, start=start)
         content, response = self.call('@list', values, reqSettings, path)
-        # todo result set class with iterator
         if not content:
             return ()
         return content["items"]
 
 
+    def iterList(self, path, type=None, sort="name", order=None, size=50, start=1, prefetch=False, **reqSettings):
+        """
+        Iterates all items in `path`. Pages of `size` items are loaded on demand.
+        See `endpoint.iterPages()`.
+
+        :param path:
+        :param type:
+        :param sort:
+        :param order:
+        :param size: page size
+        :param start:
+        :param prefetch: load the next page in a background thread
+        :param reqSettings:
+        :return: item iterator
+        """
+        def load(start, size):
+            items = self.list(path, type=type, sort=sort, order=order, size=size, start=start,
+                              **dict(reqSettings))
+            return items, None
+        return endpoint.iterPages(load, start=start, size=size, prefetch=prefetch)
+
+
     def allowed(self, path, permissions, **reqSettings):
         """
 
@@ -307,3 +647,152 @@ class FileStore(endpoint.Client):
         return endpoint.FileWrapper(response)
 
 
+
+def _chunks(source, chunkSize, progress=None):
+    # generator returning the contents of source in chunks of `chunkSize` bytes
+    sent = 0
+    if isinstance(source, basestring):
+        total = os.path.getsize(source)
+        with open(source, "rb") as file:
+            while True:
+                chunk = file.read(chunkSize)
+                if not chunk:
+                    break
+                sent += len(chunk)
+                if progress is not None:
+                    progress(sent, total)
+                yield chunk
+    elif isinstance(source, (bytes, bytearray)) or (hasattr(source, "__len__") and hasattr(source, "__getitem__")
+                                                    and not isinstance(source, (list, tuple))):
+        # bytes, bytearray and mmap. chunks are passed as memoryview slices.
+        view = memoryview(source)
+        total = len(view)
+        while sent < total:
+            chunk = view[sent:sent+chunkSize]
+            sent += len(chunk)
+            if progress is not None:
+                progress(sent, total)
+            yield chunk
+    elif hasattr(source, "read"):
+        while True:
+            chunk = source.read(chunkSize)
+            if not chunk:
+                break
+            sent += len(chunk)
+            if progress is not None:
+                progress(sent, None)
+            yield chunk
+    else:
+        for chunk in source:
+            sent += len(chunk)
+            if progress is not None:
+                progress(sent, None)
+            yield chunk
+
+
+def _join(path, name):
+    # joins filestore path segments
+    if not path:
+        return name
+    if not name:
+        return path
+    return path.rstrip("/") + "/" + name
+
+
+def _localTree(localdir):
+    # returns (directories, files) of the local directory tree. directories is a list
+    # of relative names, files a dict {relative name: local file name}.
+    dirs = []
+    files = {}
+    for root, dirnames, filenames in os.walk(localdir):
+        relroot = os.path.relpath(root, localdir)
+        relroot = "" if relroot == os.curdir else relroot.replace(os.sep, "/")
+        for name in dirnames:
+            dirs.append(_join(relroot, name))
+        for name in filenames:
+            files[_join(relroot, name)] = os.path.join(root, name)
+    return dirs, files
+
+
+def _copySettings(reqSettings):
+    # request settings are changed by calls. copy the settings for each call.
+    settings = dict(reqSettings)
+    if settings.get("headers"):
+        settings["headers"] = dict(settings["headers"])
+    return settings
+
+
+def _remoteState(item):
+    # remote file state stored in the manifest
+    return [item.get("size"), item.get("mtime")]
+
+
+class _Manifest(object):
+    # local json file storing the local and remote file states after the last sync.
+    # {relative name: {"local": [size, mtime], "remote": [size, mtime]}}
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.files = {}
+        self.lock = threading.Lock()
+        if os.path.exists(filename):
+            with open(filename) as file:
+                self.files = json.load(file)
+
+    def get(self, name):
+        return self.files.get(name)
+
+    def unchanged(self, name, local, remote):
+        entry = self.files.get(name)
+        if not entry or not entry.get("remote"):
+            return False
+        return list(entry["local"]) == list(local) and list(entry["remote"]) == list(remote)
+
+    def set(self, name, local, remote):
+        with self.lock:
+            self.files[name] = {"local": list(local), "remote": remote}
+
+    def remove(self, name):
+        with self.lock:
+            self.files.pop(name, None)
+
+    def save(self):
+        temp = self.filename + ".part"
+        with open(temp, "w") as file:
+            json.dump(self.files, file)
+        _replace(temp, self.filename)
+
+
+class _Journal(object):
+    # local file storing the names of transferred files. one name per line.
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.names = set()
+        self.file = None
+        self.lock = threading.Lock()
+        if filename is None:
+            return
+        if os.path.exists(filename):
+            with open(filename) as file:
+                self.names = set([line.rstrip("\n") for line in file if line.strip()])
+        self.file = open(filename, "a")
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def add(self, name):
+        with self.lock:
+            self.names.add(name)
+            if self.file is not None:
+                self.file.write(name + "\n")
+                self.file.flush()
+
+    def close(self, complete=False):
+        # complete: all files transferred. the journal file is removed so that the next
+        # transfer starts from scratch.
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if complete and self.filename is not None and os.path.exists(self.filename):
+            os.remove(self.filename)
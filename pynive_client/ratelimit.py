@@ -0,0 +1,224 @@
+# (c) 2013-2015 Nive GmbH - nive.io
+# This file is released under the BSD-License.
+#
+# Client side rate limits
+# -----------------------
+#
+"""
+Token bucket rate limits for service calls. Each request takes a token from the bucket
+of its service and, if configured, from the bucket of its method. Buckets hold up to
+`burst` tokens and are refilled with `rate` tokens per second. If a bucket is empty the
+request waits until a token is available, so bursts of calls (e.g. batch jobs) are
+spread out instead of exceeding service quotas ::
+
+    from pynive_client import ratelimit
+
+    limits = ratelimit.RateLimits(rate=20, burst=40,
+                                  services={'myfiles': 5},
+                                  methods={'newItem': 5, 'getItem': (50, 100), 'myfiles.write': 1})
+    storage = datastore.DataStore(service='mystorage', domain='mydomain', rateLimits=limits)
+    files = filestore.FileStore(service='myfiles', domain='mydomain', rateLimits=limits)
+
+Rates are given as number (burst = rate) or `(rate, burst)` tuple. Method limits apply
+to each service separately, `service.method` keys to a single service. A leading `@`
+of method names is ignored.
+
+Calls wait without limit unless `maxWait` is set. Calls which would wait longer raise
+`endpoint.RateLimitExceeded`, calls which would wait beyond their deadline
+`endpoint.DeadlineExceeded`. Each http attempt including retries takes a token.
+The same instance can be used by threads and asyncio clients.
+"""
+
+import threading
+
+from pynive_client.retry import Clock
+
+
+class TokenBucket(object):
+    """
+    Thread safe token bucket.
+    """
+
+    def __init__(self, rate, burst=None, clock=None):
+        """
+
+        :param rate: tokens per second
+        :param burst: maximum number of tokens. default is `rate` but at least 1.
+        :param clock: retry.Clock instance
+        """
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self.clock = clock or Clock()
+        self.tokens = self.burst
+        self.updated = self.clock.time()
+        self.requests = self.delayed = self.rejected = 0
+        self.waitTime = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, maxWait=None):
+        """
+        Takes a token. If the bucket is empty the token is reserved in advance.
+
+        :param maxWait: maximum wait in seconds
+        :return: seconds until the token is available or None if longer than `maxWait`
+        """
+        with self._lock:
+            self._refill()
+            wait = 0.0
+            if self.tokens < 1:
+                wait = (1 - self.tokens) / self.rate
+            if maxWait is not None and wait > maxWait:
+                self.rejected += 1
+                return None
+            self.tokens -= 1
+            self.requests += 1
+            if wait:
+                self.delayed += 1
+                self.waitTime += wait
+            return wait
+
+    def cancel(self):
+        """
+        Returns a token taken by `reserve()`.
+        """
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.burst, self.tokens + 1)
+            self.requests -= 1
+
+    def status(self):
+        """
+        :return: dict {rate, burst, tokens, requests, delayed, rejected, waitTime}
+        """
+        with self._lock:
+            self._refill()
+            return dict(rate=self.rate,
+                        burst=self.burst,
+                        tokens=self.tokens,
+                        requests=self.requests,
+                        delayed=self.delayed,
+                        rejected=self.rejected,
+                        waitTime=self.waitTime)
+
+    def _refill(self):
+        # called with lock held
+        now = self.clock.time()
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+
+class RateLimits(object):
+    """
+    Token buckets per (domain, service) and (domain, service, method).
+    """
+
+    def __init__(self, rate=None, burst=None, services=None, methods=None, maxWait=None, clock=None):
+        """
+
+        :param rate: default requests per second per service. None for no service limit.
+        :param burst: default burst per service
+        :param services: dict {service: rate or (rate, burst)}
+        :param methods: dict {method or 'service.method': rate or (rate, burst)}
+        :param maxWait: maximum wait in seconds
+        :param clock: retry.Clock instance
+        """
+        self.rate = rate
+        self.burst = burst
+        self.services = services or {}
+        self.methods = {}
+        for name, limit in (methods or {}).items():
+            self.methods[_name(name)] = limit
+        self.maxWait = maxWait
+        self.clock = clock or Clock()
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def buckets(self, domain, service, method):
+        """
+        Returns the buckets used for a call. Buckets are created on first use.
+
+        :return: list of TokenBucket
+        """
+        method = _name(method)
+        keys = ((domain, service), (domain, service, method))
+        buckets = []
+        with self._lock:
+            for key in keys:
+                if key in self._buckets:
+                    bucket = self._buckets[key]
+                else:
+                    bucket = self._buckets[key] = self._create(key)
+                if bucket is not None:
+                    buckets.append(bucket)
+        return buckets
+
+    def reserve(self, domain, service, method, maxWait=None):
+        """
+        Takes a token from each bucket used by the call.
+
+        :param maxWait: maximum wait in seconds. `self.maxWait` is used if shorter.
+        :return: seconds to wait before sending or None if longer than `maxWait`
+        """
+        if self.maxWait is not None:
+            maxWait = self.maxWait if maxWait is None else min(maxWait, self.maxWait)
+        wait = 0.0
+        taken = []
+        for bucket in self.buckets(domain, service, method):
+            delay = bucket.reserve(maxWait)
+            if delay is None:
+                for b in taken:
+                    b.cancel()
+                return None
+            taken.append(bucket)
+            wait = max(wait, delay)
+        return wait
+
+    def acquire(self, domain, service, method, maxWait=None):
+        """
+        Blocks until the call can be sent. Returns False if the call would wait longer
+        than `maxWait`.
+
+        :return: bool
+        """
+        wait = self.reserve(domain, service, method, maxWait)
+        if wait is None:
+            return False
+        if wait:
+            self.clock.sleep(wait)
+        return True
+
+    def states(self):
+        """
+        :return: dict {(domain, service) or (domain, service, method): status dict}
+        """
+        with self._lock:
+            buckets = [(key, bucket) for key, bucket in self._buckets.items() if bucket is not None]
+        return dict([(key, bucket.status()) for key, bucket in buckets])
+
+    def _create(self, key):
+        # called with lock held. returns None for calls without limit.
+        if len(key) == 2:
+            limit = self.services.get(key[1])
+            if limit is None and self.rate is not None:
+                limit = (self.rate, self.burst)
+        else:
+            limit = self.methods.get("%s.%s" % (key[1], key[2]))
+            if limit is None:
+                limit = self.methods.get(key[2])
+        if limit is None:
+            return None
+        if not isinstance(limit, (tuple, list)):
+            limit = (limit, None)
+        return TokenBucket(limit[0], limit[1], clock=self.clock)
+
+
+def _name(method):
+    # method name without leading @
+    method = method or ""
+    if method.startswith("@"):
+        return method[1:]
+    if ".@" in method:
+        return method.replace(".@", ".", 1)
+    return method
@@ -0,0 +1,168 @@
+# (c) 2013-2015 Nive GmbH - nive.io
+# This file is released under the BSD-License.
+#
+# Retry policy for service calls
+# ------------------------------
+#
+"""
+`RetryPolicy` decides whether and when a service call is repeated after a failed
+attempt. Assign a policy to a client instance to change the defaults ::
+
+    from pynive_client import retry
+
+    policy = retry.RetryPolicy(retries=3, backoff=0.5, deadline=5)
+    storage = datastore.DataStore(service='mystorage', domain='mydomain', retryPolicy=policy)
+
+Use `retry.RetryPolicy(retries=0)` to disable retries.
+
+In tests pass a `FakeClock` instance as `clock`. The fake clock does not block but
+advances its time by the requested sleep time.
+"""
+
+import email.utils
+import random
+import time
+
+
+class Clock(object):
+    """
+    Time source and sleep function used by retry policies.
+    """
+    # True if sleep() blocks. asyncio clients use asyncio.sleep() instead.
+    real = True
+
+    def time(self):
+        return time.time()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+class FakeClock(Clock):
+    """
+    Deterministic clock for tests. `sleep()` returns immediately and advances the time.
+    All sleeps are recorded in `sleeps`.
+    """
+    real = False
+
+    def __init__(self, now=0.0):
+        self.now = now
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class RetryPolicy(object):
+    """
+    Exponential backoff with jitter, a total deadline and idempotency classification.
+
+    - Attempt `n` (starting with 0) waits `backoff * factor**n` seconds limited to
+      `maxBackoff`. The delay is reduced randomly by up to `jitter` (0-1) percent.
+    - If the response contains a `Retry-After` header the header value is used instead.
+    - No retry is started if the total time including the delay would exceed `deadline`.
+    - Idempotent calls are retried for responses with `statusCodes`. Other calls are only
+      retried for `unsafeStatusCodes`. 503 responses are sent before the service processes
+      the request and are retried for all calls by default.
+    - A call is idempotent if the http method is GET or the service method name is listed
+      in `idempotent`. A leading `@` of filestore method names is ignored.
+    """
+
+    idempotent = frozenset((
+        # read calls
+        'getItem', 'list', 'keys', 'allowed', 'getPermissions', 'getOwner', 'read', 'ping', '',
+        'identity', 'name', 'profile', 'authenticated', 'getUser', 'identities',
+        # calls replacing values
+        'setItem', 'setPermissions', 'setOwner', 'write', 'setUser', 'update',
+    ))
+
+    def __init__(self, retries=5, backoff=0.2, factor=1.5, maxBackoff=2.0, jitter=0.5, deadline=5.0,
+                 statusCodes=(503, 504), unsafeStatusCodes=(503,), idempotent=None, clock=None):
+        """
+
+        :param retries: maximum number of retries
+        :param backoff: first delay in seconds
+        :param factor: delay multiplier for each further retry
+        :param maxBackoff: maximum delay in seconds
+        :param jitter: random delay reduction 0-1
+        :param deadline: maximum time in seconds for all attempts including delays
+        :param statusCodes: response codes retried for idempotent calls
+        :param unsafeStatusCodes: response codes retried for all calls
+        :param idempotent: set of idempotent service method names
+        :param clock: Clock instance
+        """
+        self.retries = retries
+        self.backoff = backoff
+        self.factor = factor
+        self.maxBackoff = maxBackoff
+        self.jitter = jitter
+        self.deadline = deadline
+        self.statusCodes = statusCodes
+        self.unsafeStatusCodes = unsafeStatusCodes
+        if idempotent is not None:
+            self.idempotent = frozenset(idempotent)
+        self.clock = clock or Clock()
+        self._random = random.Random()
+
+    def isIdempotent(self, method, httpmethod):
+        """
+        Returns True if the service call can safely be sent more than once.
+
+        :param method: service method name
+        :param httpmethod: GET, POST, PUT, DELETE
+        :return: bool
+        """
+        if httpmethod in ('GET', 'HEAD', 'OPTIONS'):
+            return True
+        method = method or ''
+        if method.startswith('@'):
+            method = method[1:]
+        return method in self.idempotent
+
+    def delay(self, attempt, method, httpmethod, response, elapsed):
+        """
+        Returns the delay in seconds before the next attempt or None if the call
+        should not be retried.
+
+        :param attempt: number of the failed attempt starting with 0
+        :param method: service method name
+        :param httpmethod:
+        :param response: response of the failed attempt
+        :param elapsed: seconds since the first attempt started
+        :return: seconds or None
+        """
+        if attempt >= self.retries:
+            return None
+        status = response.status_code
+        if not status in self.unsafeStatusCodes:
+            if not status in self.statusCodes or not self.isIdempotent(method, httpmethod):
+                return None
+        delay = self.retryAfter(response)
+        if delay is None:
+            delay = min(self.backoff * self.factor ** attempt, self.maxBackoff)
+            if self.jitter:
+                delay -= delay * self.jitter * self._random.random()
+        if self.deadline is not None and elapsed + delay > self.deadline:
+            return None
+        return delay
+
+    def retryAfter(self, response):
+        """
+        Returns the `Retry-After` header value in seconds or None.
+        """
+        headers = response.headers or {}
+        value = headers.get('Retry-After') or headers.get('retry-after')
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        date = email.utils.parsedate_tz(value)
+        if date is None:
+            return None
+        return max(0.0, email.utils.mktime_tz(date) - self.clock.time())
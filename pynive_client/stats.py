@@ -0,0 +1,204 @@
+# (c) 2013-2015 Nive GmbH - nive.io
+# This file is released under the BSD-License.
+#
+# Service call statistics
+# -----------------------
+#
+"""
+Fixed memory call statistics per service and method. Latencies are stored in log
+bucketed histograms with 10% precision. Memory usage does not depend on the
+number of calls. ::
+
+    from pynive_client import stats
+
+    statistics = stats.Statistics()
+    storage = datastore.DataStore(service='mystorage', domain='mydomain', stats=statistics)
+    files = filestore.FileStore(service='myfiles', domain='mydomain', stats=statistics)
+    ...
+    snapshot = statistics.snapshot(reset=True)
+    print(snapshot["services"]["mystorage"]["p95"])
+    print(snapshot["methods"][("mystorage", "getItem")]["errorsByType"])
+
+Statistics instances can be shared by clients and threads.
+"""
+
+import math
+import threading
+import time
+
+
+class Histogram(object):
+    """
+    Log bucketed histogram for positive values (e.g. seconds). Bucket `i` contains
+    values up to `minValue * growth**i`. Values above `maxValue` are counted in the last
+    bucket.
+    """
+
+    def __init__(self, minValue=0.0001, maxValue=600.0, growth=1.1):
+        self.minValue = minValue
+        self.growth = growth
+        self._log = math.log(growth)
+        self.size = int(math.ceil(math.log(maxValue / minValue) / self._log)) + 1
+        self.counts = [0] * self.size
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        if value <= self.minValue:
+            index = 0
+        else:
+            index = min(int(math.ceil(math.log(value / self.minValue) / self._log)), self.size - 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, p):
+        """
+        Returns the upper bound of the bucket containing the `p` percentile (0-100).
+        The result is limited by the largest recorded value. Values in the last bucket
+        return the largest recorded value.
+        """
+        if not self.count:
+            return None
+        rank = max(1, int(math.ceil(self.count * p / 100.0)))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                if index == self.size - 1:
+                    return self.max
+                return min(self.minValue * self.growth ** index, self.max)
+        return self.max
+
+    def mean(self):
+        if not self.count:
+            return None
+        return self.total / self.count
+
+    def merge(self, other):
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is None:
+                continue
+            if self.min is None or value < self.min:
+                self.min = value
+            if self.max is None or value > self.max:
+                self.max = value
+
+
+class CallStats(object):
+    """
+    Statistics for a single method or service.
+    """
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.calls = 0
+        self.errors = 0
+        self.errorsByType = {}
+        self.bytesSent = 0
+        self.bytesReceived = 0
+        self.bytesReceivedWire = 0
+
+    def add(self, seconds, sent=0, received=0, error=None, receivedWire=None):
+        self.calls += 1
+        self.latency.add(seconds)
+        self.bytesSent += sent or 0
+        self.bytesReceived += received or 0
+        if receivedWire is None:
+            receivedWire = received
+        self.bytesReceivedWire += receivedWire or 0
+        if error is not None:
+            self.errors += 1
+            name = error.__class__.__name__
+            self.errorsByType[name] = self.errorsByType.get(name, 0) + 1
+
+    def summary(self, duration):
+        latency = self.latency
+        return dict(calls=self.calls,
+                    errors=self.errors,
+                    errorsByType=dict(self.errorsByType),
+                    bytesSent=self.bytesSent,
+                    bytesReceived=self.bytesReceived,
+                    bytesReceivedWire=self.bytesReceivedWire,
+                    throughput=self.calls / duration if duration > 0 else None,
+                    mean=latency.mean(),
+                    min=latency.min,
+                    max=latency.max,
+                    p50=latency.percentile(50),
+                    p95=latency.percentile(95),
+                    p99=latency.percentile(99))
+
+
+class Statistics(object):
+    """
+    Thread safe call statistics per (service, method) and per service.
+    """
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._methods = {}
+        self._services = {}
+        self.since = clock()
+
+    def record(self, service, method, seconds, sent=0, received=0, error=None, receivedWire=None):
+        """
+        Records a single call.
+
+        :param service: service name
+        :param method: method name
+        :param seconds: call duration
+        :param sent: request body size in bytes as sent
+        :param received: decoded response body size in bytes
+        :param error: exception raised by the call
+        :param receivedWire: response body size in bytes as received. defaults to `received`.
+        """
+        with self._lock:
+            key = (service, method)
+            stats = self._methods.get(key)
+            if stats is None:
+                stats = self._methods[key] = CallStats()
+            stats.add(seconds, sent, received, error, receivedWire)
+            stats = self._services.get(service)
+            if stats is None:
+                stats = self._services[service] = CallStats()
+            stats.add(seconds, sent, received, error, receivedWire)
+
+    def snapshot(self, reset=False):
+        """
+        Returns the current statistics. Each entry contains `calls, errors, errorsByType,
+        bytesSent, bytesReceived, bytesReceivedWire, throughput (calls per second), mean, min,
+        max, p50, p95, p99`. Latencies are in seconds. `bytesReceived` counts decoded response
+        bodies, `bytesReceivedWire` bodies as transferred (e.g. gzip compressed).
+
+        :param reset: reset the statistics after the snapshot
+        :return: dict {since, duration, methods: {(service, method): dict}, services: {service: dict}}
+        """
+        with self._lock:
+            now = self.clock()
+            duration = now - self.since
+            result = dict(since=self.since,
+                          duration=duration,
+                          methods=dict([(k, v.summary(duration)) for k, v in self._methods.items()]),
+                          services=dict([(k, v.summary(duration)) for k, v in self._services.items()]))
+            if reset:
+                self._methods = {}
+                self._services = {}
+                self.since = now
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._methods = {}
+            self._services = {}
+            self.since = self.clock()
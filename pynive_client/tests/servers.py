@@ -0,0 +1,222 @@
+# (c) 2013-2015 Nive GmbH - nive.io
+# This file is released under the BSD-License.
+#
+# Local http servers for tests and benchmarks
+# -------------------------------------------
+#
+"""
+Local test servers used by the transport tests and `benchmarks/http2.py` ::
+
+    server = servers.Server(("127.0.0.1", 0), servers.Handler)
+    h2server = servers.H2Server()
+
+`H2Server` requires the `h2` package. `h2` is None if it is not installed.
+"""
+
+import gzip
+import json
+import socket
+import threading
+import time
+
+# python 2/3
+try:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    from SocketServer import ThreadingMixIn
+
+try:
+    import h2.config
+    import h2.connection
+    import h2.errors
+    import h2.events
+    import h2.exceptions
+except ImportError:
+    h2 = None
+
+
+class Handler(BaseHTTPRequestHandler):
+    """
+    HTTP/1.1 test service: files (@read), gzip, cookies, redirects, slow responses, echo
+    (POST) and uploads (PUT, also chunked).
+    """
+    protocol_version = "HTTP/1.1"
+    fileSize = 200000
+
+    def do_GET(self):
+        path = self.path
+        if path.endswith("@read"):
+            self.respond(b"x" * self.fileSize, "application/octet-stream")
+        elif path.endswith("gzip"):
+            self.respond(gzip.compress(b'{"compressed": true}'), encoding="gzip")
+        elif path.endswith("signin"):
+            self.respond(b'{}', cookie="session=abc123; Path=/")
+        elif path.endswith("cookie"):
+            self.respond(json.dumps({"cookie": self.headers.get("Cookie")}).encode("utf-8"))
+        elif path.endswith("moved"):
+            self.send_response(302)
+            self.send_header("Location", "/myservice/gzip")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif path.endswith("slow"):
+            time.sleep(0.5)
+            self.respond(b'{}')
+        else:
+            self.respond(b'{"message": "not found"}', status=404)
+
+    def do_POST(self):
+        if self.path.endswith("@read"):
+            self.body()
+            return self.do_GET()
+        body = self.body()
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        self.respond(body)
+
+    def do_PUT(self):
+        self.respond(json.dumps({"result": len(self.body())}).encode("utf-8"))
+
+    def body(self):
+        if self.headers.get("Transfer-Encoding") == "chunked":
+            data = b""
+            while True:
+                size = int(self.rfile.readline().strip(), 16)
+                chunk = self.rfile.read(size + 2)
+                if not size:
+                    return data
+                data += chunk[:-2]
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def respond(self, body, ct="application/json", status=200, encoding=None, cookie=None):
+        self.send_response(status)
+        self.send_header("Content-Type", ct)
+        self.send_header("Content-Length", str(len(body)))
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        if cookie:
+            self.send_header("Set-Cookie", cookie)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    # seconds echo (POST) responses are delayed
+    delay = 0.0
+
+    def handle_error(self, request, client_address):
+        # clients closing connections after timeouts
+        pass
+
+
+class H2Server(object):
+    """
+    Minimal HTTP/2 server without tls (prior knowledge). Responds to all requests with
+    the request body as json. Counts connections and requests.
+    """
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.connections = 0
+        self.requests = 0
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen(64)
+        self.port = self.sock.getsockname()[1]
+        self._lock = threading.Lock()
+        thread = threading.Thread(target=self._accept)
+        thread.daemon = True
+        thread.start()
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except (OSError, socket.error):
+            pass
+        self.sock.close()
+
+    def _accept(self):
+        while True:
+            try:
+                sock, address = self.sock.accept()
+            except (OSError, socket.error):
+                return
+            with self._lock:
+                self.connections += 1
+            thread = threading.Thread(target=self._serve, args=(sock,))
+            thread.daemon = True
+            thread.start()
+
+    def _serve(self, sock):
+        try:
+            self._respond(sock)
+        except (OSError, socket.error):
+            pass
+        finally:
+            sock.close()
+
+    def _respond(self, sock):
+        conn = h2.connection.H2Connection(config=h2.config.H2Configuration(client_side=False,
+                                                                          header_encoding="utf-8"))
+        conn.initiate_connection()
+        sock.sendall(conn.data_to_send())
+        bodies = {}
+        pending = {}
+        while True:
+            data = sock.recv(65535)
+            if not data:
+                return
+            try:
+                events = conn.receive_data(data)
+            except h2.exceptions.ProtocolError:
+                # e.g. streams opened out of order by concurrent client threads.
+                # answered with GOAWAY like other servers so clients fail instead of waiting.
+                conn.close_connection(error_code=h2.errors.ErrorCodes.PROTOCOL_ERROR)
+                sock.sendall(conn.data_to_send())
+                return
+            ended = []
+            for event in events:
+                if isinstance(event, h2.events.RequestReceived):
+                    bodies[event.stream_id] = b""
+                elif isinstance(event, h2.events.DataReceived):
+                    bodies[event.stream_id] += event.data
+                    conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                elif isinstance(event, h2.events.StreamEnded):
+                    ended.append(event.stream_id)
+                elif isinstance(event, h2.events.StreamReset):
+                    pending.pop(event.stream_id, None)
+                elif isinstance(event, h2.events.ConnectionTerminated):
+                    return
+            if ended and self.delay:
+                time.sleep(self.delay)
+            for stream_id in ended:
+                body = bodies.pop(stream_id) or b"{}"
+                with self._lock:
+                    self.requests += 1
+                conn.send_headers(stream_id, [(":status", "200"),
+                                              ("content-type", "application/json"),
+                                              ("content-length", str(len(body)))])
+                pending[stream_id] = body
+            self._flush(conn, pending)
+            sock.sendall(conn.data_to_send())
+
+    def _flush(self, conn, pending):
+        # sends response bodies within flow control windows. the rest is sent after
+        # WINDOW_UPDATE frames.
+        for stream_id, body in list(pending.items()):
+            while body:
+                size = min(len(body), conn.local_flow_control_window(stream_id), conn.max_outbound_frame_size)
+                if size <= 0:
+                    break
+                conn.send_data(stream_id, body[:size])
+                body = body[size:]
+            if body:
+                pending[stream_id] = body
+            else:
+                conn.end_stream(stream_id)
+                del pending[stream_id]
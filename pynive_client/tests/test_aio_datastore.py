@@ -0,0 +1,82 @@
+import unittest
+import logging
+
+from pynive_client import adapter
+from pynive_client import endpoint
+from pynive_client.aio import adapter as aioadapter
+from pynive_client.aio import datastore
+from pynive_client.tests.test_aio_endpoint import run
+
+
+class asyncDatastoreTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig()
+        session = aioadapter.AsyncMockAdapter()
+        self.service = datastore.DataStore(service="mystorage", domain="mydomain", session=session)
+
+    def test_setup(self):
+        self.assertTrue(self.service.options["service"]=="mystorage")
+        self.assertTrue(self.service.options["version"]==self.service.default_version)
+
+    def test_getItem(self):
+        r = adapter.StoredResponse(service="mystorage",
+                                   method="getItem",
+                                   httpmethod="POST",
+                                   payload={"key": "key1"},
+                                   response={
+                                      "status_code": 200,
+                                      "content": {"items": [{"key":"key1", "value":"value1"}]},
+                                      "headers": {"Content-Type":"application/json"}
+                                   })
+        self.service.session.responses=(r,)
+        result = run(self.service.getItem(key="key1"))
+        self.assertEqual(result.items[0]["value"], "value1")
+
+    def test_newItem(self):
+        r = adapter.StoredResponse(service="mystorage",
+                                   method="newItem",
+                                   httpmethod="POST",
+                                   response={
+                                      "status_code": 200,
+                                      "content": {"result":2, "success": ("key1","key2")},
+                                      "headers": {"Content-Type":"application/json"}
+                                   })
+        self.service.session.responses=(r,)
+        result = run(self.service.newItem(items=({"key":"key1", "value":"value1"},
+                                                 {"key":"key2", "value":"value2"})))
+        self.assertTrue(result==2)
+        self.assertEqual(len(result.success), 2)
+
+    def test_removeItem(self):
+        r = adapter.StoredResponse(service="mystorage",
+                                   method="removeItem",
+                                   httpmethod="POST",
+                                   response={
+                                      "status_code": 200,
+                                      "content": {"result":2, "success": ("key1","key2")},
+                                      "headers": {"Content-Type":"application/json"}
+                                   })
+        self.service.session.responses=(r,)
+        result = run(self.service.removeItem(key=["key1","key2"]))
+        self.assertTrue(result==2)
+
+    def test_list(self):
+        r = adapter.StoredResponse(service="mystorage",
+                                   method="list",
+                                   httpmethod="POST",
+                                   response={
+                                      "status_code": 200,
+                                      "content": {"items": [{"key":"key1"}], "start": 1, "size": 1, "total": 1},
+                                      "headers": {"Content-Type":"application/json"}
+                                   })
+        self.service.session.responses=(r,)
+        result = run(self.service.list(size=1))
+        self.assertEqual(result.total, 1)
+
+    def test_failure(self):
+        r = adapter.StoredResponse(service="mystorage",
+                                   method="getItem",
+                                   response={"status_code": 401})
+        self.service.session.responses=(r,)
+        self.assertRaises(endpoint.AuthorizationFailure, run, self.service.getItem(key="key1"))
@@ -0,0 +1,256 @@
+import unittest
+import asyncio
+import json
+import logging
+import threading
+
+from pynive_client import endpoint
+from pynive_client import adapter
+from pynive_client import retry
+from pynive_client import trace
+from pynive_client import auth
+from pynive_client import concurrency
+from pynive_client import ratelimit
+from pynive_client.aio import endpoint as aioendpoint
+from pynive_client.aio import adapter as aioadapter
+from pynive_client.aio import coalesce as aiocoalesce
+from pynive_client.aio import batch as aiobatch
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+class asyncClientTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig()
+
+    def test_setup(self):
+        client = aioendpoint.AsyncClient(service="myservice", domain="mydomain")
+        self.assertTrue(client.options["service"]=="myservice")
+        self.assertTrue(client.session is None)
+        self.assertEqual(client.url("call"), endpoint.makeUrl("call", service="myservice", domain="mydomain"))
+
+    def test_newSession(self):
+        client = aioendpoint.AsyncClient(service="myservice", domain="mydomain")
+        session = client.newSession(pool_connections=2, pool_maxsize=20, auth="token")
+        self.assertTrue(isinstance(session, aioendpoint.HttpAdapter))
+        self.assertTrue(client.session is session)
+        self.assertEqual(session.authtoken, "token")
+        self.assertEqual(session.limit, 40)
+        self.assertEqual(session.limit_per_host, 20)
+
+    def test_callmock(self):
+        client = aioendpoint.AsyncClient(service="myservice", domain="mydomain")
+        client.adapter = aioadapter.AsyncMockAdapter()
+        self.assertRaises(endpoint.NotFound, run, client.call("not found", {}, {}))
+        self.assertRaises(endpoint.NotFound, run, client.call("not found", {"key1": 123}, {}))
+        self.assertEqual(client.counter, 2)
+
+    def test_call(self):
+        r = adapter.StoredResponse(service="myservice",
+                                   method="call",
+                                   httpmethod="POST",
+                                   response={
+                                      "status_code": 200,
+                                      "content": {"result": 1},
+                                      "headers": {"Content-Type":"application/json"}
+                                   })
+        client = aioendpoint.AsyncClient(service="myservice", domain="mydomain", version="api", stats={})
+        client.adapter = aioadapter.AsyncMockAdapter(responses=(r,))
+        content, response = run(client.call("call", {"key1": 123}, {}))
+        self.assertEqual(content, {"result": 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(client.stats.snapshot()["methods"][("myservice", "call")]["calls"], 1)
+
+    def test_ping(self):
+        r = adapter.StoredResponse(service="myservice",
+                                   method="@ping",
+                                   response={
+                                      "status_code": 200,
+                                      "content": {"result": 1},
+                                      "headers": {"Content-Type":"application/json"}
+                                   })
+        client = aioendpoint.AsyncClient(service="myservice", domain="mydomain", version="api",
+                                         session=aioadapter.AsyncMockAdapter(responses=(r,)))
+        result = run(client.ping())
+        self.assertTrue(result)
+
+    def test_send_retry(self):
+        r = adapter.StoredResponse(service="myservice",
+                                   method="call",
+                                   response={"status_code": 503})
+        client = aioendpoint.AsyncClient(service="myservice", domain="mydomain", version="api",
+                                         session=aioadapter.AsyncMockAdapter(responses=(r,)))
+        clock = retry.FakeClock()
+        client.retryPolicy = retry.RetryPolicy(retries=2, clock=clock)
+        response = run(client._send(client.url("call"), "call", {}))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(clock.sleeps), 2)
+        self.assertRaises(endpoint.ServiceFailure, run, client.call("call", {}, {}))
+
+    def test_trace(self):
+        r = adapter.StoredResponse(service="myservice",
+                                   method="call",
+                                   httpmethod="POST",
+                                   response={
+                                      "status_code": 200,
+                                      "content": {"result": 1},
+                                      "headers": {"Content-Type":"application/json"}
+                                   })
+        exporter = trace.InMemorySpanExporter()
+        client = aioendpoint.AsyncClient(service="myservice", domain="mydomain", version="api",
+                                         tracer=trace.SpanHooks(exporter=exporter),
+                                         session=aioadapter.AsyncMockAdapter(responses=(r,)))
+        async def calls():
+            return await asyncio.gather(client.call("call", {"key": 1}, {}), client.call("call", {"key": 2}, {}))
+        run(calls())
+        spans = exporter.getFinishedSpans()
+        calls = dict([(s.spanId, s) for s in spans if s.kind == "CLIENT"])
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(len(spans), 6)
+        for span in spans:
+            if span.kind == "INTERNAL":
+                self.assertEqual(calls[span.parentSpanId].traceId, span.traceId)
+        self.assertEqual(trace.current(), None)
+
+    def test_singleFlight(self):
+        requests = []
+        class Adapter(aioadapter.AsyncMockAdapter):
+            async def request(self, method, url, **settings):
+                requests.append(url)
+                await asyncio.sleep(0.01)
+                return adapter.MockResponse(status_code=200, headers={"Content-Type": "application/json"},
+                                            content={"result": 1}, url=url)
+        flight = aiocoalesce.SingleFlight()
+        client = aioendpoint.AsyncClient(service="myservice", domain="mydomain", singleFlight=flight,
+                                         session=Adapter())
+        async def calls():
+            return await asyncio.gather(*[client.call("getItem", {"key": 1}, {}) for i in range(5)])
+        results = run(calls())
+        self.assertEqual(len(requests), 1)
+        self.assertEqual([r[0] for r in results], [{"result": 1}] * 5)
+        self.assertEqual(flight.stats(), {"calls": 5, "shared": 4, "inFlight": 0})
+        run(client.call("setItem", {"key": 1}, {}))
+        self.assertEqual(len(requests), 2)
+        # waiting calls keep their own deadline
+        async def deadline():
+            return await asyncio.gather(client.call("getItem", {"key": 1}, {}),
+                                        client.call("getItem", {"key": 1}, {"deadline": 0.001}),
+                                        return_exceptions=True)
+        results = run(deadline())
+        self.assertEqual(results[0][0], {"result": 1})
+        self.assertTrue(isinstance(results[1], endpoint.DeadlineExceeded))
+
+    def test_tokenManager(self):
+        class User(object):
+            calls = 0
+            threads = []
+            def token(self, identity=None, password=None, **reqSettings):
+                User.calls += 1
+                User.threads.append(threading.current_thread())
+                return endpoint.Result(token="token-%d" % User.calls)
+        sent = []
+        class Adapter(aioadapter.AsyncMockAdapter):
+            async def request(self, method, url, **settings):
+                token = settings["headers"].get("x-auth-token")
+                sent.append(token)
+                return adapter.MockResponse(status_code=200 if token == "token-2" else 401, url=url,
+                                            content={"result": 1}, headers={"Content-Type": "application/json"})
+        client = aioendpoint.AsyncClient(service="myservice", domain="mydomain", session=Adapter(),
+                                         tokenManager=auth.TokenManager(User()))
+        content, response = run(client.call("getItem", {"key": 1}, {}))
+        self.assertEqual(content, {"result": 1})
+        self.assertEqual(sent, ["token-1", "token-2"])
+        # tokens are obtained outside of the event loop
+        self.assertFalse(threading.current_thread() in User.threads)
+        run(client.call("getItem", {"key": 1}, {}))
+        self.assertEqual(User.calls, 2)
+
+    def test_deadline(self):
+        class Adapter(aioadapter.AsyncMockAdapter):
+            async def request(self, method, url, **settings):
+                await asyncio.sleep(1.0)
+                return adapter.MockResponse(status_code=200, url=url)
+        client = aioendpoint.AsyncClient(service="myservice", domain="mydomain", session=Adapter())
+        self.assertRaises(endpoint.DeadlineExceeded, run, client.call("getItem", {"key": 1}, {"deadline": 0.05}))
+        self.assertRaises(endpoint.DeadlineExceeded, run, client.request("file.txt", deadline=0.05))
+
+    def test_concurrencyLimiter(self):
+        state = {"active": 0, "max": 0}
+        class Adapter(aioadapter.AsyncMockAdapter):
+            async def request(self, method, url, **settings):
+                state["active"] += 1
+                state["max"] = max(state["max"], state["active"])
+                await asyncio.sleep(0.01)
+                state["active"] -= 1
+                return adapter.MockResponse(status_code=200, url=url, content={"result": 1},
+                                            headers={"Content-Type": "application/json"})
+        limiters = concurrency.ConcurrencyLimiters(initial=2)
+        client = aioendpoint.AsyncClient(service="myservice", domain="mydomain", session=Adapter(),
+                                         concurrencyLimiters=limiters)
+        async def calls():
+            return await asyncio.gather(*[client.call("getItem", {"key": n}, {}) for n in range(6)])
+        results = run(calls())
+        self.assertEqual(len(results), 6)
+        self.assertEqual(state["max"], 2)
+        status = client.concurrencyLimiter().status()
+        self.assertEqual(status["inflight"], 0)
+        self.assertEqual(status["maxWaiting"], 4)
+
+    def test_rateLimits(self):
+        sent = []
+        class Adapter(aioadapter.AsyncMockAdapter):
+            async def request(self, method, url, **settings):
+                sent.append(loop.time())
+                return adapter.MockResponse(status_code=200, url=url, content={"result": 1},
+                                            headers={"Content-Type": "application/json"})
+        limits = ratelimit.RateLimits(rate=20, burst=1)
+        client = aioendpoint.AsyncClient(service="myservice", domain="mydomain", session=Adapter(),
+                                         rateLimits=limits)
+        loop = None
+        async def calls():
+            nonlocal loop
+            loop = asyncio.get_event_loop()
+            return await asyncio.gather(*[client.call("getItem", {"key": n}, {}) for n in range(3)])
+        results = run(calls())
+        self.assertEqual(len(results), 3)
+        self.assertTrue(sent[2] - sent[0] >= 0.09)
+        self.assertEqual(limits.states()[("mydomain", "myservice")]["delayed"], 2)
+
+    def test_gather(self):
+        async def value(v, delay=0):
+            await asyncio.sleep(delay)
+            return v
+        async def fail():
+            raise endpoint.NotFound("x")
+        results = run(aiobatch.gather(value(1), fail(), value(3, 1.0), value(4), deadline=0.1))
+        self.assertEqual(results[0], 1)
+        self.assertTrue(isinstance(results[1], endpoint.NotFound))
+        self.assertTrue(isinstance(results[2], endpoint.DeadlineExceeded))
+        self.assertEqual(results[3], 4)
+        self.assertEqual(run(aiobatch.gather()), [])
+
+    def test_handleResponse(self):
+        client = aioendpoint.AsyncClient(service="myservice", domain="mydomain")
+        resp = adapter.MockResponse()
+        resp.status_code = 200
+        resp.content = json.dumps({"key1": 123})
+        resp.headers["Content-Type"] = "application/json"
+        c,r = run(client._handleResponse(resp, "call", {}, {}))
+        self.assertEqual(c["key1"], 123)
+
+        resp.status_code = 403
+        self.assertRaises(endpoint.Forbidden, run, client._handleResponse(resp, "call", {}, {}))
+        resp.status_code = 413
+        self.assertRaises(endpoint.ServiceLimits, run, client._handleResponse(resp, "call", {}, {}))
+
+    def test_response(self):
+        resp = aioendpoint.Response(200, "OK", {}, "http://mydomain", b'{"a": 1}', None)
+        self.assertEqual(resp.json(), {"a": 1})
+        self.assertEqual(list(resp.iter_content(5)), [b'{"a":', b' 1}'])
@@ -0,0 +1,62 @@
+import unittest
+import logging
+
+from pynive_client import adapter
+from pynive_client import endpoint
+from pynive_client.aio import adapter as aioadapter
+from pynive_client.aio import filestore
+from pynive_client.tests.test_aio_endpoint import run
+
+
+class asyncFilestoreTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig()
+        session = aioadapter.AsyncMockAdapter()
+        self.storage = filestore.FileStore(service="mystorage", domain="mydomain", session=session)
+
+    def test_getItem(self):
+        r = adapter.StoredResponse(service="mystorage",
+                                   method="@getItem",
+                                   httpmethod="POST",
+                                   response={
+                                      "status_code": 200,
+                                      "content": {"name": "file1.txt", "type": "f", "size": 10},
+                                      "headers": {"Content-Type":"application/json"}
+                                   })
+        self.storage.session.responses=(r,)
+        result = run(self.storage.getItem("file1.txt"))
+        self.assertEqual(result.name, "file1.txt")
+
+    def test_write(self):
+        r = adapter.StoredResponse(service="mystorage",
+                                   method="@write",
+                                   httpmethod="PUT",
+                                   response={
+                                      "status_code": 200,
+                                      "content": {"result": 1},
+                                      "headers": {"Content-Type":"application/json"}
+                                   })
+        self.storage.session.responses=(r,)
+        result = run(self.storage.write("file1.txt", "contents", mime="text/plain"))
+        self.assertTrue(result)
+
+    def test_list(self):
+        r = adapter.StoredResponse(service="mystorage",
+                                   method="@list",
+                                   httpmethod="POST",
+                                   response={
+                                      "status_code": 200,
+                                      "content": {"items": [{"name": "file1.txt"}, {"name": "file2.txt"}]},
+                                      "headers": {"Content-Type":"application/json"}
+                                   })
+        self.storage.session.responses=(r,)
+        items = run(self.storage.list("/"))
+        self.assertEqual(len(items), 2)
+
+    def test_failure(self):
+        r = adapter.StoredResponse(service="mystorage",
+                                   method="@removeItem",
+                                   response={"status_code": 403})
+        self.storage.session.responses=(r,)
+        self.assertRaises(endpoint.Forbidden, run, self.storage.removeItem("file1.txt"))
@@ -0,0 +1,73 @@
+import unittest
+import logging
+
+from pynive_client import adapter
+from pynive_client import endpoint
+from pynive_client.aio import adapter as aioadapter
+from pynive_client.aio import userstore
+from pynive_client.tests.test_aio_endpoint import run
+
+
+class asyncUserTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig()
+        session = aioadapter.AsyncMockAdapter()
+        self.user = userstore.User(domain="mydomain", session=session)
+
+    def test_setup(self):
+        self.assertTrue(self.user.options["service"]==self.user.service_name)
+        self.assertRaises(TypeError, userstore.User, domain="mydomain", service="myservice")
+
+    def test_token(self):
+        r = adapter.StoredResponse(service="users",
+                                   method="token",
+                                   httpmethod="POST",
+                                   response={
+                                      "status_code": 200,
+                                      "content": {"token": "0123456789"},
+                                      "headers": {"Content-Type":"application/json"}
+                                   })
+        self.user.session.responses=(r,)
+        result = run(self.user.token(identity="name", password="password", storeInSession=True))
+        self.assertEqual(result.token, "0123456789")
+        self.assertEqual(self.user.session.authtoken, "0123456789")
+
+    def test_token_failure(self):
+        r = adapter.StoredResponse(service="users",
+                                   method="token",
+                                   httpmethod="POST",
+                                   response={
+                                      "status_code": 200,
+                                      "content": {"token": None},
+                                      "headers": {"Content-Type":"application/json"}
+                                   })
+        self.user.session.responses=(r,)
+        self.assertRaises(endpoint.AuthorizationFailure, run, self.user.token(identity="name", password="password"))
+
+    def test_profile(self):
+        r = adapter.StoredResponse(service="users",
+                                   method="profile",
+                                   httpmethod="POST",
+                                   response={
+                                      "status_code": 200,
+                                      "content": {"name": "name", "email": "name@mail.com"},
+                                      "headers": {"Content-Type":"application/json"}
+                                   })
+        self.user.session.responses=(r,)
+        result = run(self.user.profile())
+        self.assertEqual(result.name, "name")
+
+    def test_signout(self):
+        r = adapter.StoredResponse(service="users",
+                                   method="signout",
+                                   response={
+                                      "status_code": 200,
+                                      "content": {"result": True},
+                                      "headers": {"Content-Type":"application/json"}
+                                   })
+        self.user.session.responses=(r,)
+        self.user.session.authtoken = "0123456789"
+        result = run(self.user.signout())
+        self.assertTrue(result)
+        self.assertTrue(self.user.session.authtoken is None)
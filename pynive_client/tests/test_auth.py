@@ -0,0 +1,164 @@
+
+import unittest
+import logging
+import threading
+import time
+
+from pynive_client import adapter
+from pynive_client import auth
+from pynive_client import datastore
+from pynive_client import endpoint
+from pynive_client import filestore
+from pynive_client import retry
+
+
+class FakeUser(object):
+
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+
+    def token(self, identity=None, password=None, **reqSettings):
+        if self.fail:
+            raise endpoint.AuthorizationFailure("failed")
+        self.calls += 1
+        return endpoint.Result(token="token-%d" % self.calls, message=None)
+
+
+class tokenManagerTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig()
+        self.user = FakeUser()
+        self.clock = retry.FakeClock()
+        self.tokens = auth.TokenManager(self.user, "me", "pw", lifetime=100, refreshBefore=10, clock=self.clock)
+
+    def test_cache(self):
+        self.assertEqual(self.tokens.token(), "token-1")
+        self.clock.sleep(89)
+        self.assertEqual(self.tokens.token(), "token-1")
+        self.clock.sleep(1)
+        self.assertEqual(self.tokens.token(), "token-2")
+        self.assertEqual(self.tokens.expires, 190)
+        self.assertEqual(self.user.calls, 2)
+
+    def test_cached(self):
+        self.assertEqual(self.tokens.cached(), None)
+        self.assertEqual(self.tokens.token(), "token-1")
+        self.assertEqual(self.tokens.cached(), "token-1")
+        self.clock.sleep(90)
+        self.assertEqual(self.tokens.cached(), None)
+        self.assertEqual(self.user.calls, 1)
+
+    def test_cached_invalidate(self):
+        # token invalidated or replaced while cached() is running
+        tokens = self.tokens
+        class Clock(retry.FakeClock):
+            def time(self):
+                if self.action:
+                    action, self.action = self.action, None
+                    action()
+                return retry.FakeClock.time(self)
+        clock = Clock()
+        clock.action = None
+        tokens.clock = clock
+        tokens.token()
+        clock.action = tokens.invalidate
+        self.assertEqual(tokens.cached(), "token-1")
+        self.assertEqual(tokens.cached(), None)
+        tokens.token()
+        clock.action = tokens.refresh
+        self.assertEqual(tokens.cached(), "token-2")
+        self.assertEqual(tokens.cached(), "token-3")
+
+    def test_refresh(self):
+        self.assertEqual(self.tokens.token(), "token-1")
+        self.assertEqual(self.tokens.refresh("token-1"), "token-2")
+        # already refreshed by another call
+        self.assertEqual(self.tokens.refresh("token-1"), "token-2")
+        self.assertEqual(self.tokens.refresh(), "token-3")
+        self.tokens.invalidate()
+        self.assertEqual(self.tokens.token(), "token-4")
+
+    def test_failure(self):
+        self.user.fail = True
+        self.assertRaises(endpoint.AuthorizationFailure, self.tokens.token)
+        self.assertEqual(self.tokens.stats()["failures"], 1)
+
+    def test_concurrent(self):
+        tokens = []
+        def run():
+            tokens.append(self.tokens.token())
+        threads = [threading.Thread(target=run) for i in range(10)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(tokens, ["token-1"] * 10)
+        self.assertEqual(self.user.calls, 1)
+
+    def test_background(self):
+        tokens = auth.TokenManager(self.user, "me", "pw", lifetime=0.2, refreshBefore=0.1)
+        tokens.start()
+        try:
+            for i in range(100):
+                if self.user.calls >= 3:
+                    break
+                time.sleep(0.02)
+            self.assertTrue(self.user.calls >= 3)
+            self.assertTrue(tokens.stats()["running"])
+        finally:
+            tokens.stop()
+        self.assertFalse(tokens.stats()["running"])
+
+
+class clientTokenTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig()
+        self.user = FakeUser()
+        self.tokens = auth.TokenManager(self.user, "me", "pw")
+        self.sent = []
+        self.valid = None
+
+    def request(self, method, url, **settings):
+        token = settings["headers"].get("x-auth-token")
+        self.sent.append(token)
+        if self.valid is not None and token != self.valid:
+            return adapter.MockResponse(status_code=401, url=url)
+        return adapter.MockResponse(status_code=200, url=url, content={"result": 1},
+                                    headers={"Content-Type": "application/json"})
+
+    def client(self, cls, service):
+        client = cls(service=service, domain="mydomain", tokenManager=self.tokens)
+        client.adapter = adapter.MockAdapter()
+        client.adapter.request = self.request
+        return client
+
+    def test_shared(self):
+        storage = self.client(datastore.DataStore, "mystorage")
+        files = self.client(filestore.FileStore, "myfiles")
+        storage.ping()
+        files.ping()
+        storage.ping()
+        self.assertEqual(self.sent, ["token-1"] * 3)
+        self.assertEqual(self.user.calls, 1)
+
+    def test_401(self):
+        storage = self.client(datastore.DataStore, "mystorage")
+        storage.ping()
+        # token revoked
+        self.valid = "token-2"
+        self.assertEqual(storage.ping(), 1)
+        self.assertEqual(self.sent, ["token-1", "token-1", "token-2"])
+        # retried only once
+        self.valid = "other"
+        self.assertRaises(endpoint.AuthorizationFailure, storage.ping)
+        self.assertEqual(self.sent[3:], ["token-2", "token-3"])
+
+    def test_explicit(self):
+        storage = self.client(datastore.DataStore, "mystorage")
+        self.valid = "token-1"
+        self.assertRaises(endpoint.AuthorizationFailure, storage.ping, auth="mytoken")
+        self.assertEqual(self.sent, ["mytoken"])
+        self.assertEqual(self.user.calls, 0)
@@ -0,0 +1,131 @@
+
+import unittest
+import threading
+import time
+
+from pynive_client import adapter
+from pynive_client import batch
+from pynive_client import datastore
+from pynive_client import endpoint
+from pynive_client import filestore
+from pynive_client import userstore
+
+
+class batchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.delays = {}
+        self.settings = {}
+        self.storage = self.client(datastore.DataStore, "mystorage")
+        self.files = self.client(filestore.FileStore, "myfiles")
+        self.user = self.client(userstore.User, "users")
+
+    def client(self, cls, service):
+        if cls is userstore.User:
+            client = cls(domain="mydomain")
+        else:
+            client = cls(service=service, domain="mydomain")
+        client.adapter = adapter.MockAdapter()
+        client.adapter.request = self.request
+        return client
+
+    def request(self, method, url, **settings):
+        name = url.split("/")[-1]
+        self.settings[name] = settings
+        time.sleep(self.delays.get(name, 0))
+        if name == "getPermissions":
+            return adapter.MockResponse(status_code=404, url=url)
+        return adapter.MockResponse(status_code=200, url=url, headers={"Content-Type": "application/json"},
+                                    content={"result": 1, "items": [{"key": name}], "name": name})
+
+    def test_run(self):
+        b = batch.Batch()
+        self.assertEqual(b.add(self.user.profile), 0)
+        self.assertEqual(b.add(self.storage.getItem, key="1"), 1)
+        b.add(self.files.getItem, "images/logo.png")
+        b.add(self.storage.getPermissions, key="1")
+        self.assertEqual(len(b), 4)
+        self.delays["profile"] = 0.05
+        results = b.run()
+        self.assertEqual(results[0].name, "profile")
+        self.assertEqual(results[1].items, [{"key": "getItem"}])
+        self.assertEqual(results[2].name, "@getItem")
+        self.assertTrue(isinstance(results[3], endpoint.NotFound))
+        self.assertEqual(b.timedOut, [])
+        # no timeout without deadline
+        self.assertEqual(self.settings["profile"]["timeout"], None)
+
+    def test_concurrent(self):
+        b = batch.Batch()
+        for i in range(5):
+            b.add(self.user.profile)
+        self.delays["profile"] = 0.1
+        start = time.time()
+        results = b.run()
+        self.assertTrue(time.time() - start < 0.4)
+        self.assertEqual(len(results), 5)
+
+    def test_deadline(self):
+        self.delays["profile"] = 0.5
+        b = batch.Batch(deadline=0.2)
+        b.add(self.user.profile)
+        b.add(self.storage.getItem, key="1")
+        start = time.time()
+        results = b.run()
+        self.assertTrue(time.time() - start < 0.45)
+        self.assertTrue(isinstance(results[0], endpoint.DeadlineExceeded))
+        self.assertTrue("users.profile" in str(results[0]))
+        self.assertEqual(results[1].items, [{"key": "getItem"}])
+        self.assertEqual(b.timedOut, [0])
+        # the batch deadline limits the request timeout
+        connect, read = self.settings["getItem"]["timeout"]
+        self.assertTrue(0 < read <= 0.2)
+
+    def test_cancel(self):
+        pool = batch.Pool(workers=1)
+        calls = []
+        def slow():
+            time.sleep(0.3)
+        b = batch.Batch(deadline=0.1, pool=pool)
+        b.add(slow)
+        b.add(calls.append, 1)
+        results = b.run()
+        self.assertEqual(b.timedOut, [0, 1])
+        time.sleep(0.3)
+        # not started before the deadline
+        self.assertEqual(calls, [])
+
+    def test_gather(self):
+        results = batch.gather(self.user.profile,
+                               (self.storage.getItem, (), {"key": "1"}),
+                               (len, ("abc",)),
+                               (int, ("x",)))
+        self.assertEqual(results[0].name, "profile")
+        self.assertEqual(results[1].items, [{"key": "getItem"}])
+        self.assertEqual(results[2], 3)
+        self.assertTrue(isinstance(results[3], ValueError))
+        self.assertEqual(batch.gather(), [])
+
+    def test_pool(self):
+        pool = batch.Pool(workers=2)
+        lock = threading.Lock()
+        active = [0, 0]
+        def call():
+            with lock:
+                active[0] += 1
+                active[1] = max(active)
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+        results = batch.gather(*[call] * 6, pool=pool)
+        self.assertEqual(results, [None] * 6)
+        self.assertEqual(active[1], 2)
+        self.assertEqual(len(pool._threads), 2)
+        batch.gather(*[call] * 6, pool=pool)
+        self.assertEqual(len(pool._threads), 2)
+        self.assertTrue(batch.sharedPool() is batch.sharedPool())
+        threads = list(pool._threads)
+        pool.close()
+        for thread in threads:
+            thread.join(1.0)
+            self.assertFalse(thread.is_alive())
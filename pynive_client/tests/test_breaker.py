@@ -0,0 +1,177 @@
+import unittest
+import logging
+
+from pynive_client import adapter
+from pynive_client import breaker
+from pynive_client import endpoint
+from pynive_client import retry
+
+
+class breakerTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig()
+        self.clock = retry.FakeClock()
+        self.breaker = breaker.CircuitBreaker(name="test", errorRate=0.5, window=4, minCalls=4,
+                                              resetTimeout=10, probes=2, clock=self.clock)
+
+    def fail(self, n):
+        for i in range(n):
+            probe = self.breaker.allow()
+            self.breaker.record(False, probe=probe)
+
+    def succeed(self, n):
+        for i in range(n):
+            probe = self.breaker.allow()
+            self.breaker.record(True, probe=probe)
+
+    def test_closed(self):
+        self.succeed(3)
+        self.fail(1)
+        self.assertEqual(self.breaker.state, breaker.CLOSED)
+        self.assertEqual(self.breaker.status()["failures"], 1)
+
+    def test_open(self):
+        self.succeed(2)
+        self.fail(2)
+        self.assertEqual(self.breaker.state, breaker.OPEN)
+        self.assertRaises(endpoint.CircuitOpen, self.breaker.allow)
+        self.assertRaises(endpoint.ServiceFailure, self.breaker.allow)
+        self.assertEqual(self.breaker.status()["rejected"], 2)
+
+    def test_minCalls(self):
+        self.fail(3)
+        self.assertEqual(self.breaker.state, breaker.CLOSED)
+        self.fail(1)
+        self.assertEqual(self.breaker.state, breaker.OPEN)
+
+    def test_halfopen_close(self):
+        self.fail(4)
+        self.clock.sleep(10)
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, breaker.HALF_OPEN)
+        self.assertTrue(self.breaker.allow())
+        # only two probes
+        self.assertRaises(endpoint.CircuitOpen, self.breaker.allow)
+        self.breaker.record(True, probe=True)
+        self.breaker.record(True, probe=True)
+        self.assertEqual(self.breaker.state, breaker.CLOSED)
+        self.assertFalse(self.breaker.allow())
+
+    def test_halfopen_open(self):
+        self.fail(4)
+        self.clock.sleep(10)
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record(False, probe=True)
+        self.assertEqual(self.breaker.state, breaker.OPEN)
+        self.assertEqual(self.breaker.status()["opened"], 2)
+        self.assertRaises(endpoint.CircuitOpen, self.breaker.allow)
+
+    def test_slow(self):
+        b = breaker.CircuitBreaker(errorRate=0.5, window=2, minCalls=2, slowCall=1.0, clock=self.clock)
+        b.record(True, elapsed=1.5)
+        b.record(True, elapsed=0.5)
+        self.assertEqual(b.state, breaker.OPEN)
+
+    def test_cancel(self):
+        self.fail(4)
+        self.clock.sleep(10)
+        self.assertTrue(self.breaker.allow())
+        self.assertTrue(self.breaker.allow())
+        self.assertRaises(endpoint.CircuitOpen, self.breaker.allow)
+        self.breaker.cancel(probe=True)
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, breaker.HALF_OPEN)
+
+    def test_reset(self):
+        self.fail(4)
+        self.breaker.reset()
+        self.assertEqual(self.breaker.state, breaker.CLOSED)
+
+    def test_registry(self):
+        breakers = breaker.CircuitBreakers(window=5)
+        b = breakers.get("mydomain", "mystorage")
+        self.assertTrue(breakers.get("mydomain", "mystorage") is b)
+        self.assertFalse(breakers.get("mydomain", "users") is b)
+        self.assertEqual(b.window, 5)
+        self.assertEqual(b.name, "mydomain/mystorage")
+        states = breakers.states()
+        self.assertEqual(states[("mydomain", "mystorage")]["state"], breaker.CLOSED)
+        self.assertEqual(len(states), 2)
+
+
+class clientBreakerTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig()
+        self.clock = retry.FakeClock()
+        self.breakers = breaker.CircuitBreakers(errorRate=0.5, window=4, minCalls=4, resetTimeout=10,
+                                                clock=self.clock)
+        self.status = 200
+        self.pings = 0
+        self.calls = 0
+        self.client = endpoint.Client(service="myservice", domain="mydomain", circuitBreakers=self.breakers,
+                                      retryPolicy=retry.RetryPolicy(retries=0))
+        self.client.adapter = adapter.MockAdapter()
+        self.client.adapter.request = self.request
+
+    def request(self, method, url, **settings):
+        if url.endswith("@ping"):
+            self.pings += 1
+        else:
+            self.calls += 1
+        if self.status is None:
+            raise IOError("connection failed")
+        return adapter.MockResponse(status_code=self.status, headers={"Content-Type": "application/json"},
+                                    content={"result": 1})
+
+    def test_open(self):
+        self.status = 500
+        for i in range(4):
+            self.assertRaises(endpoint.ServiceFailure, self.client.call, "getItem", {}, {})
+        self.assertEqual(self.client.circuitBreaker().state, breaker.OPEN)
+        self.assertRaises(endpoint.CircuitOpen, self.client.call, "getItem", {}, {})
+        self.assertEqual(self.calls, 4)
+        state = self.breakers.states()[("mydomain", "myservice")]
+        self.assertEqual(state["state"], breaker.OPEN)
+
+    def test_connection_errors(self):
+        self.status = None
+        for i in range(4):
+            self.assertRaises(IOError, self.client.call, "getItem", {}, {})
+        self.assertRaises(endpoint.CircuitOpen, self.client.call, "getItem", {}, {})
+
+    def test_client_errors(self):
+        self.status = 404
+        for i in range(6):
+            self.assertRaises(endpoint.NotFound, self.client.call, "getItem", {}, {})
+        self.assertEqual(self.client.circuitBreaker().state, breaker.CLOSED)
+
+    def test_probe(self):
+        self.status = 503
+        for i in range(4):
+            self.assertRaises(endpoint.ServiceFailure, self.client.call, "getItem", {}, {})
+        self.clock.sleep(10)
+        self.status = 200
+        content, response = self.client.call("getItem", {}, {})
+        self.assertEqual(self.client.circuitBreaker().state, breaker.CLOSED)
+        self.assertEqual(self.pings, 0)
+
+    def test_pingprobe(self):
+        self.client.circuitBreaker().pingProbe = True
+        self.status = 503
+        for i in range(4):
+            self.assertRaises(endpoint.ServiceFailure, self.client.call, "getItem", {}, {})
+        self.clock.sleep(10)
+        self.assertRaises(endpoint.CircuitOpen, self.client.call, "getItem", {}, {})
+        self.assertEqual((self.pings, self.calls), (1, 4))
+
+        self.clock.sleep(10)
+        self.status = 200
+        self.client.call("getItem", {}, {})
+        self.assertEqual((self.pings, self.calls), (2, 5))
+        self.assertEqual(self.client.circuitBreaker().state, breaker.CLOSED)
+
+    def test_nobreaker(self):
+        client = endpoint.Client(service="myservice", domain="mydomain")
+        self.assertTrue(client.circuitBreaker() is None)
@@ -0,0 +1,104 @@
+
+import unittest
+import threading
+import time
+
+from pynive_client import adapter
+from pynive_client import coalesce
+from pynive_client import datastore
+from pynive_client import endpoint
+
+
+class singleFlightTest(unittest.TestCase):
+
+    def setUp(self):
+        self.requests = []
+        self.gate = threading.Event()
+        self.status = 200
+        self.flight = coalesce.SingleFlight()
+        self.storage = datastore.DataStore(service="mystorage", domain="mydomain", singleFlight=self.flight)
+        self.storage.adapter = adapter.MockAdapter()
+        self.storage.adapter.request = self.request
+
+    def request(self, method, url, **settings):
+        self.requests.append((url, settings.get("data"), settings["headers"].get("x-auth-token")))
+        self.gate.wait(5)
+        return adapter.MockResponse(status_code=self.status, headers={"Content-Type": "application/json"},
+                                    content={"items": [{"key": "1", "id": 1}]}, url=url)
+
+    def parallel(self, *calls):
+        results = [None] * len(calls)
+        def run(i, function, args, kw):
+            try:
+                results[i] = function(*args, **kw)
+            except Exception as e:
+                results[i] = e
+        threads = [threading.Thread(target=run, args=(i,)+c) for i, c in enumerate(calls)]
+        for t in threads:
+            t.start()
+        # wait until all threads have joined or started a call
+        for i in range(500):
+            if self.flight.stats()["calls"] >= len([c for c in calls if c[0] == self.storage.getItem]):
+                break
+            time.sleep(0.01)
+        self.gate.set()
+        for t in threads:
+            t.join()
+        return results
+
+    def test_shared(self):
+        results = self.parallel(*[(self.storage.getItem, (), {"key": "1"})] * 5)
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual([r.items[0]["key"] for r in results], ["1"] * 5)
+        stats = self.flight.stats()
+        self.assertEqual(stats, {"calls": 5, "shared": 4, "inFlight": 0})
+
+    def test_errors(self):
+        self.status = 404
+        results = self.parallel(*[(self.storage.getItem, (), {"key": "1"})] * 3)
+        self.assertEqual(len(self.requests), 1)
+        for r in results:
+            self.assertTrue(isinstance(r, endpoint.NotFound))
+        self.assertEqual(self.flight.stats()["inFlight"], 0)
+
+    def test_different(self):
+        results = self.parallel((self.storage.getItem, (), {"key": "1"}),
+                                (self.storage.getItem, (), {"key": "2"}),
+                                (self.storage.getItem, (), {"key": "1", "auth": "token"}))
+        self.assertEqual(len(self.requests), 3)
+        self.assertEqual(self.flight.stats()["shared"], 0)
+
+    def test_deadline(self):
+        leader = threading.Thread(target=self.storage.getItem, kwargs={"key": "1"})
+        leader.start()
+        for i in range(500):
+            if self.requests:
+                break
+            time.sleep(0.01)
+        start = time.time()
+        self.assertRaises(endpoint.DeadlineExceeded, self.storage.getItem, key="1", deadline=0.2)
+        self.assertTrue(time.time() - start < 1.0)
+        self.gate.set()
+        leader.join()
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual(self.flight.stats()["inFlight"], 0)
+
+    def test_sequential(self):
+        self.gate.set()
+        self.storage.getItem(key="1")
+        self.storage.getItem(key="1")
+        self.assertEqual(len(self.requests), 2)
+
+    def test_key(self):
+        flight = self.flight
+        self.assertEqual(flight.key(self.storage, "setItem", {"key": "1"}, {}), None)
+        self.assertEqual(flight.key(self.storage, "getItem", {"key": "1"}, {"stream": True}), None)
+        self.assertEqual(flight.key(self.storage, "getItem", b"data", {}), None)
+        self.assertEqual(flight.key(self.storage, "getItem", {"a": 1, "b": 2}, {}),
+                         flight.key(self.storage, "getItem", {"b": 2, "a": 1}, {}))
+        self.assertNotEqual(flight.key(self.storage, "@getItem", {}, {}, "a/b"),
+                            flight.key(self.storage, "@getItem", {}, {}, "a/c"))
+        self.assertNotEqual(flight.key(self.storage, "getItem", {}, {}), None)
+        flight = coalesce.SingleFlight(methods=("setItem",))
+        self.assertNotEqual(flight.key(self.storage, "setItem", {"key": "1"}, {}), None)
+        self.assertEqual(flight.key(self.storage, "getItem", {"key": "1"}, {}), None)
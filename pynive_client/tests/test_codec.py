@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+import json
+
+from pynive_client import adapter
+from pynive_client import codec
+from pynive_client import endpoint
+
+
+values = {"items": [{"key": "1", "name": u"Grüße", "value": 1.5, "list": [1, 2, None, True]}], "total": 1}
+
+
+class codecTest(unittest.TestCase):
+
+    def test_available(self):
+        names = codec.available()
+        self.assertEqual(names[-1], "json")
+        self.assertEqual(codec.getCodec().name, names[0])
+        self.assertEqual(codec.getCodec("json").name, "json")
+        self.assertRaises(ValueError, codec.getCodec, "unknown")
+
+    def test_roundtrip(self):
+        for name in codec.available():
+            c = codec.getCodec(name)
+            data = c.dumps(values)
+            self.assertTrue(isinstance(data, bytes), name)
+            self.assertEqual(json.loads(data.decode("utf-8")), values, name)
+            self.assertEqual(c.loads(data), values, name)
+            self.assertEqual(c.loads(data.decode("utf-8")), values, name)
+            self.assertTrue(u"Grüße".encode("utf-8") in data, name)
+
+    def test_fallback(self):
+        for name in codec.available():
+            c = codec.getCodec(name)
+            self.assertEqual(c.loads(c.dumps({"big": 2**70})), {"big": 2**70}, name)
+            self.assertEqual(c.loads(c.dumps({1: "a"})), {"1": "a"}, name)
+
+    def test_errors(self):
+        for name in codec.available():
+            c = codec.getCodec(name)
+            self.assertRaises(ValueError, c.loads, b"{invalid")
+            self.assertRaises(TypeError, c.dumps, {"a": object()})
+
+
+class clientCodecTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sent = []
+
+    def request(self, method, url, **settings):
+        self.sent.append(settings)
+        return adapter.MockResponse(status_code=200, headers={"Content-Type": "application/json"},
+                                    content=b'{"result": 1}', url=url)
+
+    def test_codec(self):
+        client = endpoint.Client(service="myservice", domain="mydomain", codec="json")
+        self.assertEqual(client.codec.name, "json")
+        client.adapter = adapter.MockAdapter()
+        client.adapter.request = self.request
+        content, response = client.call("list", values, {})
+        self.assertEqual(content, {"result": 1})
+        self.assertEqual(self.sent[0]["data"], codec.JsonCodec().dumps(values))
+
+    def test_charset(self):
+        client = endpoint.Client(service="myservice", domain="mydomain")
+        client.adapter = adapter.MockAdapter()
+        client.adapter.request = self.request
+        client.call("list", {"name": u"Grüße"}, {"charset": "latin-1"})
+        self.assertEqual(self.sent[0]["data"], u'{"name":"Grüße"}'.encode("latin-1"))
+        self.assertEqual(self.sent[0]["headers"]["Content-type"], "application/json; charset=latin-1")
+        client.call("list", {"name": u"Grüße"}, {"charset": "UTF-8"})
+        self.assertEqual(self.sent[1]["data"], u'{"name":"Grüße"}'.encode("utf-8"))
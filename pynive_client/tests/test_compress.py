@@ -0,0 +1,110 @@
+
+import unittest
+import logging
+import zlib
+
+from pynive_client import adapter
+from pynive_client import compress
+from pynive_client import datastore
+from pynive_client import stats
+
+
+class compressionTest(unittest.TestCase):
+
+    def test_gzip(self):
+        c = compress.Compression(threshold=100)
+        data = b'{"items":[' + b','.join([b'{"key":"%d"}' % i for i in range(100)]) + b']}'
+        req = {"data": data, "headers": {}}
+        self.assertEqual(c.apply("storage", req), data)
+        self.assertEqual(req["headers"]["Content-Encoding"], "gzip")
+        self.assertEqual(req["data"][:2], b"\x1f\x8b")
+        self.assertEqual(zlib.decompress(req["data"], 16 + zlib.MAX_WBITS), data)
+        stats = c.stats()
+        self.assertEqual(stats["compressed"], 1)
+        self.assertEqual(stats["bytesIn"], len(data))
+        self.assertEqual(stats["bytesOut"], len(req["data"]))
+        c.restore(req, data)
+        self.assertEqual(req, {"data": data, "headers": {}})
+
+    def test_deflate(self):
+        c = compress.Compression(encoding="deflate", threshold=10)
+        data = b"0123456789" * 100
+        req = {"data": data, "headers": {}}
+        c.apply("storage", req)
+        self.assertEqual(req["headers"]["Content-Encoding"], "deflate")
+        self.assertEqual(zlib.decompress(req["data"]), data)
+        self.assertRaises(ValueError, compress.Compression, encoding="br")
+
+    def test_skip(self):
+        c = compress.Compression(threshold=100, disabled=("files",))
+        # below threshold
+        req = {"data": b"x" * 99, "headers": {}}
+        self.assertEqual(c.apply("storage", req), None)
+        self.assertEqual(req["headers"], {})
+        # disabled service
+        req = {"data": b"x" * 1000, "headers": {}}
+        self.assertEqual(c.apply("files", req), None)
+        self.assertFalse(c.supports("files"))
+        c.enable("files")
+        self.assertTrue(c.supports("files"))
+        # streams
+        req = {"data": iter([b"x" * 1000]), "headers": {}}
+        self.assertEqual(c.apply("storage", req), None)
+        # no gain
+        import os
+        req = {"data": os.urandom(1000), "headers": {}}
+        self.assertEqual(c.apply("storage", req), None)
+        self.assertEqual(req["headers"], {})
+        self.assertEqual(c.stats()["compressed"], 0)
+
+
+class clientCompressionTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig()
+        self.sent = []
+        self.unsupported = False
+        self.compression = compress.Compression(threshold=200)
+        self.storage = datastore.DataStore(service="mystorage", domain="mydomain", compression=self.compression,
+                                           stats=stats.Statistics())
+        self.storage.adapter = adapter.MockAdapter()
+        self.storage.adapter.request = self.request
+
+    def request(self, method, url, **settings):
+        encoding = settings["headers"].get("Content-Encoding")
+        self.sent.append((encoding, settings["data"]))
+        if encoding and self.unsupported:
+            return adapter.MockResponse(status_code=415, url=url)
+        body = b'{"result": 100, "success": [], "invalid": [], "message": []}'
+        return adapter.MockResponse(status_code=200, url=url, content=body,
+                                    headers={"Content-Type": "application/json", "Content-Encoding": "gzip",
+                                             "content-length": "40"})
+
+    def items(self):
+        return [{"key": "item-%d" % i, "value": "value %d" % i} for i in range(100)]
+
+    def test_newItem(self):
+        result = self.storage.newItem(self.items())
+        self.assertEqual(result.result, 100)
+        self.assertEqual(len(self.sent), 1)
+        self.assertEqual(self.sent[0][0], "gzip")
+        self.assertTrue(b"item-99" in zlib.decompress(self.sent[0][1], 16 + zlib.MAX_WBITS))
+        # small requests are sent uncompressed
+        self.storage.getItem(key="item-1")
+        self.assertEqual(self.sent[1][0], None)
+
+    def test_unsupported(self):
+        self.unsupported = True
+        result = self.storage.newItem(self.items())
+        self.assertEqual(result.result, 100)
+        self.assertEqual([s[0] for s in self.sent], ["gzip", None])
+        self.assertTrue(b"item-99" in self.sent[1][1])
+        self.assertFalse(self.compression.supports("mystorage"))
+        self.storage.newItem(self.items())
+        self.assertEqual([s[0] for s in self.sent], ["gzip", None, None])
+
+    def test_stats(self):
+        self.storage.newItem(self.items())
+        m = self.storage.stats.snapshot()["methods"][("mystorage", "newItem")]
+        self.assertEqual(m["bytesReceived"], 60)
+        self.assertEqual(m["bytesReceivedWire"], 40)
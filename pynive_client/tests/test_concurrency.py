@@ -0,0 +1,192 @@
+
+import unittest
+import requests
+import logging
+import threading
+import time
+
+from pynive_client import adapter
+from pynive_client import breaker
+from pynive_client import concurrency
+from pynive_client import endpoint
+from pynive_client import retry
+
+
+class limiterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = retry.FakeClock(now=1000.0)
+
+    def test_aimd(self):
+        limiter = concurrency.ConcurrencyLimiter(initial=4, decrease=0.5, clock=self.clock)
+        tickets = [limiter.acquire() for i in range(4)]
+        self.assertEqual(limiter.status()["inflight"], 4)
+        for ticket in tickets:
+            limiter.release(ticket)
+        self.assertTrue(4.4 < limiter.limit < 4.5)
+        self.assertEqual(limiter.current(), 4)
+        # unused limits do not grow
+        limit = limiter.limit
+        limiter.release(limiter.acquire())
+        self.assertEqual(limiter.limit, limit)
+
+        first = limiter.acquire()
+        second = limiter.acquire()
+        self.clock.sleep(0.1)
+        limiter.release(first, True)
+        self.assertEqual(limiter.current(), 2)
+        # started before the decrease
+        limiter.release(second, True)
+        self.assertEqual(limiter.current(), 2)
+        third = limiter.acquire()
+        limiter.release(third, True)
+        self.assertEqual(limiter.current(), 1)
+        # other errors do not change the limit
+        limiter.release(limiter.acquire(), None)
+        status = limiter.status()
+        self.assertEqual(status["limit"], 1)
+        self.assertEqual(status["overloads"], 3)
+        self.assertEqual(status["decreases"], 2)
+        self.assertEqual(status["inflight"], 0)
+        self.assertEqual(status["requests"], 9)
+
+    def test_latency(self):
+        limiter = concurrency.ConcurrencyLimiter(initial=10, decrease=0.5, latencyTolerance=2, window=3,
+                                                 clock=self.clock)
+        for elapsed in (0.1, 0.15, 0.12):
+            ticket = limiter.acquire()
+            self.clock.sleep(elapsed)
+            limiter.release(ticket)
+        self.assertAlmostEqual(limiter.minLatency, 0.1)
+        self.assertEqual(limiter.decreases, 0)
+        ticket = limiter.acquire()
+        self.clock.sleep(0.5)
+        limiter.release(ticket)
+        self.assertEqual(limiter.decreases, 1)
+        self.assertEqual(limiter.current(), 5)
+
+    def test_queue(self):
+        limiter = concurrency.ConcurrencyLimiter(initial=1, maxWait=0.05)
+        ticket = limiter.acquire()
+        start = time.time()
+        self.assertEqual(limiter.acquire(), None)
+        self.assertTrue(time.time() - start >= 0.04)
+        self.assertEqual(limiter.acquire(timeout=0.01), None)
+        status = limiter.status()
+        self.assertEqual(status["rejected"], 2)
+        self.assertEqual(status["waiting"], 0)
+        self.assertEqual(status["maxWaiting"], 1)
+        limiter.release(ticket)
+
+        limiter = concurrency.ConcurrencyLimiter(initial=1, maxQueue=0)
+        ticket = limiter.acquire()
+        self.assertEqual(limiter.acquire(), None)
+        self.assertEqual(limiter.status()["rejected"], 1)
+
+    def test_fifo(self):
+        limiter = concurrency.ConcurrencyLimiter(initial=1, maxLimit=1)
+        ticket = limiter.acquire()
+        order = []
+
+        def worker(n):
+            t = limiter.acquire()
+            order.append(n)
+            limiter.release(t)
+
+        threads = []
+        for n in range(3):
+            thread = threading.Thread(target=worker, args=(n,))
+            thread.start()
+            threads.append(thread)
+            while limiter.waiting < n + 1:
+                time.sleep(0.001)
+        self.assertEqual(limiter.status()["waiting"], 3)
+        limiter.release(ticket)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(order, [0, 1, 2])
+        self.assertEqual(limiter.status()["inflight"], 0)
+
+    def test_registry(self):
+        limiters = concurrency.ConcurrencyLimiters(initial=3)
+        limiter = limiters.get("mydomain", "mystorage")
+        self.assertTrue(limiters.get("mydomain", "mystorage") is limiter)
+        self.assertEqual(limiter.name, "mydomain/mystorage")
+        self.assertEqual(limiters.states()[("mydomain", "mystorage")]["limit"], 3)
+
+
+class clientLimiterTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig()
+        self.status = 200
+        self.active = self.maxActive = 0
+        self.lock = threading.Lock()
+        self.limiters = concurrency.ConcurrencyLimiters(initial=2, maxLimit=2, decrease=0.5)
+        policy = retry.RetryPolicy(retries=0)
+        self.client = endpoint.Client(service="mystorage", domain="mydomain", retryPolicy=policy,
+                                      concurrencyLimiters=self.limiters)
+        self.client.adapter = adapter.MockAdapter()
+        self.client.adapter.request = self.request
+
+    def request(self, method, url, **settings):
+        with self.lock:
+            self.active += 1
+            self.maxActive = max(self.maxActive, self.active)
+        time.sleep(0.01)
+        with self.lock:
+            self.active -= 1
+        return adapter.MockResponse(status_code=self.status, url=url, content={"result": 1},
+                                    headers={"Content-Type": "application/json"})
+
+    def test_limit(self):
+        threads = [threading.Thread(target=self.client.call, args=("getItem", {"key": n}, {})) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.maxActive, 2)
+        status = self.client.concurrencyLimiter().status()
+        self.assertEqual(status["requests"], 8)
+        self.assertEqual(status["inflight"], 0)
+        self.assertEqual(status["maxInflight"], 2)
+
+    def test_overload(self):
+        self.status = 503
+        self.assertRaises(endpoint.ServiceFailure, self.client.call, "getItem", {"key": 1}, {})
+        self.assertEqual(self.client.concurrencyLimiter().current(), 1)
+
+    def test_timeout(self):
+        def fail(method, url, **settings):
+            raise self.error
+        self.client.adapter.request = fail
+        # waiting for a connection of the local pool is not overload
+        self.error = endpoint.PoolTimeout("No free connection within timeout")
+        self.assertRaises(endpoint.PoolTimeout, self.client.call, "getItem", {"key": 1}, {})
+        self.assertEqual(self.client.concurrencyLimiter().current(), 2)
+        self.error = requests.exceptions.ReadTimeout("timeout")
+        self.assertRaises(requests.exceptions.ReadTimeout, self.client.call, "getItem", {"key": 1}, {})
+        self.assertEqual(self.client.concurrencyLimiter().current(), 1)
+
+    def test_exceeded(self):
+        limiter = concurrency.ConcurrencyLimiter(initial=1, maxQueue=0)
+        self.client.concurrencyLimiter = lambda: limiter
+        ticket = limiter.acquire()
+        self.assertRaises(endpoint.ConcurrencyLimitExceeded, self.client.call, "getItem", {"key": 1}, {})
+        limiter.release(ticket)
+        self.client.call("getItem", {"key": 1}, {})
+
+    def test_breaker(self):
+        # limits reached on the client side are not service failures
+        breakers = breaker.CircuitBreakers(errorRate=0.5, window=4, minCalls=1)
+        self.client.circuitBreakers = breakers
+        limiter = concurrency.ConcurrencyLimiter(initial=1, maxQueue=0)
+        self.client.concurrencyLimiter = lambda: limiter
+        ticket = limiter.acquire()
+        for i in range(3):
+            self.assertRaises(endpoint.ConcurrencyLimitExceeded, self.client.call, "getItem", {"key": 1}, {})
+        limiter.release(ticket)
+        self.client.call("getItem", {"key": 1}, {})
+        state = breakers.states()[("mydomain", "mystorage")]
+        self.assertEqual(state["state"], "closed")
+        self.assertEqual((state["calls"], state["failures"]), (1, 0))
@@ -1,6 +1,7 @@
 
 import unittest
 import json
+import threading
 import logging
 
 from pynive_client import adapter
@@ -1711,3 +1712,246 @@ class datastoreCodesTest(unittest.TestCase):
         self.service.session.responses=(r,)
         self.assertRaises(endpoint.ServiceFailure, self.service.setOwner, "me", items=dict(key="test", owner="user1"))
 
+
+
+
+class datastoreIteratorTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig()
+        items = [{"key": "key%d" % i, "value": i} for i in range(1, 6)]
+        responses = []
+        for start in (1, 3, 5):
+            responses.append(adapter.StoredResponse(service="mystorage",
+                                   method="list",
+                                   payload={"start": start},
+                                   response={
+                                      "status_code": 200,
+                                      "content": {"items": items[start-1:start+1], "start": start, "total": 5},
+                                      "headers": {"Content-Type":"application/json"}
+                                   }))
+            responses.append(adapter.StoredResponse(service="mystorage",
+                                   method="keys",
+                                   payload={"start": start},
+                                   response={
+                                      "status_code": 200,
+                                      "content": {"keys": [i["key"] for i in items[start-1:start+1]], "start": start},
+                                      "headers": {"Content-Type":"application/json"}
+                                   }))
+        session = adapter.MockAdapter(responses=responses)
+        self.service = datastore.DataStore(service="mystorage", domain="mydomain", session=session)
+
+    def test_iterList(self):
+        result = list(self.service.iterList(size=2, sort="key"))
+        self.assertEqual([i["key"] for i in result], ["key1", "key2", "key3", "key4", "key5"])
+        self.assertEqual(self.service.counter, 3)
+
+    def test_iterList_prefetch(self):
+        result = list(self.service.iterList(size=2, prefetch=True, headers={"x-custom": "custom"}))
+        self.assertEqual(len(result), 5)
+
+    def test_iterKeys(self):
+        result = list(self.service.iterKeys(size=2))
+        self.assertEqual(result, ["key1", "key2", "key3", "key4", "key5"])
+
+
+class datastoreBulkTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig()
+        self.items = [{"key": "key%d" % i, "value": "value%d" % i} for i in range(1, 101)]
+
+    def _service(self, maxItems=None, fail=None):
+        # the mock service stores chunks up to `maxItems` items and responds with 413 above
+        service = datastore.DataStore(service="mystorage", domain="mydomain")
+        calls = []
+        lock = threading.Lock()
+
+        def request(method, url, **settings):
+            data = json.loads(settings["data"])
+            items = data["items"]
+            with lock:
+                calls.append(len(items))
+            if maxItems is not None and len(items) > maxItems:
+                return adapter.MockResponse(status_code=413, content={})
+            if fail is not None and fail in [i["key"] for i in items]:
+                return adapter.MockResponse(status_code=500, content={})
+            return adapter.MockResponse(status_code=200,
+                                        headers={"Content-Type": "application/json"},
+                                        content={"result": len(items),
+                                                 "success": [i["key"] for i in items],
+                                                 "invalid": [],
+                                                 "message": ["stored"]})
+
+        service.session = adapter.MockAdapter()
+        service.session.request = request
+        return service, calls
+
+    def test_bulk(self):
+        service, calls = self._service()
+        result = service.bulk("newItem", self.items, size=30, workers=3)
+        self.assertEqual(result.result, 100)
+        self.assertEqual(result.success, [i["key"] for i in self.items])
+        self.assertEqual(result.failed, [])
+        self.assertEqual(result.chunks, 4)
+        self.assertEqual(sorted(calls), [10, 30, 30, 30])
+
+    def test_bulk_bytes(self):
+        service, calls = self._service()
+        size = len(service.codec.dumps(self.items[0])) + 1
+        result = service.bulk("setItem", self.items, size=100, maxBytes=size*10+1, workers=2)
+        self.assertEqual(result.result, 100)
+        self.assertTrue(result.chunks >= 10)
+        self.assertTrue(max(calls) <= 10)
+
+    def test_bulk_adaptive(self):
+        service, calls = self._service(maxItems=12)
+        result = service.bulk("newItem", self.items, size=50, workers=2)
+        self.assertEqual(result.result, 100)
+        self.assertEqual(result.success, [i["key"] for i in self.items])
+        self.assertEqual(result.failed, [])
+        # chunk size adapted: 50 -> 25 -> 12
+        self.assertTrue(50 in calls)
+        self.assertTrue(25 in calls)
+        self.assertTrue(12 in calls)
+
+    def test_bulk_failure(self):
+        service, calls = self._service(fail="key42")
+        result = service.bulk("removeItem", self.items, size=10, workers=4)
+        self.assertEqual(result.result, 90)
+        self.assertEqual(len(result.failed), 10)
+        self.assertTrue("key42" in [i["key"] for i in result.failed])
+        self.assertEqual(len(result.message), 10)
+
+    def test_bulk_limits(self):
+        service, calls = self._service(maxItems=0)
+        result = service.bulk("newItem", self.items[:4], size=4, workers=1)
+        self.assertEqual(result.result, 0)
+        self.assertEqual(len(result.failed), 4)
+
+    def test_bulk_method(self):
+        service, calls = self._service()
+        self.assertRaises(ValueError, service.bulk, "getItem", self.items)
+
+
+class datastoreCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig()
+        self.now = 1000.0
+        self.cache = datastore.ItemCache(size=3, ttl=10, clock=lambda: self.now)
+        responses = []
+        for i in range(1, 6):
+            responses.append(adapter.StoredResponse(service="mystorage",
+                                   method="getItem",
+                                   payload={"key": "key%d" % i},
+                                   response={
+                                      "status_code": 200,
+                                      "content": {"items": [{"key": "key%d" % i, "id": i, "value": "value%d" % i}]},
+                                      "headers": {"Content-Type":"application/json"}
+                                   }))
+        for method in ("newItem", "setItem", "removeItem", "setOwner"):
+            responses.append(adapter.StoredResponse(service="mystorage",
+                                   method=method,
+                                   response={
+                                      "status_code": 200,
+                                      "content": {"result": 1},
+                                      "headers": {"Content-Type":"application/json"}
+                                   }))
+        session = adapter.MockAdapter(responses=responses)
+        self.service = datastore.DataStore(service="mystorage", domain="mydomain", session=session, cache=self.cache)
+
+    def test_hit(self):
+        result = self.service.getItem(key="key1")
+        self.assertEqual(result.items[0]["value"], "value1")
+        self.assertEqual(self.service.getItem(key="key1").items, result.items)
+        self.assertEqual(self.service.counter, 1)
+        self.assertEqual(self.cache.stats(), dict(size=1, hits=1, misses=1, evictions=0, expired=0))
+
+    def test_copies(self):
+        result = self.service.getItem(key="key1")
+        result.items[0]["value"] = "changed"
+        cached = self.service.getItem(key="key1")
+        self.assertEqual(cached.items[0]["value"], "value1")
+        cached.items[0]["value"] = "changed"
+        self.assertEqual(self.service.getItem(key="key1").items[0]["value"], "value1")
+        self.assertEqual(self.service.counter, 1)
+
+    def test_stale(self):
+        # a setItem call while getItem is in flight
+        request = self.service.session.request
+        def getItem(method, url, **settings):
+            response = request(method, url, **settings)
+            if url.endswith("getItem"):
+                self.cache.invalidate({"id": 1})
+            return response
+        self.service.session.request = getItem
+        self.service.getItem(key="key1")
+        self.service.getItem(key="key2")
+        self.assertEqual(len(self.cache), 1)
+        self.service.session.request = request
+        self.service.getItem(key="key1")
+        self.assertEqual(len(self.cache), 2)
+
+    def test_version(self):
+        version = self.cache.version()
+        self.cache.invalidate({"key": "key1"})
+        result = endpoint.Result(items=[{"key": "key1", "id": 1}], result=1)
+        self.assertFalse(self.cache.set(("key1", None, None), result, version=version))
+        other = endpoint.Result(items=[{"key": "key2"}], result=1)
+        self.assertTrue(self.cache.set(("key2", None, None), other, version=version))
+        self.assertTrue(self.cache.set(("key1", None, None), result, version=self.cache.version()))
+        # invalidated by id
+        version = self.cache.version()
+        self.cache.invalidate({"id": 1})
+        self.assertFalse(self.cache.set((None, None, 1), result, version=version))
+
+    def test_owner(self):
+        self.service.getItem(key="key1")
+        self.service.getItem(key="key1", owner="me")
+        self.assertEqual(self.service.counter, 2)
+        self.assertEqual(len(self.cache), 2)
+
+    def test_ttl(self):
+        self.service.getItem(key="key1")
+        self.now += 11
+        self.service.getItem(key="key1")
+        self.assertEqual(self.service.counter, 2)
+        self.assertEqual(self.cache.stats()["expired"], 1)
+
+    def test_lru(self):
+        for key in ("key1", "key2", "key3", "key1", "key4"):
+            self.service.getItem(key=key)
+        self.assertEqual(self.service.counter, 4)
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+        # key2 was least recently used
+        self.service.getItem(key="key1")
+        self.service.getItem(key="key2")
+        self.assertEqual(self.service.counter, 5)
+
+    def test_invalidate(self):
+        self.service.getItem(key="key1")
+        self.service.getItem(key="key2")
+        self.service.getItem(key="key3")
+        self.service.setItem(key="key1", value="new")
+        self.service.removeItem(id=[2])
+        self.service.setOwner("you", items=[{"key": "key3"}])
+        self.assertEqual(len(self.cache), 0)
+        self.service.getItem(key="key1")
+        self.assertEqual(self.service.counter, 7)
+
+    def test_newItem(self):
+        self.service.getItem(key="key1")
+        self.service.getItem(key="key1")
+        self.assertEqual(self.service.counter, 1)
+        self.service.newItem(key="key1", value="new")
+        self.assertEqual(len(self.cache), 0)
+        self.service.getItem(key="key1")
+        self.assertEqual(self.service.counter, 3)
+
+    def test_nocache(self):
+        self.assertRaises(endpoint.NotFound, self.service.getItem, key=["key1", "key2"])
+        self.assertEqual(self.cache.stats()["misses"], 0)
+        self.cache.set(("key1", None, None), endpoint.Result(items=[{"key": "key1"}], result=1))
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
@@ -0,0 +1,122 @@
+
+import unittest
+import logging
+import requests
+
+from pynive_client import adapter
+from pynive_client import deadline
+from pynive_client import endpoint
+from pynive_client import retry
+
+
+class deadlineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = retry.FakeClock(now=1000.0)
+
+    def test_remaining(self):
+        d = deadline.Deadline(2.0, clock=self.clock)
+        self.assertEqual(d.at, 1002.0)
+        self.assertEqual(d.remaining(), 2.0)
+        self.assertFalse(d.expired())
+        self.clock.sleep(2.0)
+        self.assertTrue(d.expired())
+        self.assertEqual(d.timeout(), None)
+        d = deadline.Deadline(at=1005.0, clock=self.clock)
+        self.assertEqual(d.remaining(), 3.0)
+        self.assertRaises(ValueError, deadline.Deadline)
+
+    def test_timeout(self):
+        d = deadline.Deadline(2.0, connectTimeout=0.5, clock=self.clock)
+        self.assertEqual(d.timeout(), (0.5, 2.0))
+        self.assertEqual(d.timeout(1.0), (0.5, 1.0))
+        self.assertEqual(d.timeout(5.0), (0.5, 2.0))
+        self.assertEqual(d.timeout((0.2, 10)), (0.2, 2.0))
+        self.clock.sleep(1.5)
+        self.assertEqual(d.timeout(), (0.5, 0.5))
+        self.clock.sleep(0.25)
+        self.assertEqual(d.timeout(), (0.25, 0.25))
+
+    def test_getDeadline(self):
+        self.assertEqual(deadline.getDeadline(None), None)
+        d = deadline.Deadline(1.0)
+        self.assertTrue(deadline.getDeadline(d) is d)
+        d = deadline.getDeadline(3, connectTimeout=1, clock=self.clock)
+        self.assertEqual(d.at, 1003.0)
+        self.assertEqual(d.connectTimeout, 1)
+
+
+class clientDeadlineTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig()
+        self.clock = retry.FakeClock(now=1000.0)
+        self.sent = []
+        self.status = 503
+        self.duration = 0.0
+        self.error = None
+        policy = retry.RetryPolicy(retries=10, backoff=0.5, factor=1, jitter=0, deadline=None, clock=self.clock)
+        self.client = endpoint.Client(service="mystorage", domain="mydomain", retryPolicy=policy)
+        self.client.adapter = adapter.MockAdapter()
+        self.client.adapter.request = self.request
+
+    def request(self, method, url, **settings):
+        self.sent.append(settings["timeout"])
+        self.clock.sleep(self.duration)
+        if self.error is not None:
+            raise self.error
+        return adapter.MockResponse(status_code=self.status, url=url, content={"result": 1},
+                                    headers={"Content-Type": "application/json"})
+
+    def test_retries(self):
+        # 0.5s between attempts. the 4th retry would start after the deadline.
+        settings = {"deadline": 2.0}
+        self.assertRaises(endpoint.ServiceFailure, self.client.call, "getItem", {"key": "1"}, settings)
+        self.assertEqual(self.sent, [(2.0, 2.0), (1.5, 1.5), (1.0, 1.0), (0.5, 0.5)])
+        self.assertEqual(settings, {"deadline": 2.0})
+
+    def test_expired(self):
+        self.duration = 1.0
+        self.assertRaises(endpoint.DeadlineExceeded, self.client.call, "getItem", {"key": "1"}, {"deadline": 1.0})
+        self.assertEqual(len(self.sent), 1)
+
+    def test_request(self):
+        self.status = 200
+        self.client.request("file.txt", deadline=5)
+        self.assertEqual(self.sent, [(5.0, 5.0)])
+        self.client.deadline = 2
+        self.client.request("file.txt")
+        self.assertEqual(self.sent[1], (2.0, 2.0))
+        self.duration = 2.0
+        self.status = 503
+        self.assertRaises(endpoint.DeadlineExceeded, self.client.request, "file.txt")
+
+    def test_timeoutError(self):
+        self.duration = 1.0
+        self.error = requests.exceptions.ReadTimeout("read timeout")
+        self.assertRaises(endpoint.DeadlineExceeded, self.client.call, "getItem", {"key": "1"}, {"deadline": 1.0})
+        # request timeout shorter than the deadline
+        self.assertRaises(requests.exceptions.ReadTimeout, self.client.call, "getItem", {"key": "1"},
+                          {"deadline": 5.0, "timeout": 1.0})
+        self.assertEqual(self.sent[-1], (1.0, 1.0))
+
+    def test_default(self):
+        self.status = 200
+        self.client.deadline = 3.0
+        self.client.connectTimeout = 0.5
+        self.client.call("getItem", {"key": "1"}, {})
+        self.assertEqual(self.sent, [(0.5, 3.0)])
+        self.client.call("getItem", {"key": "1"}, {"deadline": None})
+        self.assertEqual(self.sent[-1], None)
+        client = endpoint.Client(service="mystorage", domain="mydomain", deadline=4)
+        self.assertEqual(client.deadline, 4)
+
+    def test_stream(self):
+        self.status = 200
+        response = self.client._send(self.client.url("read"), "read", {},
+                                     deadline=deadline.Deadline(1.0, clock=self.clock), stream=True)
+        response.content = b"0123456789"
+        file = endpoint.FileWrapper(response, chunkSize=4)
+        self.assertEqual(file.read(4), b"0123")
+        self.clock.sleep(1.0)
+        self.assertRaises(endpoint.DeadlineExceeded, file.read, 4)
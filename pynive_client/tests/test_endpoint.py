@@ -1,11 +1,16 @@
 
 import unittest
 import requests
+import io
 import json
 import logging
+import threading
+import time
 
 from pynive_client import endpoint
 from pynive_client import adapter
+from pynive_client import transport
+from pynive_client.tests import servers
 
 class urlTest(unittest.TestCase):
 
@@ -340,6 +345,120 @@ class urlTest(unittest.TestCase):
 
 
 
+class clientUrlTest(unittest.TestCase):
+
+    def test_same_as_makeUrl(self):
+        for options in (dict(), dict(version="api"), dict(secure=False), dict(domain="mydomain.com"),
+                        dict(path="/path/1/"), dict(path="path", version="api")):
+            client = endpoint.Client(service="myservice", domain=options.pop("domain", "mydomain"), **options)
+            for method in (None, "", "getItem", "@getItem"):
+                for extendedPath in (None, "", "sub", "/abs/", "sub/2/"):
+                    for i in range(2):
+                        self.assertEqual(client.url(method, extendedPath),
+                                         endpoint.makeUrl(method=method, extendedPath=extendedPath, **client.options))
+
+    def test_options_changed(self):
+        client = endpoint.Client(service="myservice", domain="mydomain")
+        self.assertEqual(client.url("getItem"), "https://mydomain.nive.io/myservice/getItem")
+        client.options["version"] = "api"
+        self.assertEqual(client.url("getItem"), "https://mydomain.nive.io/myservice/api/getItem")
+        client.options = {"service": "other", "domain": "mydomain"}
+        self.assertEqual(client.url("getItem"), "https://mydomain.nive.io/other/getItem")
+        client.options["service"] = None
+        self.assertRaises(endpoint.EndpointException, client.url, "getItem")
+
+    def test_bounded(self):
+        client = endpoint.Client(service="myservice", domain="mydomain")
+        client.urlCacheSize = 10
+        for i in range(25):
+            self.assertEqual(client.url("@getItem", "file%d" % i), "https://mydomain.nive.io/myservice/file%d/@getItem" % i)
+            self.assertTrue(len(client._urls) <= 10)
+
+    def test_joinPath(self):
+        self.assertEqual(endpoint.joinPath(None, None), None)
+        self.assertEqual(endpoint.joinPath("/path/", None), "path")
+        self.assertEqual(endpoint.joinPath("path", "sub/"), "path/sub")
+        self.assertEqual(endpoint.joinPath("path/", "/abs"), "abs")
+
+
+
+class resultTest(unittest.TestCase):
+
+    def test_values(self):
+        r = endpoint.Result(items=[1, 2], total=2)
+        self.assertTrue(r)
+        self.assertEqual(r, 1)
+        self.assertEqual(r, True)
+        self.assertEqual(r.items, [1, 2])
+        self.assertEqual(r["total"], 2)
+        self.assertEqual(r["result"], 1)
+        self.assertEqual(r.get("total"), 2)
+        self.assertEqual(r.get("unknown", 5), 5)
+        self.assertRaises(KeyError, lambda: r["unknown"])
+        self.assertRaises(KeyError, lambda: r["response"])
+        self.assertEqual(r.toDict(), {"items": [1, 2], "total": 2, "result": 1})
+        self.assertEqual(eval(repr(r)), r.toDict())
+
+    def test_result(self):
+        self.assertFalse(endpoint.Result())
+        self.assertEqual(endpoint.Result(), 0)
+        self.assertFalse(endpoint.Result(response=adapter.MockResponse(status_code=200)))
+        self.assertFalse(endpoint.Result(result=0, total=0))
+        self.assertEqual(endpoint.Result(result=5, response=None), 5)
+        self.assertTrue(endpoint.Result(response=None))
+
+    def test_slots(self):
+        r1 = endpoint.Result(items=[], total=0, response=None)
+        r2 = endpoint.Result(total=1, items=[1])
+        self.assertTrue(type(r1) is type(r2))
+        self.assertTrue(isinstance(r1, endpoint.Result))
+        self.assertFalse(hasattr(r1, "__dict__"))
+        self.assertNotEqual(type(r1), type(endpoint.Result(total=1)))
+        # values can be changed, other attributes not
+        r1.total = 2
+        self.assertEqual(r1["total"], 2)
+        self.assertRaises(AttributeError, setattr, r1, "other", 1)
+
+    def test_open(self):
+        r = endpoint.Result(**{"a-b": 1, "_private": 2, "ok": 3})
+        self.assertTrue(isinstance(r, endpoint.Result))
+        self.assertEqual(r["a-b"], 1)
+        self.assertEqual(r["_private"], 2)
+        self.assertEqual(r.ok, 3)
+        self.assertEqual(r.get("result"), 1)
+
+    def test_response(self):
+        response = adapter.MockResponse(status_code=200)
+        r = endpoint.Result(total=1, response=response)
+        self.assertTrue(r.response is response)
+        self.assertTrue(r["response"] is response)
+        r.dropResponse()
+        self.assertEqual(r.response, None)
+        self.assertEqual(r.get("response"), None)
+        self.assertEqual(r.toDict(), {"total": 1, "result": 1})
+
+    def test_pickle(self):
+        import pickle
+        r = pickle.loads(pickle.dumps(endpoint.Result(items=[1], total=1)))
+        self.assertEqual(r.toDict(), {"items": [1], "total": 1, "result": 1})
+        r = pickle.loads(pickle.dumps(endpoint.Result()))
+        self.assertEqual(r, 0)
+
+    def test_keepResponse(self):
+        client = endpoint.Client(service="myservice", domain="mydomain", keepResponse=False)
+        client.adapter = adapter.MockAdapter()
+        client.adapter.request = lambda method, url, **kw: adapter.MockResponse(
+            status_code=200, url=url, content=b'{"result": 1}', headers={"Content-Type": "application/json"})
+        result = client.ping()
+        self.assertTrue(isinstance(result.response, endpoint.ResponseInfo))
+        self.assertEqual(result.response.status_code, 200)
+        self.assertTrue(result.response.ok)
+        self.assertFalse(hasattr(result.response, "content"))
+        content, response = client.call("read", {}, {"stream": True})
+        self.assertTrue(isinstance(response, adapter.MockResponse))
+
+
+
 class sessionTest(unittest.TestCase):
     """
     """
@@ -635,6 +754,243 @@ class clientTest(unittest.TestCase):
         self.assertTrue(client._fmtMsgs({'messages': ('msg1','msg2')}, 'default', seperator=' <br> '))
 
 
+class sessionPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig()
+        self.server = servers.Server(("127.0.0.1", 0), servers.Handler)
+        self.server.delay = 0.02
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.domain = "127.0.0.1:%d" % self.server.server_address[1]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_mount(self):
+        client = endpoint.Client(service="myservice", domain="mydomain")
+        session = client.newSession(pool_maxsize=7)
+        self.assertTrue(isinstance(session.get_adapter("https://mydomain.nive.io"), transport.PooledHTTPAdapter))
+        self.assertTrue(isinstance(session.get_adapter("http://mydomain.nive.io"), transport.PooledHTTPAdapter))
+        self.assertTrue(session.get_adapter("https://mydomain.nive.io") is session.pool)
+        self.assertEqual(session.pool._pool_maxsize, 7)
+        self.assertEqual(client.poolStats(), {})
+
+    def test_nosession(self):
+        client = endpoint.Client(service="myservice", domain="mydomain")
+        self.assertEqual(client.poolStats(), {})
+        client.session = adapter.MockAdapter()
+        self.assertEqual(client.poolStats(), {})
+
+    def test_shared_threads(self):
+        client = endpoint.Client(service="myservice", domain=self.domain, secure=False)
+        client.newSession(pool_maxsize=2)
+        results = []
+
+        def worker(n):
+            for i in range(3):
+                content, response = client.call("echo", {"n": n, "i": i}, {})
+                results.append(content == {"n": n, "i": i})
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(results), 18)
+        self.assertTrue(all(results))
+        self.assertEqual(client.counter, 18)
+        stats = client.poolStats()[self.domain]
+        self.assertEqual(stats["requests"], 18)
+        self.assertEqual(stats["active"], 0)
+        self.assertEqual(stats["waiting"], 0)
+        self.assertTrue(stats["maxActive"] <= 2)
+        self.assertTrue(stats["waitTime"] > 0)
+
+        client.session.pool.resetStats()
+        self.assertEqual(client.poolStats()[self.domain]["requests"], 0)
+
+
+    def test_pool_timeout(self):
+        pool = transport.PooledHTTPAdapter(pool_maxsize=1)
+        slot, stats = pool._host(self.domain)
+        slot.acquire()
+        request = requests.Request("POST", "http://%s/echo" % self.domain, data=b"{}").prepare()
+        start = time.time()
+        self.assertRaises(endpoint.PoolTimeout, pool.send, request, timeout=(0.1, 5))
+        self.assertTrue(time.time() - start < 1.0)
+        self.assertRaises(requests.exceptions.Timeout, pool.send, request, timeout=0.05)
+        self.assertEqual(pool.stats()[self.domain]["waiting"], 0)
+        slot.release()
+        response = pool.send(request, timeout=(0.1, 5))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(pool.stats()[self.domain]["requests"], 1)
+
+
+    def test_close(self):
+        pool = transport.PooledHTTPAdapter(pool_maxsize=1)
+        request = requests.Request("POST", "http://%s/echo" % self.domain, data=b"{}").prepare()
+        pool.send(request, timeout=5)
+        self.assertEqual(list(pool.stats().keys()), [self.domain])
+        pool.close()
+        self.assertEqual(pool.stats(), {})
+        self.assertEqual(pool._slots, {})
+
+
+class pagesTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig()
+        self.entries = list(range(1, 24))
+        self.calls = []
+
+    def load(self, start, size):
+        self.calls.append((start, size))
+        return self.entries[start-1:start-1+size], None
+
+    def loadTotal(self, start, size):
+        self.calls.append((start, size))
+        # the service limits the page size to 5
+        return self.entries[start-1:start-1+min(size, 5)], len(self.entries)
+
+    def test_pages(self):
+        result = list(endpoint.iterPages(self.load, size=10))
+        self.assertEqual(result, self.entries)
+        self.assertEqual(self.calls, [(1, 10), (11, 10), (21, 10)])
+
+    def test_pages_start(self):
+        result = list(endpoint.iterPages(self.load, start=5, size=10))
+        self.assertEqual(result, self.entries[4:])
+
+    def test_pages_exact(self):
+        self.entries = list(range(1, 21))
+        result = list(endpoint.iterPages(self.load, size=10))
+        self.assertEqual(result, self.entries)
+        self.assertEqual(len(self.calls), 3)
+
+    def test_pages_total(self):
+        result = list(endpoint.iterPages(self.loadTotal, size=10))
+        self.assertEqual(result, self.entries)
+        self.assertEqual(len(self.calls), 5)
+
+    def test_pages_empty(self):
+        self.entries = []
+        self.assertEqual(list(endpoint.iterPages(self.load, size=10)), [])
+        self.assertEqual(len(self.calls), 1)
+
+    def test_pages_lazy(self):
+        pages = endpoint.iterPages(self.load, size=10)
+        self.assertEqual(self.calls, [])
+        next(pages)
+        self.assertEqual(len(self.calls), 1)
+
+    def test_pages_prefetch(self):
+        pages = endpoint.iterPages(self.load, size=10, prefetch=True)
+        self.assertEqual(next(pages), 1)
+        self.assertEqual(list(pages), self.entries[1:])
+        self.assertEqual(self.calls, [(1, 10), (11, 10), (21, 10)])
+
+    def test_pages_prefetch_failure(self):
+        def load(start, size):
+            if start > 1:
+                raise endpoint.ServiceFailure("failed")
+            return self.entries[:size], None
+        pages = endpoint.iterPages(load, size=10, prefetch=True)
+        self.assertEqual(len([next(pages) for i in range(10)]), 10)
+        self.assertRaises(endpoint.ServiceFailure, next, pages)
+
+
+class resendableTest(unittest.TestCase):
+
+    def test_resendable(self):
+        self.assertTrue(endpoint.resendable(None))
+        self.assertTrue(endpoint.resendable({"key": "value"}))
+        self.assertTrue(endpoint.resendable("contents"))
+        self.assertTrue(endpoint.resendable(b"contents"))
+        self.assertFalse(endpoint.resendable(io.BytesIO(b"contents")))
+        self.assertFalse(endpoint.resendable(iter([b"contents"])))
+        self.assertFalse(endpoint.resendable((c for c in [b"contents"])))
+
+
+class fileWrapperTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig()
+        self.data = b"".join([b"line %d\n" % i for i in range(1000)])
+
+    def wrapper(self, chunkSize=100):
+        return endpoint.FileWrapper(adapter.MockResponse(status_code=200, content=self.data), chunkSize=chunkSize)
+
+    def test_read(self):
+        f = self.wrapper()
+        self.assertEqual(f.read(10), self.data[:10])
+        self.assertEqual(f.read(1000), self.data[10:100])
+        self.assertEqual(f.tell(), 100)
+        self.assertEqual(f.read(), self.data[100:])
+        self.assertEqual(f.read(), b"")
+        self.assertEqual(f.read(10), b"")
+
+    def test_read_chunks(self):
+        calls = []
+        response = adapter.MockResponse(status_code=200, content=self.data)
+        iter_content = response.iter_content
+        def iterate(size):
+            calls.append(size)
+            return iter_content(size)
+        response.iter_content = iterate
+        f = endpoint.FileWrapper(response, chunkSize=500)
+        parts = []
+        while True:
+            data = f.read(5000)
+            if not data:
+                break
+            parts.append(data)
+        self.assertEqual(b"".join(parts), self.data)
+        self.assertEqual(calls, [500])
+
+    def test_readinto(self):
+        f = self.wrapper()
+        buf = bytearray(64)
+        self.assertEqual(f.readinto(buf), 64)
+        self.assertEqual(bytes(buf), self.data[:64])
+        view = memoryview(buf)
+        self.assertEqual(f.readinto(view[:10]), 10)
+        self.assertEqual(bytes(buf[:10]), self.data[64:74])
+        self.assertEqual(f.readinto(buf), 26)
+
+    def test_readline(self):
+        f = self.wrapper(chunkSize=7)
+        self.assertEqual(f.readline(), b"line 0\n")
+        self.assertEqual(f.readline(3), b"lin")
+        self.assertEqual(f.readline(), b"e 1\n")
+        lines = list(f)
+        self.assertEqual(len(lines), 998)
+        self.assertEqual(lines[-1], b"line 999\n")
+
+    def test_buffered(self):
+        f = io.BufferedReader(self.wrapper(chunkSize=33), buffer_size=128)
+        self.assertEqual(f.read(5), self.data[:5])
+        self.assertEqual(f.readline(), self.data[5:7])
+        self.assertEqual(f.read(), self.data[7:])
+
+    def test_context(self):
+        closed = []
+        response = adapter.MockResponse(status_code=200, content=self.data)
+        response.close = lambda: closed.append(True)
+        with endpoint.FileWrapper(response) as f:
+            self.assertEqual(f.read(), self.data)
+        self.assertTrue(f.closed)
+        self.assertEqual(closed, [True])
+        self.assertRaises(ValueError, f.read)
+
+    def test_text(self):
+        f = endpoint.FileWrapper(adapter.MockResponse(status_code=200, content="Hello!"))
+        self.assertEqual(f.read(), b"Hello!")
+
+
 class excpTest(unittest.TestCase):
     def setUp(self):
         logging.basicConfig()
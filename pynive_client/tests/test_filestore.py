@@ -1,7 +1,13 @@
 
 import unittest
 import logging
-from io import StringIO
+import json
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+from io import BytesIO, StringIO
 
 from pynive_client import adapter
 from pynive_client import endpoint
@@ -462,7 +468,7 @@ class filestoreFunctionTest(unittest.TestCase):
         self.storage.session.responses=(r,)
 
         item = self.storage.read(path="index.html")
-        self.assertEqual(item.read(), "Hello!")
+        self.assertEqual(item.read(), b"Hello!")
 
     def test_read_failure(self):
         # not found
@@ -1396,3 +1402,353 @@ class filestoreFunctionTest(unittest.TestCase):
         r = self.storage.ping()
         self.assertEqual(r, 1)
 
+
+
+
+class filestoreIteratorTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig()
+        items = [{"name": "file%d.txt" % i, "type": "f"} for i in range(1, 6)]
+        responses = []
+        for start in (1, 3, 5):
+            responses.append(adapter.StoredResponse(service="mystorage",
+                                   method="@list",
+                                   payload={"start": start},
+                                   response={
+                                      "status_code": 200,
+                                      "content": {"items": items[start-1:start+1]},
+                                      "headers": {"Content-Type":"application/json"}
+                                   }))
+        session = adapter.MockAdapter(responses=responses)
+        self.storage = filestore.FileStore(service="mystorage", domain="mydomain", session=session)
+
+    def test_iterList(self):
+        result = list(self.storage.iterList("/", size=2))
+        self.assertEqual(len(result), 5)
+        self.assertEqual(result[4]["name"], "file5.txt")
+        self.assertEqual(self.storage.counter, 3)
+
+    def test_iterList_prefetch(self):
+        result = list(self.storage.iterList("/", size=2, prefetch=True))
+        self.assertEqual(len(result), 5)
+
+
+
+class filestoreUploadTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig()
+        self.data = os.urandom(10000)
+        self.sent = []
+        storage = filestore.FileStore(service="mystorage", domain="mydomain", session=adapter.MockAdapter())
+
+        def request(method, url, **settings):
+            # consume the body like the http adapter
+            self.method = method
+            self.headers = settings["headers"]
+            self.sent = [bytes(chunk) for chunk in settings["data"]]
+            return adapter.MockResponse(status_code=200,
+                                        headers={"Content-Type": "application/json"},
+                                        content={"result": 1})
+
+        storage.session.request = request
+        self.storage = storage
+
+    def test_upload_file(self):
+        fd, filename = tempfile.mkstemp()
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(self.data)
+            progress = []
+            result = self.storage.upload("file.bin", filename, mime="application/octet-stream", chunkSize=3000,
+                                         progress=lambda sent, total: progress.append((sent, total)))
+        finally:
+            os.remove(filename)
+        self.assertTrue(result)
+        self.assertEqual(self.method, "PUT")
+        self.assertEqual(self.headers["Content-type"], "application/octet-stream")
+        self.assertEqual(b"".join(self.sent), self.data)
+        self.assertEqual([len(c) for c in self.sent], [3000, 3000, 3000, 1000])
+        self.assertEqual(progress[-1], (10000, 10000))
+        self.assertEqual(len(progress), 4)
+
+    def test_upload_mmap(self):
+        with tempfile.TemporaryFile() as file:
+            file.write(self.data)
+            file.flush()
+            m = mmap.mmap(file.fileno(), 0)
+            try:
+                result = self.storage.upload("file.bin", m, chunkSize=4096)
+            finally:
+                m.close()
+        self.assertTrue(result)
+        self.assertEqual(b"".join(self.sent), self.data)
+        self.assertEqual(len(self.sent), 3)
+
+    def test_upload_bytes(self):
+        self.storage.upload("file.bin", self.data, chunkSize=5000)
+        self.assertEqual(b"".join(self.sent), self.data)
+
+    def test_upload_fileobject(self):
+        progress = []
+        self.storage.upload("file.bin", BytesIO(self.data), chunkSize=6000,
+                            progress=lambda sent, total: progress.append((sent, total)))
+        self.assertEqual(b"".join(self.sent), self.data)
+        self.assertEqual(progress, [(6000, None), (10000, None)])
+
+    def test_upload_generator(self):
+        def chunks():
+            for i in range(10):
+                yield self.data[i*1000:(i+1)*1000]
+        self.storage.upload("file.bin", chunks())
+        self.assertEqual(b"".join(self.sent), self.data)
+        self.assertEqual(len(self.sent), 10)
+
+    def test_upload_noretry(self):
+        calls = []
+        def request(method, url, **settings):
+            calls.append([bytes(chunk) for chunk in settings["data"]])
+            return adapter.MockResponse(status_code=503)
+        self.storage.session.request = request
+        self.assertRaises(endpoint.ServiceFailure, self.storage.upload, "file.bin", self.data)
+        self.assertEqual(len(calls), 1)
+
+
+
+class _TreeService(object):
+    # in memory filestore service for tree transfers
+
+    def __init__(self, fail=None):
+        self.files = {}
+        self.mtimes = {}
+        self.dirs = set([""])
+        self.fail = fail
+        self.writes = []
+        self.lock = threading.Lock()
+
+    def request(self, method, url, **settings):
+        path, function = ("/" + url.split("/mystorage/api/", 1)[1]).rsplit("/", 1)
+        path = path.strip("/")
+        data = settings.get("data")
+        with self.lock:
+            if function == "@newItem":
+                if not path in self.dirs:
+                    return self._response(404, {})
+                values = json.loads(data)
+                name = (path + "/" + values["name"]).strip("/")
+                if values["type"] == "directory":
+                    if name in self.dirs:
+                        return self._response(422, {"result": 0})
+                    self.dirs.add(name)
+                else:
+                    self.files[name] = b""
+                return self._response(200, {"result": 1})
+            if function == "@write":
+                if path == self.fail:
+                    return self._response(500, {})
+                if not path in self.files:
+                    return self._response(404, {})
+                self.files[path] = b"".join([bytes(c) for c in data])
+                self.writes.append(path)
+                self.mtimes[path] = "2016/07/01 12:00:%02d" % len(self.writes)
+                return self._response(200, {"result": 1})
+            if function == "@removeItem":
+                del self.files[path]
+                return self._response(200, {"result": 1})
+            if function == "@list":
+                if not path in self.dirs:
+                    return self._response(404, {})
+                values = json.loads(data)
+                items = []
+                for name in sorted(self.dirs):
+                    if name and self._parent(name) == path:
+                        items.append({"name": name.rsplit("/", 1)[-1], "type": "d"})
+                for name in sorted(self.files):
+                    if self._parent(name) == path:
+                        items.append({"name": name.rsplit("/", 1)[-1], "type": "f", "size": len(self.files[name]),
+                                      "mtime": self.mtimes.get(name)})
+                start = values["start"] - 1
+                return self._response(200, {"items": items[start:start+values["size"]]})
+            if function == "@read":
+                if path == self.fail:
+                    return self._response(500, {})
+                return adapter.MockResponse(status_code=200, content=self.files[path],
+                                            headers={"Content-Type": "application/octet-stream"})
+        return self._response(404, {})
+
+    def _parent(self, name):
+        return name.rsplit("/", 1)[0] if "/" in name else ""
+
+    def _response(self, status, content):
+        return adapter.MockResponse(status_code=status, content=content,
+                                    headers={"Content-Type": "application/json"})
+
+
+class filestoreTreeTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig()
+        self.tmp = tempfile.mkdtemp()
+        self.local = os.path.join(self.tmp, "site")
+        for name in ("index.html", "css/style.css", "css/img/logo.png", "js/app.js", "empty/"):
+            filename = os.path.join(self.local, *name.split("/"))
+            if not os.path.isdir(os.path.dirname(filename)):
+                os.makedirs(os.path.dirname(filename))
+            if not name.endswith("/"):
+                with open(filename, "wb") as file:
+                    file.write(name.encode("utf-8") * 100)
+        self.service = _TreeService()
+        self.service.dirs.add("site")
+        self.storage = filestore.FileStore(service="mystorage", domain="mydomain", session=adapter.MockAdapter())
+        self.storage.session.request = self.service.request
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_uploadTree(self):
+        result = self.storage.uploadTree(self.local, "site", workers=3)
+        self.assertEqual(result.result, 4)
+        self.assertEqual(result.failed, [])
+        self.assertEqual(result.directories, 4)
+        self.assertEqual(sorted(self.service.files),
+                         ["site/css/img/logo.png", "site/css/style.css", "site/index.html", "site/js/app.js"])
+        self.assertEqual(self.service.files["site/js/app.js"], b"js/app.js" * 100)
+        self.assertTrue("site/empty" in self.service.dirs)
+
+        # upload again. files exist.
+        result = self.storage.uploadTree(self.local, "site", workers=3)
+        self.assertEqual(result.result, 4)
+        self.assertEqual(result.directories, 0)
+
+    def test_uploadTree_resume(self):
+        self.service.fail = "site/css/style.css"
+        journal = os.path.join(self.tmp, "journal")
+        result = self.storage.uploadTree(self.local, "site", journal=journal)
+        self.assertEqual(result.result, 3)
+        self.assertEqual(result.failed[0][0], "css/style.css")
+        self.assertTrue(result.message)
+
+        self.service.fail = None
+        result = self.storage.uploadTree(self.local, "site", journal=journal)
+        self.assertEqual(result.result, 1)
+        self.assertEqual(len(result.skipped), 3)
+        self.assertEqual(len(self.service.files), 4)
+        # completed. the next upload with the same journal sends all files.
+        self.assertFalse(os.path.exists(journal))
+        with open(os.path.join(self.local, "index.html"), "wb") as file:
+            file.write(b"changed")
+        result = self.storage.uploadTree(self.local, "site", journal=journal)
+        self.assertEqual(result.result, 4)
+        self.assertEqual(result.skipped, [])
+        self.assertEqual(self.service.files["site/index.html"], b"changed")
+
+    def test_downloadTree(self):
+        self.storage.uploadTree(self.local, "site")
+        target = os.path.join(self.tmp, "copy")
+        result = self.storage.downloadTree("site", target, workers=3)
+        self.assertEqual(result.result, 4)
+        self.assertEqual(result.failed, [])
+        for name in ("index.html", "css/style.css", "css/img/logo.png", "js/app.js"):
+            with open(os.path.join(target, *name.split("/")), "rb") as file:
+                self.assertEqual(file.read(), name.encode("utf-8") * 100)
+        self.assertTrue(os.path.isdir(os.path.join(target, "empty")))
+
+    def test_downloadTree_resume(self):
+        self.storage.uploadTree(self.local, "site")
+        target = os.path.join(self.tmp, "copy")
+        journal = os.path.join(self.tmp, "journal")
+        self.service.fail = "site/index.html"
+        result = self.storage.downloadTree("site", target, journal=journal)
+        self.assertEqual(result.result, 3)
+        self.assertEqual(result.failed[0][0], "index.html")
+        self.assertFalse(os.path.exists(os.path.join(target, "index.html")))
+
+        self.service.fail = None
+        result = self.storage.downloadTree("site", target, journal=journal)
+        self.assertEqual(result.result, 1)
+        self.assertEqual(len(result.skipped), 3)
+        self.assertTrue(os.path.exists(os.path.join(target, "index.html")))
+        self.assertFalse(os.path.exists(journal))
+
+
+    def test_sync(self):
+        # the first sync creates the directory
+        self.service.dirs.remove("site")
+        manifest = os.path.join(self.tmp, "manifest")
+        result = self.storage.sync(self.local, "site", manifest)
+        self.assertEqual(result.result, 4)
+        self.assertEqual(len(result.upload), 4)
+        self.assertTrue("site" in self.service.dirs)
+        self.assertEqual(result.bytes, sum([len(v) for v in self.service.files.values()]))
+        self.assertTrue(os.path.exists(manifest))
+
+        # nothing changed
+        self.service.writes = []
+        result = self.storage.sync(self.local, "site", manifest)
+        self.assertEqual(result.result, 0)
+        self.assertEqual(len(result.unchanged), 4)
+        self.assertEqual(result.saved, sum([len(v) for v in self.service.files.values()]))
+        self.assertEqual(self.service.writes, [])
+
+        # local changes: size and mtime
+        with open(os.path.join(self.local, "index.html"), "wb") as file:
+            file.write(b"changed")
+        stylesheet = os.path.join(self.local, "css", "style.css")
+        os.utime(stylesheet, (1000000000, 1000000000))
+        result = self.storage.sync(self.local, "site", manifest)
+        self.assertEqual(result.upload, ["css/style.css", "index.html"])
+        self.assertEqual(self.service.files["site/index.html"], b"changed")
+        self.assertEqual(sorted(self.service.writes), ["site/css/style.css", "site/index.html"])
+
+        # remote change
+        self.service.writes = []
+        self.service.mtimes["site/js/app.js"] = "2016/08/01 00:00:00"
+        result = self.storage.sync(self.local, "site", manifest)
+        self.assertEqual(result.upload, ["js/app.js"])
+        self.assertEqual(self.service.writes, ["site/js/app.js"])
+
+    def test_sync_failed(self):
+        manifest = os.path.join(self.tmp, "manifest")
+        self.storage.sync(self.local, "site", manifest)
+        # same size as the remote file
+        with open(os.path.join(self.local, "index.html"), "wb") as file:
+            file.write(b"A" * 1000)
+        with open(os.path.join(self.local, "js", "app.js"), "wb") as file:
+            file.write(b"changed")
+        self.service.fail = "site/index.html"
+        result = self.storage.sync(self.local, "site", manifest)
+        self.assertEqual(result.result, 1)
+        self.assertEqual(result.failed[0][0], "index.html")
+        self.assertEqual(self.service.files["site/js/app.js"], b"changed")
+
+        # the failed file is uploaded by the next sync
+        self.service.fail = None
+        result = self.storage.sync(self.local, "site", manifest)
+        self.assertEqual(result.upload, ["index.html"])
+        self.assertEqual(self.service.files["site/index.html"], b"A" * 1000)
+        self.assertFalse(os.path.exists(manifest + ".part"))
+
+    def test_sync_dryrun(self):
+        manifest = os.path.join(self.tmp, "manifest")
+        self.storage.sync(self.local, "site", manifest)
+        self.service.writes = []
+        with open(os.path.join(self.local, "new.txt"), "wb") as file:
+            file.write(b"12345")
+        os.remove(os.path.join(self.local, "js", "app.js"))
+        result = self.storage.sync(self.local, "site", manifest, delete=True, dryRun=True)
+        self.assertEqual(result.upload, ["new.txt"])
+        self.assertEqual(result.delete, ["js/app.js"])
+        self.assertEqual(result.bytes, 5)
+        self.assertEqual(len(result.unchanged), 3)
+        self.assertTrue(result.saved > 0)
+        self.assertEqual(self.service.writes, [])
+        self.assertTrue("site/js/app.js" in self.service.files)
+
+        result = self.storage.sync(self.local, "site", manifest, delete=True)
+        self.assertEqual(result.result, 1)
+        self.assertEqual(result.removed, 1)
+        self.assertFalse("site/js/app.js" in self.service.files)
+        self.assertEqual(self.service.files["site/new.txt"], b"12345")
+        with open(manifest) as file:
+            self.assertFalse("js/app.js" in json.load(file))
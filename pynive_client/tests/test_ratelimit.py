@@ -0,0 +1,165 @@
+
+import unittest
+import logging
+import threading
+
+from pynive_client import adapter
+from pynive_client import breaker
+from pynive_client import endpoint
+from pynive_client import ratelimit
+from pynive_client import retry
+
+
+class bucketTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = retry.FakeClock(now=1000.0)
+
+    def test_reserve(self):
+        bucket = ratelimit.TokenBucket(2, burst=2, clock=self.clock)
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertEqual(bucket.reserve(), 0.0)
+        # reserved in advance, one token per 0.5s
+        self.assertAlmostEqual(bucket.reserve(), 0.5)
+        self.assertAlmostEqual(bucket.reserve(), 1.0)
+        self.clock.sleep(1.0)
+        self.assertAlmostEqual(bucket.reserve(), 0.5)
+        status = bucket.status()
+        self.assertEqual(status["requests"], 5)
+        self.assertEqual(status["delayed"], 3)
+        self.assertAlmostEqual(status["waitTime"], 2.0)
+
+    def test_refill(self):
+        bucket = ratelimit.TokenBucket(10, burst=3, clock=self.clock)
+        for i in range(3):
+            bucket.reserve()
+        self.clock.sleep(100)
+        # never more than burst
+        self.assertEqual(bucket.status()["tokens"], 3.0)
+        self.assertEqual(ratelimit.TokenBucket(0.5, clock=self.clock).burst, 1.0)
+
+    def test_maxWait(self):
+        bucket = ratelimit.TokenBucket(1, clock=self.clock)
+        self.assertEqual(bucket.reserve(0), 0.0)
+        self.assertEqual(bucket.reserve(0.5), None)
+        self.assertAlmostEqual(bucket.reserve(1.0), 1.0)
+        bucket.cancel()
+        self.assertAlmostEqual(bucket.reserve(), 1.0)
+        status = bucket.status()
+        self.assertEqual(status["rejected"], 1)
+        self.assertEqual(status["requests"], 2)
+
+
+class rateLimitsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = retry.FakeClock(now=1000.0)
+
+    def test_config(self):
+        limits = ratelimit.RateLimits(rate=10, services={"myfiles": (1, 5)},
+                                      methods={"newItem": 2, "getItem": (50, 100), "myfiles.@write": 3},
+                                      clock=self.clock)
+        buckets = limits.buckets("mydomain", "mystorage", "newItem")
+        self.assertEqual([(b.rate, b.burst) for b in buckets], [(10, 10), (2, 2)])
+        buckets = limits.buckets("mydomain", "mystorage", "getItem")
+        self.assertEqual([(b.rate, b.burst) for b in buckets], [(10, 10), (50, 100)])
+        self.assertEqual(len(limits.buckets("mydomain", "mystorage", "deleteItem")), 1)
+        buckets = limits.buckets("mydomain", "myfiles", "@write")
+        self.assertEqual([(b.rate, b.burst) for b in buckets], [(1, 5), (3, 3)])
+        self.assertEqual(len(limits.buckets("mydomain", "mystorage", "@write")), 1)
+        # method buckets per service
+        self.assertFalse(limits.buckets("mydomain", "mystorage", "newItem")[1] is
+                         limits.buckets("other", "mystorage", "newItem")[1])
+        self.assertEqual(ratelimit.RateLimits().buckets("mydomain", "mystorage", "getItem"), [])
+
+    def test_reserve(self):
+        limits = ratelimit.RateLimits(rate=10, methods={"newItem": 1}, clock=self.clock)
+        self.assertEqual(limits.reserve("mydomain", "mystorage", "newItem"), 0.0)
+        # the method bucket is empty
+        self.assertAlmostEqual(limits.reserve("mydomain", "mystorage", "newItem"), 1.0)
+        self.assertEqual(limits.reserve("mydomain", "mystorage", "getItem"), 0.0)
+        # tokens of other buckets are returned if the call is not sent
+        self.assertEqual(limits.reserve("mydomain", "mystorage", "newItem", maxWait=0.5), None)
+        states = limits.states()
+        self.assertEqual(states[("mydomain", "mystorage")]["requests"], 3)
+        self.assertEqual(states[("mydomain", "mystorage", "newItem")]["rejected"], 1)
+
+    def test_acquire(self):
+        limits = ratelimit.RateLimits(rate=4, burst=1, maxWait=0.3, clock=self.clock)
+        self.assertTrue(limits.acquire("mydomain", "mystorage", "getItem"))
+        self.assertTrue(limits.acquire("mydomain", "mystorage", "getItem"))
+        self.assertEqual(self.clock.sleeps, [0.25])
+        self.assertTrue(limits.acquire("mydomain", "mystorage", "getItem", maxWait=1))
+        limits.reserve("mydomain", "mystorage", "getItem")
+        self.assertFalse(limits.acquire("mydomain", "mystorage", "getItem"))
+
+
+class clientRateLimitTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig()
+        self.clock = retry.FakeClock(now=1000.0)
+        self.limits = ratelimit.RateLimits(rate=2, burst=1, methods={"newItem": 1}, clock=self.clock)
+        policy = retry.RetryPolicy(retries=0, clock=self.clock)
+        self.client = endpoint.Client(service="mystorage", domain="mydomain", retryPolicy=policy,
+                                      rateLimits=self.limits)
+        self.client.adapter = adapter.MockAdapter()
+        self.client.adapter.request = self.request
+        self.sent = []
+
+    def request(self, method, url, **settings):
+        self.sent.append((url, self.clock.time()))
+        return adapter.MockResponse(status_code=200, url=url, content={"result": 1},
+                                    headers={"Content-Type": "application/json"})
+
+    def test_wait(self):
+        for n in range(3):
+            self.client.call("getItem", {"key": n}, {})
+        self.assertEqual([t for url, t in self.sent], [1000.0, 1000.5, 1001.0])
+        self.client.call("newItem", {"key": 1}, {})
+        self.client.call("newItem", {"key": 2}, {})
+        self.assertEqual([t for url, t in self.sent[3:]], [1001.5, 1002.0])
+
+    def test_threads(self):
+        limits = ratelimit.RateLimits(rate=50, burst=1)
+        self.client.rateLimits = limits
+        self.client.retryPolicy = retry.RetryPolicy(retries=0)
+        threads = [threading.Thread(target=self.client.call, args=("getItem", {"key": n}, {})) for n in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        status = limits.states()[("mydomain", "mystorage")]
+        self.assertEqual(status["requests"], 5)
+        self.assertEqual(status["delayed"], 4)
+        self.assertAlmostEqual(status["waitTime"], 0.2, 1)
+
+    def test_exceeded(self):
+        self.limits.maxWait = 0.2
+        self.client.call("getItem", {"key": 1}, {})
+        self.assertRaises(endpoint.RateLimitExceeded, self.client.call, "getItem", {"key": 2}, {})
+        self.assertEqual(len(self.sent), 1)
+
+    def test_deadline(self):
+        self.client.call("getItem", {"key": 1}, {})
+        self.assertRaises(endpoint.DeadlineExceeded, self.client.call, "getItem", {"key": 2}, {"deadline": 0.2})
+        self.client.call("getItem", {"key": 3}, {"deadline": 1})
+        self.assertEqual(len(self.sent), 2)
+        # the attempt timeout covers the remaining time after waiting
+        self.assertEqual(self.sent[1][1], 1000.5)
+
+    def test_breaker(self):
+        # rate limits reached on the client side are not service failures
+        breakers = breaker.CircuitBreakers(errorRate=0.5, window=4, minCalls=1, clock=self.clock)
+        self.client.circuitBreakers = breakers
+        self.limits.maxWait = 0
+        self.client.call("getItem", {"key": 1}, {})
+        for i in range(3):
+            self.assertRaises(endpoint.RateLimitExceeded, self.client.call, "getItem", {"key": 2}, {})
+        self.limits.maxWait = None
+        self.assertRaises(endpoint.DeadlineExceeded, self.client.call, "getItem", {"key": 3}, {"deadline": 0.2})
+        state = breakers.states()[("mydomain", "mystorage")]
+        self.assertEqual(state["state"], "closed")
+        self.assertEqual((state["calls"], state["failures"]), (1, 0))
+        self.client.call("getItem", {"key": 4}, {})
+        self.assertEqual(len(self.sent), 2)
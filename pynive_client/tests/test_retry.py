@@ -0,0 +1,126 @@
+import unittest
+import logging
+import email.utils
+
+from pynive_client import adapter
+from pynive_client import endpoint
+from pynive_client import retry
+
+
+class policyTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig()
+        self.clock = retry.FakeClock(now=1000.0)
+
+    def response(self, status, headers=None):
+        return adapter.MockResponse(status_code=status, headers=headers or {})
+
+    def test_backoff(self):
+        policy = retry.RetryPolicy(retries=5, backoff=0.1, factor=2, maxBackoff=0.5, jitter=0,
+                                   deadline=None, clock=self.clock)
+        delays = [policy.delay(n, "getItem", "POST", self.response(503), 0) for n in range(6)]
+        self.assertEqual(delays, [0.1, 0.2, 0.4, 0.5, 0.5, None])
+
+    def test_jitter(self):
+        policy = retry.RetryPolicy(backoff=1, factor=1, jitter=0.5, deadline=None, clock=self.clock)
+        for n in range(5):
+            delay = policy.delay(n, "getItem", "POST", self.response(503), 0)
+            self.assertTrue(0.5 <= delay <= 1.0)
+
+    def test_deadline(self):
+        policy = retry.RetryPolicy(backoff=1, jitter=0, deadline=3, clock=self.clock)
+        self.assertEqual(policy.delay(0, "getItem", "POST", self.response(503), 1.5), 1)
+        self.assertEqual(policy.delay(0, "getItem", "POST", self.response(503), 2.5), None)
+
+    def test_status(self):
+        policy = retry.RetryPolicy(jitter=0, clock=self.clock)
+        self.assertTrue(policy.delay(0, "getItem", "POST", self.response(200), 0) is None)
+        self.assertTrue(policy.delay(0, "getItem", "POST", self.response(500), 0) is None)
+        self.assertTrue(policy.delay(0, "getItem", "POST", self.response(404), 0) is None)
+        self.assertTrue(policy.delay(0, "getItem", "POST", self.response(503), 0) > 0)
+        self.assertTrue(policy.delay(0, "getItem", "POST", self.response(504), 0) > 0)
+
+    def test_idempotent(self):
+        policy = retry.RetryPolicy(jitter=0, clock=self.clock)
+        self.assertTrue(policy.isIdempotent("getItem", "POST"))
+        self.assertTrue(policy.isIdempotent("@list", "POST"))
+        self.assertTrue(policy.isIdempotent("newItem", "GET"))
+        self.assertFalse(policy.isIdempotent("newItem", "POST"))
+        self.assertFalse(policy.isIdempotent("@newItem", "POST"))
+        self.assertFalse(policy.isIdempotent("signupDirect", "POST"))
+        # non idempotent calls are retried for 503 only
+        self.assertTrue(policy.delay(0, "newItem", "POST", self.response(503), 0) > 0)
+        self.assertTrue(policy.delay(0, "newItem", "POST", self.response(504), 0) is None)
+
+        policy = retry.RetryPolicy(idempotent=("newItem",), unsafeStatusCodes=(), clock=self.clock)
+        self.assertTrue(policy.isIdempotent("newItem", "POST"))
+        self.assertFalse(policy.isIdempotent("getItem", "POST"))
+        self.assertTrue(policy.delay(0, "getItem", "POST", self.response(503), 0) is None)
+
+    def test_retryafter(self):
+        policy = retry.RetryPolicy(jitter=0, deadline=10, clock=self.clock)
+        self.assertEqual(policy.delay(0, "getItem", "POST", self.response(503, {"Retry-After": "3"}), 0), 3.0)
+        date = email.utils.formatdate(1004.0, usegmt=True)
+        self.assertEqual(policy.delay(0, "getItem", "POST", self.response(503, {"Retry-After": date}), 0), 4.0)
+        self.assertTrue(policy.delay(0, "getItem", "POST", self.response(503, {"Retry-After": "30"}), 0) is None)
+        self.assertEqual(policy.retryAfter(self.response(503, {"Retry-After": "invalid"})), None)
+
+    def test_disabled(self):
+        policy = retry.RetryPolicy(retries=0)
+        self.assertTrue(policy.delay(0, "getItem", "POST", self.response(503), 0) is None)
+
+    def test_clock(self):
+        clock = retry.FakeClock()
+        clock.sleep(2)
+        clock.sleep(0.5)
+        self.assertEqual(clock.time(), 2.5)
+        self.assertEqual(clock.sleeps, [2, 0.5])
+        self.assertTrue(retry.Clock().real)
+        self.assertFalse(clock.real)
+
+
+class clientRetryTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig()
+        self.clock = retry.FakeClock()
+        self.policy = retry.RetryPolicy(retries=3, backoff=0.1, factor=2, jitter=0, clock=self.clock)
+        self.statuses = []
+        self.calls = 0
+        self.client = endpoint.Client(service="myservice", domain="mydomain", retryPolicy=self.policy)
+        self.client.adapter = adapter.MockAdapter()
+        self.client.adapter.request = self.request
+
+    def request(self, method, url, **settings):
+        self.calls += 1
+        status = self.statuses.pop(0) if self.statuses else 200
+        return adapter.MockResponse(status_code=status, headers={"Content-Type": "application/json"},
+                                    content={"result": 1})
+
+    def test_retry(self):
+        self.statuses = [503, 503]
+        content, response = self.client.call("getItem", {}, {})
+        self.assertEqual(content, {"result": 1})
+        self.assertEqual(self.calls, 3)
+        self.assertEqual(self.clock.sleeps, [0.1, 0.2])
+
+    def test_retry_exceeded(self):
+        self.statuses = [503, 503, 503, 503, 503]
+        self.assertRaises(endpoint.ServiceFailure, self.client.call, "getItem", {}, {})
+        self.assertEqual(self.calls, 4)
+
+    def test_retry_timeout(self):
+        self.statuses = [504]
+        self.client.call("getItem", {}, {})
+        self.assertEqual(self.calls, 2)
+
+        self.calls = 0
+        self.statuses = [504]
+        self.assertRaises(endpoint.ServiceFailure, self.client.call, "newItem", {"key": "key1"}, {})
+        self.assertEqual(self.calls, 1)
+
+    def test_default(self):
+        client = endpoint.Client(service="myservice", domain="mydomain")
+        self.assertTrue(isinstance(client.retryPolicy, retry.RetryPolicy))
+        self.assertTrue(client.retryPolicy.clock.real)
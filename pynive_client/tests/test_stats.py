@@ -0,0 +1,166 @@
+
+import unittest
+import threading
+
+from pynive_client import adapter
+from pynive_client import endpoint
+from pynive_client import retry
+from pynive_client import stats
+
+
+class histogramTest(unittest.TestCase):
+
+    def test_empty(self):
+        h = stats.Histogram()
+        self.assertEqual(h.count, 0)
+        self.assertEqual(h.percentile(50), None)
+        self.assertEqual(h.mean(), None)
+
+    def test_percentiles(self):
+        h = stats.Histogram()
+        for i in range(1, 101):
+            h.add(i / 1000.0)
+        self.assertEqual(h.count, 100)
+        self.assertAlmostEqual(h.mean(), 0.0505)
+        self.assertEqual(h.min, 0.001)
+        self.assertEqual(h.max, 0.1)
+        # bucket precision is 10%
+        self.assertTrue(0.05 <= h.percentile(50) <= 0.055)
+        self.assertTrue(0.095 <= h.percentile(95) <= 0.1045)
+        self.assertTrue(0.099 <= h.percentile(99) <= 0.1)
+        self.assertEqual(h.percentile(100), 0.1)
+
+    def test_bounds(self):
+        h = stats.Histogram()
+        h.add(0)
+        h.add(10000)
+        self.assertEqual(h.counts[0], 1)
+        self.assertEqual(h.counts[-1], 1)
+        self.assertEqual(h.percentile(100), 10000)
+
+    def test_fixed_size(self):
+        h = stats.Histogram()
+        size = len(h.counts)
+        for i in range(10000):
+            h.add(i * 0.01)
+        self.assertEqual(len(h.counts), size)
+
+    def test_merge(self):
+        h1 = stats.Histogram()
+        h2 = stats.Histogram()
+        h1.add(0.01)
+        h2.add(0.5)
+        h1.merge(h2)
+        self.assertEqual(h1.count, 2)
+        self.assertEqual(h1.min, 0.01)
+        self.assertEqual(h1.max, 0.5)
+
+
+class statisticsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = retry.FakeClock(100.0)
+        self.stats = stats.Statistics(clock=self.clock.time)
+
+    def test_record(self):
+        self.stats.record("storage", "getItem", 0.1, sent=10, received=100)
+        self.stats.record("storage", "getItem", 0.2, sent=10, received=0, error=endpoint.NotFound())
+        self.stats.record("storage", "setItem", 0.3, sent=50, error=endpoint.ServiceFailure())
+        self.stats.record("files", "read", 0.4, received=1000)
+        self.clock.sleep(2)
+        snapshot = self.stats.snapshot()
+        self.assertEqual(snapshot["duration"], 2)
+        m = snapshot["methods"][("storage", "getItem")]
+        self.assertEqual(m["calls"], 2)
+        self.assertEqual(m["errors"], 1)
+        self.assertEqual(m["errorsByType"], {"NotFound": 1})
+        self.assertEqual(m["bytesSent"], 20)
+        self.assertEqual(m["bytesReceived"], 100)
+        self.assertEqual(m["throughput"], 1.0)
+        self.assertEqual(m["max"], 0.2)
+        s = snapshot["services"]["storage"]
+        self.assertEqual(s["calls"], 3)
+        self.assertEqual(s["errorsByType"], {"NotFound": 1, "ServiceFailure": 1})
+        self.assertEqual(snapshot["services"]["files"]["bytesReceived"], 1000)
+
+    def test_reset(self):
+        self.stats.record("storage", "getItem", 0.1)
+        self.clock.sleep(5)
+        snapshot = self.stats.snapshot(reset=True)
+        self.assertEqual(snapshot["services"]["storage"]["calls"], 1)
+        snapshot = self.stats.snapshot()
+        self.assertEqual(snapshot["services"], {})
+        self.assertEqual(snapshot["since"], 105.0)
+        self.stats.record("storage", "getItem", 0.1)
+        self.stats.reset()
+        self.assertEqual(self.stats.snapshot()["methods"], {})
+
+    def test_threads(self):
+        def run():
+            for i in range(1000):
+                self.stats.record("storage", "getItem", 0.01)
+        threads = [threading.Thread(target=run) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(self.stats.snapshot()["services"]["storage"]["calls"], 4000)
+
+
+class clientStatsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.status = 200
+        self.client = endpoint.Client(service="myservice", domain="mydomain", stats=stats.Statistics(),
+                                      retryPolicy=retry.RetryPolicy(retries=0))
+        self.client.adapter = adapter.MockAdapter()
+        self.client.adapter.request = self.request
+
+    def request(self, method, url, **settings):
+        if self.status is None:
+            raise IOError("connection failed")
+        return adapter.MockResponse(status_code=self.status,
+                                    headers={"Content-Type": "application/json", "content-length": "11"},
+                                    content={"result": 1},
+                                    request=adapter.MockResponse(body=settings.get("data")))
+
+    def test_call(self):
+        self.client.call("getItem", {"key": 1}, {})
+        self.client.call("getItem", {"key": 2}, {})
+        m = self.client.stats.snapshot()["methods"][("myservice", "getItem")]
+        self.assertEqual(m["calls"], 2)
+        self.assertEqual(m["errors"], 0)
+        self.assertEqual(m["bytesSent"], 18)
+        self.assertEqual(m["bytesReceived"], 22)
+        self.assertTrue(m["p99"] is not None)
+
+    def test_errors(self):
+        self.status = 404
+        self.assertRaises(endpoint.NotFound, self.client.call, "getItem", {"key": 1}, {})
+        self.status = None
+        self.assertRaises(IOError, self.client.call, "getItem", {"key": 1}, {})
+        m = self.client.stats.snapshot()["methods"][("myservice", "getItem")]
+        self.assertEqual(m["calls"], 2)
+        self.assertEqual(m["errors"], 2)
+        self.assertEqual(m["errorsByType"], {"NotFound": 1, "IOError" if str is bytes else "OSError": 1})
+
+    def test_shared(self):
+        client2 = endpoint.Client(service="other", domain="mydomain", stats=self.client.stats)
+        client2.adapter = adapter.MockAdapter()
+        client2.adapter.request = self.request
+        self.client.call("getItem", {"key": 1}, {})
+        client2.call("list", {}, {})
+        services = self.client.stats.snapshot()["services"]
+        self.assertEqual(services["myservice"]["calls"], 1)
+        self.assertEqual(services["other"]["calls"], 1)
+
+    def test_legacy_dict(self):
+        client = endpoint.Client(service="myservice", domain="mydomain", stats={})
+        self.assertTrue(isinstance(client.stats, stats.Statistics))
+
+    def test_disabled(self):
+        client = endpoint.Client(service="myservice", domain="mydomain")
+        client.adapter = adapter.MockAdapter()
+        client.adapter.request = self.request
+        client.call("getItem", {"key": 1}, {})
+        self.assertEqual(client.stats, None)
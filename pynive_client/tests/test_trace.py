@@ -0,0 +1,147 @@
+
+import unittest
+import logging
+
+from pynive_client import adapter
+from pynive_client import endpoint
+from pynive_client import retry
+from pynive_client import trace
+
+
+class Recorder(trace.Hooks):
+
+    def __init__(self):
+        self.events = []
+
+    def beforeCall(self, event):
+        self.events.append(("beforeCall", event.method, event.status))
+
+    def afterCall(self, event):
+        self.events.append(("afterCall", event.method, event.status, event.size, event.error))
+
+    def beforeAttempt(self, event):
+        self.events.append(("beforeAttempt", event.attempt, event.parent is not None))
+
+    def afterAttempt(self, event):
+        self.events.append(("afterAttempt", event.attempt, event.status))
+
+    def beforeParse(self, event):
+        self.events.append(("beforeParse", event.status))
+
+    def afterParse(self, event):
+        self.events.append(("afterParse", event.error.__class__.__name__ if event.error else None))
+
+
+class hooksTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig()
+        self.statuses = []
+        self.hooks = Recorder()
+        self.client = endpoint.Client(service="myservice", domain="mydomain", tracer=self.hooks,
+                                      retryPolicy=retry.RetryPolicy(retries=2, clock=retry.FakeClock()))
+        self.client.adapter = adapter.MockAdapter()
+        self.client.adapter.request = self.request
+
+    def request(self, method, url, **settings):
+        status = self.statuses.pop(0) if self.statuses else 200
+        if status is None:
+            raise IOError("connection failed")
+        return adapter.MockResponse(status_code=status, headers={"Content-Type": "application/json"},
+                                    content={"result": 1}, url=url)
+
+    def test_call(self):
+        self.client.call("getItem", {"key": "1"}, {})
+        self.assertEqual(self.hooks.events, [
+            ("beforeCall", "getItem", None),
+            ("beforeAttempt", 0, True),
+            ("afterAttempt", 0, 200),
+            ("beforeParse", 200),
+            ("afterParse", None),
+            ("afterCall", "getItem", 200, 11, None),
+        ])
+
+    def test_retries(self):
+        self.statuses = [503, 503, 200]
+        self.client.call("getItem", {"key": "1"}, {})
+        attempts = [e for e in self.hooks.events if e[0] == "afterAttempt"]
+        self.assertEqual(attempts, [("afterAttempt", 0, 503), ("afterAttempt", 1, 503), ("afterAttempt", 2, 200)])
+
+    def test_errors(self):
+        self.statuses = [404]
+        self.assertRaises(endpoint.NotFound, self.client.call, "getItem", {"key": "1"}, {})
+        self.assertEqual(self.hooks.events[-2], ("afterParse", "NotFound"))
+        self.assertEqual(self.hooks.events[-1][0], "afterCall")
+        self.assertTrue(isinstance(self.hooks.events[-1][4], endpoint.NotFound))
+        self.hooks.events = []
+        self.statuses = [None]
+        self.assertRaises(IOError, self.client.call, "getItem", {"key": "1"}, {})
+        self.assertEqual([e[0] for e in self.hooks.events], ["beforeCall", "beforeAttempt", "afterAttempt", "afterCall"])
+        self.assertEqual(trace.current(), None)
+
+    def test_disabled(self):
+        self.assertEqual(trace.event(None, trace.CALL, "getItem").__enter__(), None)
+        client = endpoint.Client(service="myservice", domain="mydomain")
+        client.adapter = adapter.MockAdapter()
+        client.adapter.request = self.request
+        client.call("getItem", {"key": "1"}, {})
+        self.assertEqual(self.hooks.events, [])
+
+
+class spanTest(unittest.TestCase):
+
+    def setUp(self):
+        self.statuses = []
+        self.exporter = trace.InMemorySpanExporter()
+        self.client = endpoint.Client(service="myservice", domain="mydomain",
+                                      tracer=trace.SpanHooks(exporter=self.exporter),
+                                      retryPolicy=retry.RetryPolicy(retries=2, clock=retry.FakeClock()))
+        self.client.adapter = adapter.MockAdapter()
+        self.client.adapter.request = self.request
+
+    def request(self, method, url, **settings):
+        status = self.statuses.pop(0) if self.statuses else 200
+        return adapter.MockResponse(status_code=status,
+                                    headers={"Content-Type": "application/json", "content-length": "13"},
+                                    content={"result": 1}, url=url)
+
+    def test_spans(self):
+        self.statuses = [503, 200]
+        self.client.call("getItem", {"key": "1"}, {})
+        spans = self.exporter.getFinishedSpans()
+        self.assertEqual([s.name for s in spans], ["POST getItem", "POST getItem", "parse getItem", "myservice getItem"])
+        call = spans[-1]
+        self.assertEqual(call.kind, "CLIENT")
+        self.assertEqual(call.status, "OK")
+        self.assertEqual(call.parentSpanId, None)
+        for span in spans[:-1]:
+            self.assertEqual(span.traceId, call.traceId)
+            self.assertEqual(span.parentSpanId, call.spanId)
+            self.assertEqual(span.kind, "INTERNAL")
+            self.assertTrue(span.startTimeUnixNano <= span.endTimeUnixNano)
+        self.assertEqual(spans[0].attributes["http.response.status_code"], 503)
+        self.assertEqual(spans[1].attributes["http.request.resend_count"], 1)
+        self.assertEqual(call.attributes["rpc.service"], "myservice")
+        self.assertEqual(call.attributes["rpc.method"], "getItem")
+        self.assertEqual(call.attributes["server.address"], "mydomain")
+        self.assertEqual(call.attributes["url.full"], "https://mydomain.nive.io/myservice/getItem")
+        self.assertEqual(call.attributes["http.request.body.size"], 11)
+        self.assertEqual(call.attributes["http.response.body.size"], 13)
+        self.assertEqual(call.attributes["http.response.status_code"], 200)
+
+    def test_error(self):
+        self.statuses = [403]
+        self.assertRaises(endpoint.Forbidden, self.client.call, "getItem", {"key": "1"}, {})
+        call = self.exporter.getFinishedSpans()[-1]
+        self.assertEqual(call.status, "ERROR")
+        self.assertEqual(call.attributes["error.type"], "Forbidden")
+        self.assertEqual(call.events[0]["name"], "exception")
+        self.assertEqual(call.events[0]["attributes"]["exception.type"], "Forbidden")
+
+    def test_traces(self):
+        self.client.call("getItem", {"key": "1"}, {})
+        self.client.call("getItem", {"key": "2"}, {})
+        calls = [s for s in self.exporter.getFinishedSpans() if s.kind == "CLIENT"]
+        self.assertNotEqual(calls[0].traceId, calls[1].traceId)
+        self.exporter.clear()
+        self.assertEqual(self.exporter.getFinishedSpans(), [])
@@ -0,0 +1,219 @@
+
+import unittest
+import requests
+import logging
+import threading
+
+from pynive_client import endpoint
+from pynive_client import filestore
+from pynive_client import stats
+from pynive_client import transport
+from pynive_client.tests import servers
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+class getTransportTest(unittest.TestCase):
+
+    def test_names(self):
+        self.assertTrue(isinstance(transport.getTransport(), transport.RequestsTransport))
+        self.assertTrue(isinstance(transport.getTransport("urllib3"), transport.Urllib3Transport))
+        self.assertRaises(ValueError, transport.getTransport, "curl")
+
+    def test_client(self):
+        self.assertTrue(isinstance(endpoint.Client().adapter, transport.RequestsTransport))
+        client = endpoint.Client(service="myservice", domain="mydomain", transport="urllib3")
+        self.assertTrue(isinstance(client.adapter, transport.Urllib3Transport))
+        session = client.newSession(pool_maxsize=3, auth="12345")
+        self.assertTrue(isinstance(session, transport.Urllib3Transport))
+        self.assertEqual(session.authtoken, "12345")
+        self.assertEqual(client.poolStats(), {})
+
+    def test_requests_module(self):
+        # the previous default adapter
+        client = endpoint.Client(service="myservice", domain="mydomain")
+        client.adapter = requests
+        session = client.newSession(pool_maxsize=7)
+        self.assertTrue(isinstance(session, requests.Session))
+        self.assertEqual(session.pool._pool_maxsize, 7)
+
+
+class _TransportTest(object):
+    # shared tests run with each transport
+    transport = None
+
+    def setUp(self):
+        logging.basicConfig()
+        self.server = servers.Server(("127.0.0.1", 0), servers.Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.domain = "127.0.0.1:%d" % self.server.server_address[1]
+        self.client = endpoint.Client(service="myservice", domain=self.domain, secure=False,
+                                      transport=self.transport, stats=stats.Statistics())
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_post(self):
+        self.client.newSession()
+        for i in range(3):
+            content, response = self.client.call("echo", {"n": i}, {})
+            self.assertEqual(content, {"n": i})
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.elapsed.total_seconds() > 0)
+        m = self.client.stats.snapshot()["methods"][("myservice", "echo")]
+        self.assertEqual(m["calls"], 3)
+        self.assertEqual(m["bytesSent"], 21)
+        self.assertEqual(m["bytesReceived"], 21)
+
+    def test_nosession(self):
+        content, response = self.client.call("echo", [1, 2, 3], {})
+        self.assertEqual(content, [1, 2, 3])
+
+    def test_status(self):
+        self.assertRaises(endpoint.NotFound, self.client.call, "unknown", None, {})
+
+    def test_gzip(self):
+        content, response = self.client.call("gzip", None, {})
+        self.assertEqual(content, {"compressed": True})
+        content, response = self.client.call("moved", None, {})
+        self.assertEqual(content, {"compressed": True})
+        self.assertTrue(response.url.endswith("/myservice/gzip"))
+
+    def test_cookies(self):
+        self.client.newSession()
+        self.client.call("signin", None, {})
+        content, response = self.client.call("cookie", None, {})
+        self.assertEqual(content, {"cookie": "session=abc123"})
+
+    def test_stream(self):
+        files = filestore.FileStore(service="myservice", domain=self.domain, secure=False,
+                                    transport=self.transport)
+        files.newSession(pool_maxsize=1)
+        for i in range(2):
+            with files.read("file.txt") as file:
+                self.assertEqual(file.read(10), b"x" * 10)
+                self.assertEqual(len(file.read()), servers.Handler.fileSize - 10)
+        # partly read
+        file = files.read("file.txt")
+        file.read(10)
+        file.close()
+        self.assertEqual(files.call("echo", {"a": 1}, {})[0], {"a": 1})
+
+    def test_upload(self):
+        files = filestore.FileStore(service="myservice", domain=self.domain, secure=False,
+                                    transport=self.transport)
+        result = files.upload("file.txt", [b"x" * 1000, b"y" * 500])
+        self.assertEqual(result.result, 1500)
+
+    def test_timeout(self):
+        self.assertRaises(requests.exceptions.ReadTimeout, self.client.call, "slow", None, {"timeout": 0.1})
+
+    def test_deadline(self):
+        self.assertRaises(endpoint.DeadlineExceeded, self.client.call, "slow", None, {"deadline": 0.1})
+
+    def test_connection(self):
+        client = endpoint.Client(service="myservice", domain="127.0.0.1:1", secure=False,
+                                 transport=self.transport)
+        self.assertRaises(requests.exceptions.ConnectionError, client.call, "echo", {}, {})
+
+
+class requestsTransportTest(_TransportTest, unittest.TestCase):
+    transport = "requests"
+
+
+class urllib3TransportTest(_TransportTest, unittest.TestCase):
+    transport = "urllib3"
+
+    def test_cookieJar(self):
+        session = self.client.newSession()
+        self.client.call("signin", None, {})
+        self.assertEqual(session.cookies.get("session"), "abc123")
+        self.assertEqual(session.cookies.get("session", host="other"), None)
+        # cookies are not sent to other hosts
+        headers = {}
+        session.cookies.addHeader("http://localhost/", headers)
+        self.assertEqual(headers, {})
+        session.cookies.clear()
+        content, response = self.client.call("cookie", None, {})
+        self.assertEqual(content, {"cookie": None})
+
+    def test_request(self):
+        content, response = self.client.call("echo", {"a": 1}, {})
+        self.assertEqual(response.request.body, b'{"a":1}')
+        self.assertEqual(response.json(), {"a": 1})
+        self.assertEqual(list(response.iter_content(3)), [b'{"a', b'":1', b'}'])
+        self.assertTrue(response.ok)
+        response.close()
+
+
+@unittest.skipIf(httpx is None or servers.h2 is None, "httpx and h2 not installed")
+class httpxTransportTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig()
+        self.server = servers.H2Server(delay=0.01)
+        self.domain = "127.0.0.1:%d" % self.server.port
+        self.client = endpoint.Client(service="myservice", domain=self.domain, secure=False,
+                                      transport=transport.HttpxTransport(http1=False),
+                                      stats=stats.Statistics())
+
+    def tearDown(self):
+        self.server.close()
+
+    def test_call(self):
+        content, response = self.client.call("echo", {"a": 1}, {})
+        self.assertEqual(content, {"a": 1})
+        self.assertEqual(response.http_version, "HTTP/2")
+        self.assertEqual(response.request.body, b'{"a":1}')
+        m = self.client.stats.snapshot()["methods"][("myservice", "echo")]
+        self.assertEqual(m["bytesSent"], 7)
+        self.assertEqual(m["bytesReceived"], 7)
+
+    def test_stream(self):
+        response = self.client._send(self.client.url("echo"), "echo", {"b": 2}, stream=True)
+        file = endpoint.FileWrapper(response)
+        self.assertEqual(file.read(), b'{"b":2}')
+        file.close()
+
+    def test_multiplexed(self):
+        # open responses keep http/1.1 connections busy. http/2 streams share one connection.
+        # (concurrent threads are not used: httpcore may open streams out of order)
+        self.client.newSession(pool_connections=1, pool_maxsize=2)
+        responses = [self.client._send(self.client.url("echo"), "echo", {"n": n}, stream=True)
+                     for n in range(10)]
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual([r.json() for r in responses], [{"n": n} for n in range(10)])
+        for r in responses:
+            r.close()
+        self.assertEqual(self.server.requests, 10)
+
+    def test_upload(self):
+        # bytes are sent as memoryview chunks. the server echoes the body.
+        files = filestore.FileStore(service="myservice", domain=self.domain, secure=False,
+                                    transport=transport.HttpxTransport(http1=False))
+        body = b'{"result": "' + b"x" * 100000 + b'"}'
+        result = files.upload("file.txt", body, chunkSize=4096)
+        self.assertEqual(result.result, "x" * 100000)
+        self.assertEqual(self.server.requests, 1)
+
+    def test_connection(self):
+        client = endpoint.Client(service="myservice", domain="127.0.0.1:1", secure=False,
+                                 transport=transport.HttpxTransport(http1=False))
+        self.assertRaises(requests.exceptions.ConnectionError, client.call, "echo", {}, {})
+
+    def test_timeout(self):
+        self.server.delay = 0.5
+        self.assertRaises(requests.exceptions.ReadTimeout, self.client.call, "echo", {}, {"timeout": 0.1})
+
+
+@unittest.skipIf(httpx is not None, "httpx installed")
+class httpxMissingTest(unittest.TestCase):
+
+    def test_missing(self):
+        self.assertRaises(ImportError, transport.getTransport, "httpx")
@@ -3254,3 +3254,33 @@ class adminFunctionTest(unittest.TestCase):
         r = self.user.ping()
         self.assertEqual(r, 1)
 
+
+
+
+class adminIteratorTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig()
+        users = [{"reference": "ref%d" % i, "name": "user%d" % i} for i in range(1, 5)]
+        responses = []
+        for method in ("list", "identities"):
+            for start in (1, 3, 5):
+                responses.append(adapter.StoredResponse(service="users",
+                                   method=method,
+                                   payload={"start": start},
+                                   response={
+                                      "status_code": 200,
+                                      "content": {"users": users[start-1:start+1], "size": 2, "start": start},
+                                      "headers": {"Content-Type":"application/json"}
+                                   }))
+        session = adapter.MockAdapter(responses=responses)
+        self.user = userstore.User(domain="mydomain", session=session)
+
+    def test_iterUsers(self):
+        result = list(self.user.iterUsers(size=2))
+        self.assertEqual([u["name"] for u in result], ["user1", "user2", "user3", "user4"])
+        self.assertEqual(self.user.counter, 3)
+
+    def test_iterIdentities(self):
+        result = list(self.user.iterIdentities(size=2, prefetch=True))
+        self.assertEqual(len(result), 4)
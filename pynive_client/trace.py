@@ -0,0 +1,396 @@
+# (c) 2013-2015 Nive GmbH - nive.io
+# This file is released under the BSD-License.
+#
+# Tracing hooks for service calls
+# -------------------------------
+#
+"""
+Clients call tracing hooks before and after
+
+- each service call (`Client.call()`),
+- each http request sent by `Client._send()` including retries (attempts) and
+- response parsing in `Client._handleResponse()`.
+
+Hooks receive an `Event` with the method name, service, url, payload size,
+status and timing. Subclass `Hooks` and pass an instance as `tracer` ::
+
+    from pynive_client import trace
+
+    class Log(trace.Hooks):
+        def afterCall(self, event):
+            print(event.service, event.method, event.status, event.duration)
+
+    storage = datastore.DataStore(service='mystorage', domain='mydomain', tracer=Log())
+
+`SpanHooks` creates spans in the OpenTelemetry data model. If an opentelemetry
+tracer is passed, spans are created with the opentelemetry api ::
+
+    from opentelemetry import trace as otel
+    tracer = trace.SpanHooks(tracer=otel.get_tracer("pynive_client"))
+
+Otherwise spans are exported to `exporter`, e.g. `InMemorySpanExporter` in tests ::
+
+    exporter = trace.InMemorySpanExporter()
+    storage = datastore.DataStore(service='mystorage', domain='mydomain',
+                                  tracer=trace.SpanHooks(exporter=exporter))
+    storage.getItem(key='1')
+    for span in exporter.getFinishedSpans():
+        print(span.name, span.attributes)
+"""
+
+import random
+import threading
+import time
+
+# python 2/3
+try:
+    import contextvars
+except ImportError:
+    contextvars = None
+
+CALL = "call"
+ATTEMPT = "attempt"
+PARSE = "parse"
+
+
+if contextvars is not None:
+    # context variables follow asyncio tasks
+    _current = contextvars.ContextVar("pynive_client_trace", default=None)
+
+    def current():
+        """
+        Returns the active call event or None.
+        """
+        return _current.get()
+
+    def _activate(event):
+        return _current.set(event)
+
+    def _deactivate(token):
+        _current.reset(token)
+
+else:
+    _local = threading.local()
+
+    def current():
+        """
+        Returns the active call event or None.
+        """
+        return getattr(_local, "event", None)
+
+    def _activate(event):
+        previous = current()
+        _local.event = event
+        return previous
+
+    def _deactivate(token):
+        _local.event = token
+
+
+def event(hooks, kind, method, service=None, url=None, **values):
+    """
+    Returns a context manager calling `hooks.before()` and `hooks.after()` around
+    the block. The `Event` is returned by `__enter__`. If `hooks` is None the context
+    manager does nothing and returns None.
+
+    :param hooks: Hooks instance or None
+    :param kind: CALL, ATTEMPT or PARSE
+    :param method: service method name
+    :param service: service name
+    :param url: request url
+    :param values: other Event attributes
+    """
+    if hooks is None:
+        return _null
+    return Event(hooks, kind, method, service, url, parent=current(), **values)
+
+
+class Event(object):
+    """
+    Traced operation. `status`, `responseSize` and `error` are set by the client while
+    the operation runs, `end` and `duration` after it finished. Hooks can store
+    additional values in `data`.
+
+    - kind: CALL, ATTEMPT or PARSE
+    - method, service, domain, url, httpmethod
+    - attempt: number of the http request starting with 0 (ATTEMPT only)
+    - size: request body size in bytes
+    - responseSize: response body size in bytes if known
+    - status: http status code
+    - start, end: timestamps in seconds
+    - duration: seconds
+    - error: exception raised by the operation
+    - parent: the CALL event for ATTEMPT and PARSE events
+    """
+
+    def __init__(self, hooks, kind, method, service=None, url=None, domain=None, httpmethod=None,
+                 attempt=None, size=None, status=None, responseSize=None, parent=None):
+        self.hooks = hooks
+        self.kind = kind
+        self.method = method
+        self.service = service
+        self.domain = domain
+        self.url = url
+        self.httpmethod = httpmethod
+        self.attempt = attempt
+        self.size = size
+        self.responseSize = responseSize
+        self.status = status
+        self.parent = parent
+        self.start = self.end = self.duration = None
+        self.error = None
+        self.data = {}
+        self._token = None
+
+    def __enter__(self):
+        self.start = time.time()
+        parent = self.parent
+        if parent is not None and self.size is not None and parent.size is None:
+            parent.size = self.size
+        self.hooks.before(self)
+        if self.kind == CALL:
+            self._token = _activate(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.end = time.time()
+        self.duration = self.end - self.start
+        if exc_value is not None:
+            self.error = exc_value
+        if self.kind == CALL:
+            _deactivate(self._token)
+        self.hooks.after(self)
+        return False
+
+    def __repr__(self):
+        return "<Event %s %s %s %s>" % (self.kind, self.service, self.method, self.status)
+
+
+class _Null(object):
+    # context manager used if tracing is disabled
+    def __enter__(self):
+        return None
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+_null = _Null()
+
+
+def bodySize(data):
+    """
+    Returns the size of a request body in bytes or None for streams.
+    """
+    if isinstance(data, bytes):
+        return len(data)
+    if isinstance(data, str):
+        return len(data.encode("utf-8"))
+    return None
+
+
+def responseSize(response):
+    """
+    Returns the content-length of a response or None.
+    """
+    headers = response.headers or {}
+    try:
+        return int(headers["content-length"])
+    except (KeyError, ValueError):
+        return None
+
+
+class Hooks(object):
+    """
+    Base class for tracing hooks. `before()` and `after()` call the methods for the
+    event kind. Override either the generic or the specific methods. Exceptions raised
+    by hooks are not caught.
+    """
+
+    def before(self, event):
+        if event.kind == CALL:
+            self.beforeCall(event)
+        elif event.kind == ATTEMPT:
+            self.beforeAttempt(event)
+        else:
+            self.beforeParse(event)
+
+    def after(self, event):
+        if event.kind == CALL:
+            self.afterCall(event)
+        elif event.kind == ATTEMPT:
+            self.afterAttempt(event)
+        else:
+            self.afterParse(event)
+
+    def beforeCall(self, event):
+        pass
+
+    def afterCall(self, event):
+        pass
+
+    def beforeAttempt(self, event):
+        pass
+
+    def afterAttempt(self, event):
+        pass
+
+    def beforeParse(self, event):
+        pass
+
+    def afterParse(self, event):
+        pass
+
+
+
+class Span(object):
+    """
+    Finished span in the OpenTelemetry data model. Ids are hex strings, times
+    nanoseconds since the epoch. `status` is UNSET, OK or ERROR. Exceptions are
+    stored as `exception` events.
+    """
+
+    def __init__(self, name, kind, traceId, spanId, parentSpanId, startTimeUnixNano, attributes):
+        self.name = name
+        self.kind = kind
+        self.traceId = traceId
+        self.spanId = spanId
+        self.parentSpanId = parentSpanId
+        self.startTimeUnixNano = startTimeUnixNano
+        self.endTimeUnixNano = None
+        self.attributes = attributes
+        self.status = "UNSET"
+        self.statusMessage = None
+        self.events = []
+
+    def __repr__(self):
+        return "<Span %s %s>" % (self.name, self.spanId)
+
+
+class InMemorySpanExporter(object):
+    """
+    Collects finished spans. For tests.
+    """
+
+    def __init__(self):
+        self._spans = []
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        with self._lock:
+            self._spans.extend(spans)
+
+    def getFinishedSpans(self):
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self):
+        with self._lock:
+            self._spans = []
+
+
+class SpanHooks(Hooks):
+    """
+    Creates a CLIENT span for each call with INTERNAL child spans for attempts and
+    response parsing. Attributes follow the OpenTelemetry semantic conventions.
+
+    If `tracer` is an opentelemetry tracer spans are created by the tracer and
+    call spans are children of the current opentelemetry span. Otherwise `Span`
+    instances are passed to `exporter.export()`.
+    """
+
+    def __init__(self, exporter=None, tracer=None):
+        """
+
+        :param exporter: object with an `export(spans)` method
+        :param tracer: opentelemetry.trace.Tracer instance
+        """
+        self.exporter = exporter
+        self.tracer = tracer
+        self._random = random.Random()
+
+    def before(self, event):
+        if event.kind == CALL:
+            name = "%s %s" % (event.service, event.method or "download")
+            kind = "CLIENT"
+        elif event.kind == ATTEMPT:
+            name = "%s %s" % (event.httpmethod, event.method or "download")
+            kind = "INTERNAL"
+        else:
+            name = "parse %s" % (event.method or "download")
+            kind = "INTERNAL"
+        parent = event.parent.data.get("span") if event.parent is not None else None
+        if self.tracer is not None:
+            event.data["span"] = self._startOtel(name, kind, parent, event)
+            return
+        if parent is not None:
+            traceId, parentId = parent.traceId, parent.spanId
+        else:
+            traceId, parentId = "%032x" % self._random.getrandbits(128), None
+        event.data["span"] = Span(name, kind, traceId, "%016x" % self._random.getrandbits(64), parentId,
+                                  int(event.start * 1e9), self.attributes(event))
+
+    def after(self, event):
+        span = event.data.get("span")
+        if span is None:
+            return
+        attributes = self.attributes(event)
+        if self.tracer is not None:
+            self._endOtel(span, event, attributes)
+            return
+        span.attributes.update(attributes)
+        span.endTimeUnixNano = int(event.end * 1e9)
+        if event.error is not None:
+            span.status = "ERROR"
+            span.statusMessage = str(event.error)
+            span.events.append(dict(name="exception",
+                                    timeUnixNano=span.endTimeUnixNano,
+                                    attributes={"exception.type": event.error.__class__.__name__,
+                                                "exception.message": str(event.error)}))
+        elif event.kind == CALL:
+            span.status = "OK"
+        if self.exporter is not None:
+            self.exporter.export([span])
+
+    def attributes(self, event):
+        """
+        Returns the span attributes for the event.
+        """
+        values = {"rpc.system": "nive",
+                  "rpc.service": event.service,
+                  "rpc.method": event.method or ""}
+        if event.domain is not None:
+            values["server.address"] = event.domain
+        if event.url is not None:
+            values["url.full"] = event.url
+        if event.httpmethod is not None:
+            values["http.request.method"] = event.httpmethod
+        if event.attempt:
+            values["http.request.resend_count"] = event.attempt
+        if event.size is not None:
+            values["http.request.body.size"] = event.size
+        if event.responseSize is not None:
+            values["http.response.body.size"] = event.responseSize
+        if event.status is not None:
+            values["http.response.status_code"] = event.status
+        if event.error is not None:
+            values["error.type"] = event.error.__class__.__name__
+        return values
+
+    def _startOtel(self, name, kind, parent, event):
+        from opentelemetry import trace as otel
+        context = otel.set_span_in_context(parent) if parent is not None else None
+        return self.tracer.start_span(name,
+                                      context=context,
+                                      kind=getattr(otel.SpanKind, kind),
+                                      attributes=self.attributes(event),
+                                      start_time=int(event.start * 1e9))
+
+    def _endOtel(self, span, event, attributes):
+        from opentelemetry import trace as otel
+        span.set_attributes(attributes)
+        if event.error is not None:
+            span.record_exception(event.error)
+            span.set_status(otel.Status(otel.StatusCode.ERROR, str(event.error)))
+        elif event.kind == CALL:
+            span.set_status(otel.Status(otel.StatusCode.OK))
+        span.end(end_time=int(event.end * 1e9))
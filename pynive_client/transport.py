@@ -0,0 +1,555 @@
+# (c) 2013-2015 Nive GmbH - nive.io
+# This file is released under the BSD-License.
+#
+# Http transports
+# ---------------
+#
+"""
+Clients send requests through a transport. A transport provides the subset of the
+`requests` api used by `Client._send()` ::
+
+    response = transport.request(httpmethod, url, headers=..., data=..., timeout=...,
+                                 stream=..., cookies=...)
+    session = transport.Session(max_retries=3, pool_connections=3, pool_maxsize=5, pool_block=True)
+
+Responses provide `status_code`, `reason`, `url`, `headers`, `content`, `elapsed`,
+`request.body`, `json()`, `iter_content()` and `close()`. Network errors are raised as
+`requests.exceptions`.
+
+Included transports:
+
+- `RequestsTransport` (default) based on the `requests` package
+- `Urllib3Transport` a thin layer on top of an `urllib3.PoolManager` with less per
+  call overhead
+- `HttpxTransport` multiplexes concurrent calls over HTTP/2 connections. Requires the
+  optional `httpx` and `h2` packages (`pip install pynive_client[http2]`) ::
+
+    storage = datastore.DataStore(service='mystorage', domain='mydomain', transport='urllib3')
+    storage.newSession()
+
+See `benchmarks/transport.py` and `benchmarks/http2.py` to compare the transports.
+"""
+
+import datetime
+import json
+import threading
+import time
+
+import requests
+import urllib3
+
+# python 2/3
+try:
+    from http.cookies import SimpleCookie
+    import http.cookiejar as cookielib
+except ImportError:
+    from Cookie import SimpleCookie
+    import cookielib
+try:
+    from urllib.parse import urlsplit, urljoin
+except ImportError:
+    from urlparse import urlsplit, urljoin
+
+
+class Transport(object):
+    """
+    Base class of transports.
+    """
+    name = None
+    # auth token of sessions. see `Client.newSession()`
+    authtoken = None
+    cookies = None
+
+    def request(self, method, url, **settings):
+        """
+        Sends a request and returns the response.
+
+        :param method: http method
+        :param url: absolute url
+        :param settings: headers, data, timeout, stream, cookies
+        :return: response
+        """
+        raise NotImplementedError()
+
+    def Session(self, max_retries=3, pool_connections=3, pool_maxsize=5, pool_block=True):
+        """
+        Returns a new session keeping connections and cookies. See `Client.newSession()`.
+        """
+        raise NotImplementedError()
+
+
+class RequestsTransport(Transport):
+    """
+    Transport based on the `requests` package. Sessions are `requests.Session` instances
+    with a `PooledHTTPAdapter` mounted for http and https urls.
+    """
+    name = "requests"
+
+    def request(self, method, url, **settings):
+        return requests.request(method, url, **settings)
+
+    def Session(self, max_retries=3, pool_connections=3, pool_maxsize=5, pool_block=True):
+        session = requests.Session()
+        adapter = PooledHTTPAdapter(max_retries=max_retries,
+                                    pool_connections=pool_connections,
+                                    pool_maxsize=pool_maxsize,
+                                    pool_block=pool_block)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.pool = adapter
+        return session
+
+
+class PooledHTTPAdapter(requests.adapters.HTTPAdapter):
+    """
+    requests transport adapter with per host connection limits and pool statistics.
+
+    Each host gets `pool_maxsize` connection slots. If `pool_block` is True a request
+    waits until a slot is free. The wait is limited by the connect timeout of the request
+    (or the timeout if a single value) and raises `PoolTimeout`. The time spent waiting
+    is recorded per host.
+    """
+
+    def __init__(self, pool_connections=3, pool_maxsize=5, max_retries=3, pool_block=True):
+        super(PooledHTTPAdapter, self).__init__(pool_connections=pool_connections,
+                                                pool_maxsize=pool_maxsize,
+                                                max_retries=max_retries,
+                                                pool_block=pool_block)
+        self._statsLock = threading.Lock()
+        self._slots = {}
+        self._stats = {}
+
+    def send(self, request, **kw):
+        host = urlsplit(request.url).netloc
+        slot, stats = self._host(host)
+        if self._pool_block:
+            start = time.time()
+            with self._statsLock:
+                stats["waiting"] += 1
+            if not _acquire(slot, _poolTimeout(kw.get('timeout'))):
+                with self._statsLock:
+                    stats["waiting"] -= 1
+                raise PoolTimeout("No free connection within timeout: %s" % host, request=request)
+            waited = time.time() - start
+        else:
+            waited = 0.0
+        with self._statsLock:
+            if self._pool_block:
+                stats["waiting"] -= 1
+            stats["requests"] += 1
+            stats["active"] += 1
+            stats["waitTime"] += waited
+            if waited > stats["maxWaitTime"]:
+                stats["maxWaitTime"] = waited
+            if stats["active"] > stats["maxActive"]:
+                stats["maxActive"] = stats["active"]
+        try:
+            return super(PooledHTTPAdapter, self).send(request, **kw)
+        finally:
+            with self._statsLock:
+                stats["active"] -= 1
+            if self._pool_block:
+                slot.release()
+
+    def stats(self):
+        """
+        Returns a copy of the pool statistics per host:
+
+        - active: requests currently sent
+        - maxActive: maximum number of concurrent requests
+        - requests: number of requests sent
+        - waiting: requests currently waiting for a free connection
+        - waitTime: total seconds spent waiting for a free connection
+        - maxWaitTime: longest wait for a free connection in seconds
+
+        :return: dict {host: dict}
+        """
+        with self._statsLock:
+            return dict([(host, dict(values)) for host, values in self._stats.items()])
+
+    def close(self):
+        # in flight requests release the slots they hold
+        super(PooledHTTPAdapter, self).close()
+        with self._statsLock:
+            self._slots.clear()
+            self._stats.clear()
+
+    def resetStats(self):
+        with self._statsLock:
+            for values in self._stats.values():
+                values.update(maxActive=values["active"], requests=0, waitTime=0.0, maxWaitTime=0.0)
+
+    def _host(self, host):
+        with self._statsLock:
+            if not host in self._slots:
+                self._slots[host] = threading.BoundedSemaphore(self._pool_maxsize)
+                self._stats[host] = dict(active=0, maxActive=0, requests=0, waiting=0,
+                                         waitTime=0.0, maxWaitTime=0.0)
+            return self._slots[host], self._stats[host]
+
+
+class PoolTimeout(requests.exceptions.ConnectTimeout):
+    """
+    raised in case a blocking connection pool (see `PooledHTTPAdapter`) has no free
+    connection within the connect timeout
+    """
+
+
+class Urllib3Transport(Transport):
+    """
+    Transport sending requests directly through an `urllib3.PoolManager`.
+
+    Supported request settings are `headers`, `data`, `timeout`, `stream`, `cookies` and
+    `allow_redirects`. Tls verification and proxies are configured by `poolOptions`
+    passed to the pool manager. Sessions store cookies per host.
+    """
+    name = "urllib3"
+    headers = {"Accept": "*/*", "Accept-Encoding": "gzip, deflate"}
+    maxRedirects = 30
+
+    def __init__(self, num_pools=10, maxsize=10, block=False, max_retries=0, cookies=False, **poolOptions):
+        """
+
+        :param num_pools: number of hosts with cached connection pools
+        :param maxsize: connections per host
+        :param block: wait for a free connection instead of opening additional connections
+        :param max_retries: retries of failed connection attempts
+        :param cookies: store cookies set by services
+        :param poolOptions: other `urllib3.PoolManager` options
+        """
+        self.poolOptions = poolOptions
+        self.manager = urllib3.PoolManager(num_pools=num_pools, maxsize=maxsize, block=block, **poolOptions)
+        self.retries = urllib3.Retry(total=None, connect=max_retries, read=False, status=0, other=0,
+                                     redirect=self.maxRedirects)
+        self.cookies = CookieJar() if cookies else None
+
+    def request(self, method, url, headers=None, data=None, timeout=None, stream=False, cookies=None,
+                allow_redirects=True):
+        reqHeaders = urllib3.HTTPHeaderDict(self.headers)
+        if headers:
+            reqHeaders.update(headers)
+        jar = self.cookies
+        if cookies is not None and cookies is not jar:
+            reqHeaders["Cookie"] = "; ".join(["%s=%s" % (k, v) for k, v in cookies.items()])
+        elif jar is not None:
+            jar.addHeader(url, reqHeaders)
+        if isinstance(data, str) and not isinstance(data, bytes):
+            data = data.encode("utf-8")
+        chunked = data is not None and not isinstance(data, bytes) and not "Content-Length" in reqHeaders
+        if isinstance(timeout, tuple):
+            timeout = urllib3.Timeout(connect=timeout[0], read=timeout[1])
+        elif timeout is not None:
+            timeout = urllib3.Timeout(connect=timeout, read=timeout)
+        else:
+            timeout = urllib3.Timeout()
+        start = time.time()
+        try:
+            raw = self.manager.urlopen(method, url, body=data, headers=reqHeaders, timeout=timeout,
+                                       retries=self.retries, redirect=allow_redirects, chunked=chunked,
+                                       preload_content=not stream)
+        except urllib3.exceptions.HTTPError as e:
+            raise _convertError(e)
+        response = Response(raw, url, Request(method, url, reqHeaders, data), time.time()-start, stream)
+        if jar is not None:
+            jar.extract(response.url, raw.headers)
+        return response
+
+    def Session(self, max_retries=3, pool_connections=3, pool_maxsize=5, pool_block=True):
+        return Urllib3Transport(num_pools=pool_connections, maxsize=pool_maxsize, block=pool_block,
+                                max_retries=max_retries, cookies=True, **self.poolOptions)
+
+
+class HttpxTransport(Transport):
+    """
+    HTTP/2 transport based on the `httpx` package (`pip install httpx[http2]`). Concurrent
+    calls to a host are multiplexed over a single connection instead of opening a
+    connection per call.
+
+    `httpx` is imported when the transport is created. HTTP/2 is negotiated for https
+    urls. Set `http1=False` to use HTTP/2 without tls (prior knowledge), e.g. for local
+    servers. Supported request settings are the same as for `Urllib3Transport`.
+    """
+    name = "httpx"
+
+    def __init__(self, http2=True, http1=True, max_connections=10, max_retries=0, cookies=False,
+                 **clientOptions):
+        """
+
+        :param http2: enable HTTP/2
+        :param http1: enable HTTP/1.1. If False HTTP/2 is used for all urls.
+        :param max_connections: connections to all hosts
+        :param max_retries: retries of failed connection attempts
+        :param cookies: store cookies set by services
+        :param clientOptions: other `httpx.HTTPTransport` options e.g. verify
+        """
+        import httpx
+        self.http2 = http2
+        self.http1 = http1
+        self.clientOptions = clientOptions
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        transport = httpx.HTTPTransport(http1=http1, http2=http2, limits=limits, retries=max_retries,
+                                        **clientOptions)
+        jar = None
+        if not cookies:
+            # reject all cookies
+            jar = cookielib.CookieJar(policy=cookielib.DefaultCookiePolicy(allowed_domains=[]))
+        self.client = httpx.Client(transport=transport, cookies=jar)
+        self.cookies = self.client.cookies if cookies else None
+        self._httpx = httpx
+
+    def request(self, method, url, headers=None, data=None, timeout=None, stream=False, cookies=None,
+                allow_redirects=True):
+        httpx = self._httpx
+        headers = dict(headers or ())
+        if cookies is not None and cookies is not self.cookies:
+            headers["Cookie"] = "; ".join(["%s=%s" % (k, v) for k, v in cookies.items()])
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        elif hasattr(data, "read"):
+            data = _readChunks(data)
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        else:
+            timeout = httpx.Timeout(timeout)
+        start = time.time()
+        try:
+            req = self.client.build_request(method, url, content=data, headers=headers, timeout=timeout)
+            raw = self.client.send(req, stream=stream, follow_redirects=allow_redirects)
+        except httpx.HTTPError as e:
+            raise _convertHttpxError(httpx, e)
+        return HttpxResponse(raw, Request(method, url, headers, data), time.time()-start, stream)
+
+    def Session(self, max_retries=3, pool_connections=3, pool_maxsize=5, pool_block=True):
+        # calls always wait for a free connection if the limit is reached
+        return HttpxTransport(http2=self.http2, http1=self.http1, max_connections=pool_connections*pool_maxsize,
+                              max_retries=max_retries, cookies=True, **self.clientOptions)
+
+    def close(self):
+        self.client.close()
+
+
+class Request(object):
+    """
+    Sent request. Provides the attributes of `requests.PreparedRequest` used by the
+    clients.
+    """
+
+    def __init__(self, method, url, headers, body):
+        self.method = method
+        self.url = url
+        self.headers = headers
+        self.body = body
+
+
+class Response(object):
+    """
+    `requests.Response` compatible wrapper of `urllib3.HTTPResponse`. The body of
+    streamed responses is read by `iter_content()` or on first access of `content`.
+    """
+
+    def __init__(self, raw, url, request, elapsed, stream=False):
+        self.raw = raw
+        self.status_code = raw.status
+        self.reason = raw.reason or ""
+        self.headers = raw.headers
+        # the path of the final url after redirects
+        self.url = urljoin(url, raw.url) if raw.url else url
+        self.request = request
+        self.elapsed = datetime.timedelta(seconds=elapsed)
+        self._content = None if stream else raw.data
+        self._consumed = not stream
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def content(self):
+        if self._content is None:
+            self._content = b"".join(self.iter_content(65536))
+        return self._content
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", "replace")
+
+    def json(self, **kw):
+        return json.loads(self.text, **kw)
+
+    def iter_content(self, chunk_size=1, decode_unicode=False):
+        if self._content is not None:
+            content = self._content
+            for pos in range(0, len(content), chunk_size):
+                yield content[pos:pos+chunk_size]
+            return
+        if self._consumed:
+            raise RuntimeError("The response content has already been consumed")
+        self._consumed = True
+        for chunk in self._stream(chunk_size):
+            yield chunk
+
+    def _stream(self, chunk_size):
+        # reads the body of streamed responses
+        try:
+            for chunk in self.raw.stream(chunk_size):
+                yield chunk
+        except urllib3.exceptions.ProtocolError as e:
+            raise requests.exceptions.ChunkedEncodingError(e)
+        except urllib3.exceptions.HTTPError as e:
+            raise _convertError(e)
+        self.raw.release_conn()
+
+    def close(self):
+        if self.raw.isclosed():
+            self.raw.release_conn()
+            return
+        # unread body: the connection can not be reused
+        self.raw.close()
+        self.raw.release_conn()
+
+
+class HttpxResponse(Response):
+    """
+    `requests.Response` compatible wrapper of `httpx.Response`.
+    """
+
+    def __init__(self, raw, request, elapsed, stream=False):
+        self.raw = raw
+        self.status_code = raw.status_code
+        self.reason = raw.reason_phrase or ""
+        self.headers = raw.headers
+        self.url = str(raw.url)
+        self.request = request
+        self.elapsed = datetime.timedelta(seconds=elapsed)
+        self.http_version = raw.http_version
+        self._content = None if stream else raw.content
+        self._consumed = not stream
+
+    def _stream(self, chunk_size):
+        import httpx
+        try:
+            for chunk in self.raw.iter_bytes(chunk_size):
+                yield chunk
+        except httpx.HTTPError as e:
+            raise _convertHttpxError(httpx, e)
+        self.raw.close()
+
+    def close(self):
+        self.raw.close()
+
+
+class CookieJar(object):
+    """
+    Minimal cookie store keeping `name=value` pairs per host. Expiry, paths and
+    domain cookies are not handled.
+    """
+
+    def __init__(self):
+        self.hosts = {}
+
+    def extract(self, url, headers):
+        values = headers.getlist("Set-Cookie")
+        if not values:
+            return
+        cookies = self.hosts.setdefault(urlsplit(url).hostname, {})
+        for value in values:
+            parsed = SimpleCookie()
+            parsed.load(value)
+            for name, morsel in parsed.items():
+                cookies[name] = morsel.value
+
+    def addHeader(self, url, headers):
+        cookies = self.hosts.get(urlsplit(url).hostname)
+        if cookies:
+            headers["Cookie"] = "; ".join(["%s=%s" % (k, v) for k, v in cookies.items()])
+
+    def get(self, name, default=None, host=None):
+        for h, cookies in self.hosts.items():
+            if host is None or h == host:
+                if name in cookies:
+                    return cookies[name]
+        return default
+
+    def clear(self):
+        self.hosts.clear()
+
+
+def _convertError(error):
+    # maps urllib3 exceptions to the requests exceptions raised by the default transport
+    reason = error
+    if isinstance(error, urllib3.exceptions.MaxRetryError) and error.reason is not None:
+        reason = error.reason
+    if isinstance(reason, urllib3.exceptions.NewConnectionError):
+        return requests.exceptions.ConnectionError(error)
+    if isinstance(reason, urllib3.exceptions.ConnectTimeoutError):
+        return requests.exceptions.ConnectTimeout(error)
+    if isinstance(reason, urllib3.exceptions.ReadTimeoutError):
+        return requests.exceptions.ReadTimeout(error)
+    if isinstance(reason, urllib3.exceptions.SSLError):
+        return requests.exceptions.SSLError(error)
+    if isinstance(reason, urllib3.exceptions.ResponseError):
+        return requests.exceptions.TooManyRedirects(error)
+    return requests.exceptions.ConnectionError(error)
+
+
+def _convertHttpxError(httpx, error):
+    # maps httpx exceptions to requests exceptions
+    if isinstance(error, httpx.ConnectTimeout):
+        return requests.exceptions.ConnectTimeout(error)
+    if isinstance(error, httpx.ReadTimeout):
+        return requests.exceptions.ReadTimeout(error)
+    if isinstance(error, httpx.TimeoutException):
+        return requests.exceptions.Timeout(error)
+    if isinstance(error, httpx.TooManyRedirects):
+        return requests.exceptions.TooManyRedirects(error)
+    return requests.exceptions.ConnectionError(error)
+
+
+def _poolTimeout(timeout):
+    # maximum wait for a free connection: the connect timeout
+    if isinstance(timeout, tuple):
+        return timeout[0]
+    return timeout
+
+
+def _acquire(slot, timeout):
+    # acquires the semaphore within timeout seconds. returns False on timeout.
+    if timeout is None:
+        return slot.acquire()
+    try:
+        return slot.acquire(True, timeout)
+    except TypeError:
+        # python 2: no acquire timeout
+        end = time.time() + timeout
+        while not slot.acquire(False):
+            if time.time() >= end:
+                return False
+            time.sleep(0.005)
+        return True
+
+
+def _readChunks(file, size=65536):
+    # turns readable file objects into an iterator of bytes
+    while True:
+        chunk = file.read(size)
+        if not chunk:
+            return
+        if not isinstance(chunk, bytes):
+            chunk = chunk.encode("utf-8")
+        yield chunk
+
+
+transports = (RequestsTransport, Urllib3Transport, HttpxTransport)
+
+
+def getTransport(name=None):
+    """
+    Returns a transport instance. If `name` is None `RequestsTransport` is returned.
+
+    :param name: requests, urllib3, httpx or None
+    :return: transport
+    """
+    for cls in transports:
+        if name is None or cls.name == name:
+            return cls()
+    raise ValueError("Unknown transport: %s" % name)
@@ -623,7 +623,6 @@ class User(endpoint.Client):
         if start is not None:
             values["start"] = start
         content, response = self.call('list', values, reqSettings)
-        # todo iterator
         return endpoint.Result(response=response,
                                **content)
 
@@ -652,11 +651,53 @@ class User(endpoint.Client):
         if start is not None:
             values["start"] = start
         content, response = self.call('identities', values, reqSettings)
-        # todo iterator
         return endpoint.Result(response=response,
                                **content)
 
 
+    def iterUsers(self, active=None, pending=None, start=1, size=100, sort=None, order=None, prefetch=False, **reqSettings):
+        """
+        Administration command. Iterates all users returned by `list()`. Pages of `size`
+        users are loaded on demand. See `endpoint.iterPages()`.
+
+        :param active: only active, inactive or both
+        :param pending: only pending
+        :param sort:
+        :param order:
+        :param size: page size
+        :param start: batch start value
+        :param prefetch: load the next page in a background thread
+        :param reqSettings:
+        :return: user iterator
+        """
+        def load(start, size):
+            result = self.list(active=active, pending=pending, start=start, size=size,
+                               sort=sort, order=order, **dict(reqSettings))
+            return result.get('users') or (), result.get('total')
+        return endpoint.iterPages(load, start=start, size=size, prefetch=prefetch)
+
+
+    def iterIdentities(self, active=None, pending=None, start=1, size=100, order=None, prefetch=False, **reqSettings):
+        """
+        Administration command. Iterates all user identities returned by `identities()`.
+        Pages of `size` identities are loaded on demand. See `endpoint.iterPages()`.
+
+        :param active: only active, inactive or both
+        :param pending: only pending
+        :param order:
+        :param size: page size
+        :param start: batch start value
+        :param prefetch: load the next page in a background thread
+        :param reqSettings:
+        :return: identity iterator
+        """
+        def load(start, size):
+            result = self.identities(active=active, pending=pending, start=start, size=size,
+                                     order=order, **dict(reqSettings))
+            return result.get('users') or (), result.get('total')
+        return endpoint.iterPages(load, start=start, size=size, prefetch=prefetch)
+
+
     def getPermissions(self, **reqSettings):
         """
 
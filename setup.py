@@ -14,7 +14,7 @@ except:
     README = ''
 
 setup(name='pynive_client',
-      version='0.9.2',
+      version='0.9.3',
       description='nive.io python client library',
       long_description=README,
       classifiers=[
@@ -35,6 +35,7 @@ setup(name='pynive_client',
       license='BSD 3',
       zip_safe=False,
       install_requires=requires,
+      extras_require={'aio': ['aiohttp'], 'json': ['orjson'], 'http2': ['httpx[http2]']},
       tests_require=requires,
       test_suite="pynive_client"
 )